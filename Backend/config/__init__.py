@@ -19,6 +19,67 @@ class Config:
     # Rate limiting
     RATELIMIT_STORAGE_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
+    # Synthesized audio cache
+    AUDIO_CACHE_BACKEND = os.environ.get("AUDIO_CACHE_BACKEND", "disk")
+    AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR")
+    AUDIO_CACHE_MAX_BYTES = int(
+        os.environ.get("AUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    # Lifetime of entries when AUDIO_CACHE_BACKEND is redis
+    AUDIO_CACHE_TTL = int(os.environ.get("AUDIO_CACHE_TTL", str(7 * 24 * 3600)))
+    # Size cap of the disk tier; least recently used files are pruned
+    AUDIO_CACHE_DISK_MAX_BYTES = int(
+        os.environ.get("AUDIO_CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+    )
+
+    # Encoding of @cached values in Redis
+    CACHE_SERIALIZER = os.environ.get("CACHE_SERIALIZER", "auto")
+    CACHE_COMPRESSION = os.environ.get("CACHE_COMPRESSION", "auto")
+    # In-process tier in front of Redis; 0 disables it
+    CACHE_L1_MAX_BYTES = int(
+        os.environ.get("CACHE_L1_MAX_BYTES", str(16 * 1024 * 1024))
+    )
+    CACHE_L1_TTL = int(os.environ.get("CACHE_L1_TTL", "60"))
+
+    # Voice list snapshot shared by all worker processes
+    VOICE_SNAPSHOT_PATH = os.environ.get("VOICE_SNAPSHOT_PATH")
+
+    # gRPC channels in each worker's Text-to-Speech client pool
+    TTS_CHANNELS = int(os.environ.get("TTS_CHANNELS", "4"))
+    # Budget shared by all retries of one synthesis call; hedging is opt-in
+    TTS_DEADLINE_SECONDS = float(os.environ.get("TTS_DEADLINE_SECONDS", "120"))
+    TTS_MAX_ATTEMPTS = int(os.environ.get("TTS_MAX_ATTEMPTS", "5"))
+    TTS_HEDGING = os.environ.get("TTS_HEDGING", "false").lower() == "true"
+    # Project quota the client-side limiter paces all workers against
+    TTS_REQUESTS_PER_MINUTE = int(os.environ.get("TTS_REQUESTS_PER_MINUTE", "1000"))
+    TTS_CHARS_PER_MINUTE = int(os.environ.get("TTS_CHARS_PER_MINUTE", "150000"))
+    # Pack short same-voice lines into one SSML request, split by mark timepoints
+    TTS_SSML_BATCHING = os.environ.get("TTS_SSML_BATCHING", "false").lower() == "true"
+    TTS_BATCH_MAX_SEGMENTS = int(os.environ.get("TTS_BATCH_MAX_SEGMENTS", "20"))
+    TTS_BATCH_SEGMENT_MAX_CHARS = int(
+        os.environ.get("TTS_BATCH_SEGMENT_MAX_CHARS", "200")
+    )
+
+    # Long texts are split into TTS requests of at most this many bytes
+    TTS_CHUNK_MAX_BYTES = int(os.environ.get("TTS_CHUNK_MAX_BYTES", "4500"))
+
+    # Background synthesis jobs
+    JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH")
+    JOB_RUNNERS = int(os.environ.get("JOB_RUNNERS", "2"))
+    # A job is marked failed after this many tries
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+    # Finished jobs and their audio are deleted after this long
+    JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "604800"))
+
+    # Parsed manuscripts, served to clients a page of segments at a time
+    MANUSCRIPTS_DB_PATH = os.environ.get("MANUSCRIPTS_DB_PATH")
+    MANUSCRIPT_PAGE_SIZE = int(os.environ.get("MANUSCRIPT_PAGE_SIZE", "200"))
+    MANUSCRIPT_TTL_SECONDS = int(os.environ.get("MANUSCRIPT_TTL_SECONDS", "604800"))
+
+    # Assembled audiobook files, rebuilt after they expire
+    AUDIOBOOK_DIR = os.environ.get("AUDIOBOOK_DIR")
+    AUDIOBOOK_TTL_SECONDS = int(os.environ.get("AUDIOBOOK_TTL_SECONDS", "86400"))
+
     # Logging
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
@@ -46,9 +107,15 @@ class ProductionConfig(Config):
     CACHE_REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     CACHE_DEFAULT_TIMEOUT = 3600
 
-    # Connection pooling
+    # Connection pooling (see utils.cache.get_connection_pool)
     REDIS_POOL_SIZE = 20
-    REDIS_POOL_MAX_CONNECTIONS = 50
+    REDIS_POOL_MAX_CONNECTIONS = int(os.environ.get("REDIS_POOL_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", "1"))
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "0.5"))
+    REDIS_BREAKER_THRESHOLD = int(os.environ.get("REDIS_BREAKER_THRESHOLD", "5"))
+    REDIS_BREAKER_RESET_TIMEOUT = float(
+        os.environ.get("REDIS_BREAKER_RESET_TIMEOUT", "5")
+    )
 
     # Rate limiting optimizations
     RATELIMIT_STORAGE_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/1")
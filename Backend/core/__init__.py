@@ -10,6 +10,7 @@ from flask_cors import CORS  # type: ignore
 from config import config
 
 from routes.monitoring import monitoring_bp
+from utils.audio_cache import audio_cache
 from utils.cache import cache
 from utils.performance import monitor, track_request_metrics
 
@@ -132,7 +133,9 @@ def get_metrics():
             "application": metrics_summary,
             "cache_stats": {
                 "enabled": cache.enabled,
-                "redis_available": cache.redis_client is not None,
+                "redis_available": cache.redis_available,
+                "tiers": cache.get_stats(),
+                "audio": audio_cache.get_stats(),
             },
         }
     )
@@ -1,12 +1,30 @@
+import base64
+import json
 import logging
 
-from flask import Blueprint, jsonify, request
+from flask import (
+    Blueprint,
+    Response,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+)
 
-from services.content_parser import ContentParser
+from services.audiobook_assembler import AudiobookService
+from services.content_parser import MAX_INPUT_CHARS, ContentParser
+from services.job_service import JobService
+from services.manuscript_service import InvalidCursor, ManuscriptService
 
 # from services.openai_tts_service import OpenAITTSService
+from services.tts_client import start_warmup
 from services.tts_service import TTSService
 from services.validation import ValidationService
+from utils.audio_transport import (
+    audio_response,
+    multipart_segments_response,
+    wants_binary_audio,
+)
 try:
     from services.voice_tagger import VoiceTagger
 except ImportError:
@@ -15,7 +33,7 @@ except ImportError:
 try:
     from utils.cache import cached
 except ImportError:
-    def cached(ttl=3600, key_prefix=""):
+    def cached(ttl=3600, key_prefix="", namespace=None, key_builder=None):
         def decorator(func):
             return func
         return decorator
@@ -34,6 +52,9 @@ api_bp = Blueprint("api", __name__, url_prefix="/api")
 tts_service = TTSService()
 content_parser = ContentParser()
 validation_service = ValidationService()
+job_service = JobService(tts_service)
+manuscript_service = ManuscriptService()
+audiobook_service = AudiobookService(job_service)
 
 # Initialize OpenAI service lazily
 openai_tts_service = None
@@ -43,6 +64,14 @@ def get_openai_service():
     return None  # Temporarily disabled
 
 
+@api_bp.before_app_request
+def start_job_service():
+    # Resumes jobs interrupted by a restart; a no-op after the first request
+    job_service.start()
+    # Opens this worker's TTS channels off the request path
+    start_warmup()
+
+
 @api_bp.route("/detect-roles", methods=["POST"])
 def detect_roles():
     try:
@@ -54,23 +83,70 @@ def detect_roles():
         if not is_valid:
             return jsonify({"error": error_msg}), 400
 
+        # A re-upload after an edit names the revision it replaces
+        base_id = request.form.get("baseManuscriptId")
+        if base_id and manuscript_service.get_summary(base_id) is None:
+            return jsonify({"error": "Base manuscript not found"}), 404
+
+        # Parsed straight off the upload stream into the manuscript store;
+        # the response carries the summary and the first page of segments
         try:
-            content = file.read().decode("utf-8")
+            manuscript_id = manuscript_service.ingest(file.stream)
         except UnicodeDecodeError:
             return jsonify({"error": "File must be valid UTF-8 text"}), 400
 
-        content = content_parser.sanitize_text_input(content)
-        if not content:
+        if manuscript_id is None:
             return jsonify({"error": "File content is empty or invalid"}), 400
 
-        segments, roles = content_parser.parse_content_and_roles(content)
-        return jsonify({"roles": roles, "segments": segments})
+        summary = manuscript_service.get_summary(manuscript_id)
+        response = {**summary, **manuscript_service.get_page(manuscript_id)}
+        if base_id:
+            # Tells an editing client which segments need new audio
+            response["changes"] = manuscript_service.diff(base_id, manuscript_id)
+        return jsonify(response)
 
     except Exception as e:
         logger.error(f"Error in detect_roles: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+@api_bp.route("/manuscripts/<manuscript_id>", methods=["GET"])
+def get_manuscript(manuscript_id):
+    try:
+        summary = manuscript_service.get_summary(manuscript_id)
+        if summary is None:
+            return jsonify({"error": "Manuscript not found"}), 404
+        return jsonify(summary)
+
+    except Exception as e:
+        logger.error(f"Error in get_manuscript: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api_bp.route("/manuscripts/<manuscript_id>/segments", methods=["GET"])
+def get_manuscript_segments(manuscript_id):
+    try:
+        if manuscript_service.get_summary(manuscript_id) is None:
+            return jsonify({"error": "Manuscript not found"}), 404
+
+        try:
+            limit = request.args.get("limit", type=int)
+            chapter = request.args.get("chapter", type=int)
+            page = manuscript_service.get_page(
+                manuscript_id,
+                cursor=request.args.get("cursor"),
+                limit=limit,
+                chapter=chapter,
+            )
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(page)
+
+    except Exception as e:
+        logger.error(f"Error in get_manuscript_segments: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 @api_bp.route("/voices", methods=["GET"])
 def list_voices():
     try:
@@ -177,10 +253,11 @@ def get_voice_filter_options():
         return jsonify({"error": str(e)}), 500
 
 
-@api_bp.route("/preview-voice", methods=["POST"])
+@api_bp.route("/preview-voice", methods=["GET", "POST"])
 def preview_voice():
     try:
-        data = request.json
+        # GET lets <audio src> fetch previews directly, with Range and ETag
+        data = request.args if request.method == "GET" else request.json
         voice_name = data.get("voiceName")
         language_code = data.get("languageCode")
         sample_text = content_parser.sanitize_text_input(
@@ -196,18 +273,20 @@ def preview_voice():
         if voice_name.startswith("openai-"):
             openai_service = get_openai_service()
             if openai_service:
-                audio_base64 = openai_service.synthesize_speech(sample_text, voice_name)
+                audio = openai_service.synthesize_audio(sample_text, voice_name)
             else:
                 return (
                     jsonify({"error": "OpenAI TTS service not available"}),
                     500,
                 )
         else:
-            audio_base64 = tts_service.synthesize_speech(
+            audio = tts_service.synthesize_audio(
                 sample_text, voice_name, language_code
             )
 
-        return jsonify({"audio": audio_base64})
+        if wants_binary_audio():
+            return audio_response(audio)
+        return jsonify({"audio": base64.b64encode(audio).decode("utf-8")})
 
     except Exception as e:
         logger.error(f"Voice preview error: {e}")
@@ -227,41 +306,75 @@ def synthesize_speech():
         if not voice_mapping:
             return jsonify({"error": "No voice mapping provided"}), 400
 
-        audio_segments = []
+        # Repeated lines are synthesized once per request
+        plan = tts_service.plan_segments(segments, voice_mapping)
+
+        if wants_binary_audio():
+            response = multipart_segments_response(
+                tts_service.iter_synthesized_segments(
+                    segments, voice_mapping, binary=True, plan=plan
+                )
+            )
+            response.headers["X-Calls-Saved"] = str(plan.calls_saved)
+            response.headers["X-Characters-Saved"] = str(plan.chars_saved)
+            return response
 
-        for segment in segments:
-            role = segment.get("role", "")
-            text = segment.get("text", "")
+        results = tts_service.synthesize_segments(segments, voice_mapping, plan=plan)
 
-            if not role or not text or role not in voice_mapping:
-                continue
+        audio_segments = [result for result in results if "audio" in result]
+        failed_segments = [result for result in results if "error" in result]
 
-            voice_info = voice_mapping[role]
-            voice_name = voice_info.get("voiceName")
-            language_code = voice_info.get("languageCode")
+        return jsonify(
+            {
+                "audioSegments": audio_segments,
+                "failedSegments": failed_segments,
+                "dedupe": plan.get_stats(),
+            }
+        )
 
-            if not voice_name or not language_code:
-                continue
+    except Exception as e:
+        logger.error(f"Error in synthesize_speech: {e}")
+        return jsonify({"error": "Internal server error"}), 500
 
-            try:
-                audio_base64 = tts_service.synthesize_speech(
-                    text, voice_name, language_code
-                )
 
-                audio_segments.append(
-                    {"role": role, "text": text, "audio": audio_base64}
-                )
+@api_bp.route("/synthesize/stream", methods=["POST"])
+def synthesize_speech_stream():
+    """Stream segment audio as NDJSON, one line per segment in input order."""
+    try:
+        data = request.json
+        segments = data.get("segments", [])
+        voice_mapping = data.get("voiceMapping", {})
 
-            except Exception as e:
-                logger.error(f"Error synthesizing speech for role {role}: {e}")
-                continue
+        if not segments:
+            return jsonify({"error": "No segments provided"}), 400
 
-        return jsonify({"audioSegments": audio_segments})
+        if not voice_mapping:
+            return jsonify({"error": "No voice mapping provided"}), 400
 
     except Exception as e:
-        logger.error(f"Error in synthesize_speech: {e}")
+        logger.error(f"Error in synthesize_speech_stream: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+    def generate():
+        failed = 0
+        plan = tts_service.plan_segments(segments, voice_mapping)
+        for result in tts_service.iter_synthesized_segments(
+            segments, voice_mapping, plan=plan
+        ):
+            if "error" in result:
+                failed += 1
+            yield json.dumps(result) + "\n"
+        yield json.dumps(
+            {
+                "done": True,
+                "total": len(segments),
+                "failed": failed,
+                "dedupe": plan.get_stats(),
+            }
+        ) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 
 @api_bp.route("/synthesize-single", methods=["POST"])
 def synthesize_single():
@@ -274,12 +387,23 @@ def synthesize_single():
         if not is_valid:
             return jsonify({"error": error_msg}), 400
 
+        # Reading one character past the limit tells an oversized file apart
         try:
-            content = file.read().decode("utf-8")
+            content = content_parser.read_text(file.stream, MAX_INPUT_CHARS + 1)
         except UnicodeDecodeError:
             return jsonify({"error": "File must be valid UTF-8 text"}), 400
 
-        content = content_parser.sanitize_text_input(content)
+        if len(content) > MAX_INPUT_CHARS:
+            return (
+                jsonify(
+                    {
+                        "error": f"Text is longer than {MAX_INPUT_CHARS} characters; "
+                        "upload it to /api/detect-roles and synthesize it as a job"
+                    }
+                ),
+                413,
+            )
+
         if not content:
             return jsonify({"error": "File content is empty or invalid"}), 400
 
@@ -292,13 +416,14 @@ def synthesize_single():
         language_code = voices[0].get("language_codes", ["en-US"])[0]
 
         # Generate audio for entire content
-        audio_base64 = tts_service.synthesize_speech(
-            content, default_voice, language_code
-        )
+        audio = tts_service.synthesize_audio(content, default_voice, language_code)
+
+        if wants_binary_audio():
+            return audio_response(audio, headers={"X-Voice-Name": default_voice})
 
         return jsonify(
             {
-                "audio": audio_base64,
+                "audio": base64.b64encode(audio).decode("utf-8"),
                 "text": content,
                 "voice": default_voice,
             }
@@ -307,3 +432,148 @@ def synthesize_single():
     except Exception as e:
         logger.error(f"Error in synthesize_single: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/jobs", methods=["POST"])
+def create_job():
+    try:
+        data = request.json
+        segments = data.get("segments", [])
+        voice_mapping = data.get("voiceMapping", {})
+
+        if not segments:
+            return jsonify({"error": "No segments provided"}), 400
+
+        if not voice_mapping:
+            return jsonify({"error": "No voice mapping provided"}), 400
+
+        # Resubmitting an edited book reuses the base job's audio
+        base_job_id = data.get("baseJobId")
+        if base_job_id and job_service.get_status(base_job_id) is None:
+            return jsonify({"error": "Base job not found"}), 404
+
+        job_id = job_service.submit(segments, voice_mapping, base_job_id)
+        response = jsonify(
+            {"jobId": job_id, "status": "queued", "total": len(segments)}
+        )
+        response.headers["Location"] = f"/api/jobs/{job_id}"
+        return response, 202
+
+    except Exception as e:
+        logger.error(f"Error in create_job: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    try:
+        status = job_service.get_status(job_id)
+        if status is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(status)
+
+    except Exception as e:
+        logger.error(f"Error in get_job: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    try:
+        status = job_service.get_status(job_id)
+        if status is None:
+            return jsonify({"error": "Job not found"}), 404
+        if status["status"] != "completed":
+            return (
+                jsonify({"error": "Job not finished", "status": status["status"]}),
+                409,
+            )
+
+        results = _iter_job_results(job_id)
+        if wants_binary_audio():
+            return multipart_segments_response(results)
+
+        audio_segments = []
+        failed_segments = []
+        for result in results:
+            if "audio" in result:
+                result["audio"] = base64.b64encode(result["audio"]).decode("utf-8")
+                audio_segments.append(result)
+            else:
+                failed_segments.append(result)
+
+        return jsonify(
+            {
+                "jobId": job_id,
+                "audioSegments": audio_segments,
+                "failedSegments": failed_segments,
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error in get_job_result: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api_bp.route("/jobs/<job_id>/audiobook", methods=["GET"])
+def get_job_audiobook(job_id):
+    try:
+        status = job_service.get_status(job_id)
+        if status is None:
+            return jsonify({"error": "Job not found"}), 404
+        if status["status"] != "completed":
+            return (
+                jsonify({"error": "Job not finished", "status": status["status"]}),
+                409,
+            )
+
+        gaps = {}
+        for param, name in (
+            ("segmentGapMs", "segment_gap_ms"),
+            ("speakerGapMs", "speaker_gap_ms"),
+            ("chapterGapMs", "chapter_gap_ms"),
+        ):
+            value = request.args.get(param, type=int)
+            if value is not None:
+                gaps[name] = max(0, min(value, 10000))
+
+        # Chapter titles come from the manuscript the segments were paged from
+        chapter_titles = None
+        manuscript_id = request.args.get("manuscriptId")
+        if manuscript_id:
+            summary = manuscript_service.get_summary(manuscript_id)
+            if summary is None:
+                return jsonify({"error": "Manuscript not found"}), 404
+            chapter_titles = {
+                chapter["index"]: chapter["title"]
+                for chapter in summary["chapters"]
+                if chapter["title"]
+            }
+
+        path = audiobook_service.get_audiobook(job_id, chapter_titles, **gaps)
+        return send_file(
+            path,
+            mimetype="audio/mpeg",
+            as_attachment=True,
+            download_name=f"audiobook-{job_id}.mp3",
+            conditional=True,
+        )
+
+    except Exception as e:
+        logger.error(f"Error in get_job_audiobook: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def _iter_job_results(job_id):
+    # Reads the audio a batch at a time so a long book is never all in memory
+    for result in job_service.iter_results(job_id):
+        segment = {
+            "index": result["idx"],
+            "role": result["role"],
+            "text": result["text"],
+        }
+        if result["status"] == "done":
+            segment["audio"] = result["audio"]
+        else:
+            segment["error"] = result["error"]
+        yield segment
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 
+from utils.audio_cache import audio_cache
 from utils.cache import cache
 from utils.performance import monitor
 
@@ -21,7 +22,7 @@ def health_check():
         },
         "cache": {
             "enabled": cache.enabled,
-            "redis_available": cache.redis_client is not None,
+            "redis_available": cache.redis_available,
         },
     }
 
@@ -48,7 +49,9 @@ def get_detailed_metrics():
             "application": metrics_summary,
             "cache_stats": {
                 "enabled": cache.enabled,
-                "redis_available": cache.redis_client is not None,
+                "redis_available": cache.redis_available,
+                "tiers": cache.get_stats(),
+                "audio": audio_cache.get_stats(),
             },
             "performance_tips": _get_performance_recommendations(system_metrics),
         }
@@ -72,7 +75,7 @@ def _get_performance_recommendations(system_metrics):
             "Memory usage is high - consider increasing available RAM or optimizing memory usage"
         )
 
-    if not cache.redis_client:
+    if not cache.redis_available:
         recommendations.append(
             "Redis cache is not available - performance may be degraded"
         )
@@ -6,8 +6,9 @@ from google.cloud import texttospeech
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.tts_service import TTSService
-from utils.database import db
+from services.tts_client import get_tts_client  # noqa: E402
+from utils.database import db  # noqa: E402
+from utils.voice_snapshot import write_snapshot  # noqa: E402
 
 
 def seed_voices():
@@ -15,20 +16,15 @@ def seed_voices():
     Fetches voices from the Google Text-to-Speech API and populates the
     database.
     """
-    # Initialize the TTS service
-    tts_service = TTSService()
-
-    # Fetch the list of voices
-    voices = tts_service.client.list_voices().voices
-
-    # Get the database collection
-    voice_collection = db.get_collection("voices")
-    if voice_collection is None:
-        print("Could not connect to the database. Aborting.")
+    # Reuse the process-wide client pool (shared with the API when run
+    # from the scheduler)
+    client = get_tts_client()
+    if client is None:
+        print("No Text-to-Speech client available. Aborting.")
         return
 
-    # Clear existing voices to avoid duplicates
-    voice_collection.delete_many({})
+    # Fetch the list of voices
+    voices = client.list_voices().voices
 
     voice_documents = []
     for voice in voices:
@@ -40,11 +36,26 @@ def seed_voices():
         }
         voice_documents.append(voice_doc)
 
-    if voice_documents:
-        voice_collection.insert_many(voice_documents)
-        print(f"Successfully seeded {len(voice_documents)} voices into the database.")
-    else:
+    if not voice_documents:
         print("No voices found to seed.")
+        return
+
+    # Publish the snapshot API workers memory-map, so they pick up the new
+    # list without calling the API themselves
+    version = write_snapshot(voice_documents)
+    print(f"Published voice snapshot version {version}.")
+
+    # Get the database collection
+    voice_collection = db.get_collection("voices")
+    if voice_collection is None:
+        print("Could not connect to the database. Aborting.")
+        return
+
+    # Clear existing voices to avoid duplicates
+    voice_collection.delete_many({})
+
+    voice_collection.insert_many(voice_documents)
+    print(f"Successfully seeded {len(voice_documents)} voices into the database.")
 
 
 if __name__ == "__main__":
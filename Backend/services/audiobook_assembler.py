@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Hashable, List, Optional
+
+from utils.id3 import Chapter, chapter_tag
+from utils.mp3 import iter_frames, silent_frame, write_all, write_frames
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_GAP_MS = 300
+DEFAULT_SPEAKER_GAP_MS = 600
+DEFAULT_CHAPTER_GAP_MS = 2000
+COPY_BUFFER_BYTES = 1024 * 1024
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class AudiobookAssembler:
+    """Joins synthesized MP3 clips into one audiobook file on disk.
+
+    Clips' frames are written as they are added, with silent
+    frames for the pauses between segments, speakers and chapters, so
+    nothing is decoded or re-encoded and only one clip is in memory at a
+    time. finish() prepends an ID3 tag with CHAP/CTOC chapter markers.
+
+    All clips should share one sample rate and channel mode, as TTS
+    output for a single book does; frames are copied as they are.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment_gap_ms: int = DEFAULT_SEGMENT_GAP_MS,
+        speaker_gap_ms: int = DEFAULT_SPEAKER_GAP_MS,
+        chapter_gap_ms: int = DEFAULT_CHAPTER_GAP_MS,
+    ):
+        self.path = path
+        self.segment_gap_ms = segment_gap_ms
+        self.speaker_gap_ms = speaker_gap_ms
+        self.chapter_gap_ms = chapter_gap_ms
+        # Unbuffered: clips are written straight to the descriptor
+        self._audio = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or ".",
+            suffix=".audio",
+            delete=False,
+            buffering=0,
+        )
+        self._format = None
+        self._silence = None
+        self._silence_ms = 0.0
+        self._last_role = None
+        self._chapters: List[Chapter] = []
+        self._chapter_key = None
+        self._chapter_title = None
+        self._chapter_start = 0.0
+        self.duration_ms = 0.0
+        self.clips = 0
+        self.mismatched_clips = 0
+
+    def add_clip(
+        self,
+        audio: bytes,
+        role: Optional[str] = None,
+        chapter: Optional[Hashable] = None,
+        title: Optional[str] = None,
+    ):
+        """Append a clip; a new chapter key starts a chapter marker."""
+        new_chapter = chapter is not None and chapter != self._chapter_key
+        if self.clips:
+            if new_chapter:
+                gap = self.chapter_gap_ms
+            elif role != self._last_role:
+                gap = self.speaker_gap_ms
+            else:
+                gap = self.segment_gap_ms
+            self.add_silence(gap)
+        if new_chapter:
+            self._close_chapter()
+            self._chapter_key = chapter
+            self._chapter_title = title or f"Chapter {len(self._chapters) + 1}"
+            self._chapter_start = self.duration_ms
+
+        stats = write_frames(self._audio.fileno(), audio)
+        if stats.header is not None:
+            if self._format is None:
+                self._set_format(stats.header)
+            elif _format_of(stats.header) != self._format:
+                self.mismatched_clips += 1
+        self.duration_ms += stats.duration * 1000
+        self._last_role = role
+        self.clips += 1
+
+    def add_silence(self, ms: float):
+        # Silence needs a frame format to copy, i.e. at least one clip
+        if self._silence is None or ms <= 0:
+            return
+        count = math.ceil(ms / self._silence_ms)
+        write_all(self._audio.fileno(), self._silence * count)
+        self.duration_ms += count * self._silence_ms
+
+    def finish(self, title: str = "") -> str:
+        """Write the tagged file to path and return it."""
+        self._close_chapter()
+        if self.mismatched_clips:
+            logger.warning(
+                f"{self.mismatched_clips} clips in {self.path} differ in"
+                " sample rate or channels from the first one"
+            )
+
+        out = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(self.path) or ".", suffix=".tmp", delete=False
+        )
+        try:
+            with out:
+                if self._chapters or title:
+                    out.write(chapter_tag(self._chapters, title))
+                self._audio.seek(0)
+                shutil.copyfileobj(self._audio, out, COPY_BUFFER_BYTES)
+            # Readers only ever see a finished file
+            os.replace(out.name, self.path)
+        except BaseException:
+            if os.path.exists(out.name):
+                os.unlink(out.name)
+            raise
+        finally:
+            self.abort()
+        return self.path
+
+    def abort(self):
+        """Drop the partial audio; safe to call more than once."""
+        self._audio.close()
+        if os.path.exists(self._audio.name):
+            os.unlink(self._audio.name)
+
+    @property
+    def chapters(self) -> List[Chapter]:
+        return list(self._chapters)
+
+    def _set_format(self, header: bytes):
+        self._format = _format_of(header)
+        self._silence = silent_frame(header)
+        frame = next(iter_frames(self._silence))
+        self._silence_ms = frame.duration * 1000
+
+    def _close_chapter(self):
+        if self._chapter_key is None:
+            return
+        self._chapters.append(
+            Chapter(
+                self._chapter_title,
+                round(self._chapter_start),
+                round(self.duration_ms),
+            )
+        )
+        self._chapter_key = None
+
+
+def _format_of(header: bytes):
+    # Version, layer and sample rate bits, plus the channel mode
+    return header[1] & 0xFE, header[2] & 0x0C, header[3] & 0xC0
+
+
+class AudiobookService:
+    """Builds and keeps assembled audiobooks for finished synthesis jobs.
+
+    Each (job, pause settings, chapter titles) combination is assembled
+    once into AUDIOBOOK_DIR and served from disk afterwards; files older
+    than AUDIOBOOK_TTL_SECONDS are removed when a new book is built.
+    """
+
+    def __init__(
+        self,
+        job_service,
+        directory: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.job_service = job_service
+        self.directory = (
+            directory
+            or os.environ.get("AUDIOBOOK_DIR")
+            or (os.path.join(tempfile.gettempdir(), "etoaudiobook-audiobooks"))
+        )
+        self.ttl_seconds = ttl_seconds or int(
+            os.environ.get("AUDIOBOOK_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+        )
+
+    def get_audiobook(
+        self,
+        job_id: str,
+        chapter_titles: Optional[Dict[int, str]] = None,
+        segment_gap_ms: int = DEFAULT_SEGMENT_GAP_MS,
+        speaker_gap_ms: int = DEFAULT_SPEAKER_GAP_MS,
+        chapter_gap_ms: int = DEFAULT_CHAPTER_GAP_MS,
+    ) -> str:
+        """Path of the job's audiobook, assembling it on first request."""
+        options = json.dumps(
+            [segment_gap_ms, speaker_gap_ms, chapter_gap_ms, chapter_titles],
+            sort_keys=True,
+        )
+        digest = hashlib.sha256(options.encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.directory, f"{job_id}-{digest}.mp3")
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge_expired()
+        assembler = AudiobookAssembler(
+            path, segment_gap_ms, speaker_gap_ms, chapter_gap_ms
+        )
+        skipped = 0
+        try:
+            for result in self.job_service.iter_results(job_id):
+                if result["status"] != "done" or not result["audio"]:
+                    skipped += 1
+                    continue
+                chapter = result.get("chapter")
+                assembler.add_clip(
+                    result["audio"],
+                    role=result["role"],
+                    chapter=chapter,
+                    title=(chapter_titles or {}).get(chapter),
+                )
+        except BaseException:
+            assembler.abort()
+            raise
+
+        assembler.finish()
+        logger.info(
+            f"Assembled audiobook for job {job_id}: {assembler.clips} clips,"
+            f" {len(assembler.chapters)} chapters,"
+            f" {assembler.duration_ms / 1000:.0f}s, {skipped} failed segments"
+            " skipped"
+        )
+        return path
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                # Another worker may have removed it first
+                continue
@@ -1,47 +1,199 @@
+import codecs
+import hashlib
+import itertools
 import re
 import logging
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.segment_dedupe import normalize_text
 
 logger = logging.getLogger(__name__)
 
+MAX_INPUT_CHARS = 10000
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Characters stripped from user text before it reaches SSML or the UI
+_UNSAFE_CHARS = str.maketrans("", "", "<>\"'\\")
+# A "**Role**" marker at the start of a line, after optional indentation.
+# Anchoring on the newline itself lets the scan skip ahead to each one.
+_ROLE_MARKER = re.compile(r"\n[^\S\n]*\*\*(.*?)\*\*")
+_LEADING_ROLE_MARKER = re.compile(r"[^\S\n]*\*\*(.*?)\*\*")
+# Either a role marker or a "# Chapter" heading line
+_ROLE_OR_CHAPTER_MARKER = re.compile(
+    r"\n[^\S\n]*(?:\*\*(.*?)\*\*|#{1,2}[^\S\n]+([^\n]*))"
+)
+
+
 class ContentParser:
     @staticmethod
     def sanitize_text_input(text):
         if not isinstance(text, str):
             return ""
-        
-        sanitized = re.sub(r'[<>"\'\\]', "", text)
-        return sanitized[:10000]
-    
+
+        return text.translate(_UNSAFE_CHARS)[:MAX_INPUT_CHARS]
+
+    @staticmethod
+    def iter_segments(content: str) -> Iterator[Tuple[str, str]]:
+        """Yield (role, text) for each role's block, in order.
+
+        One scan over the buffer finds the role markers; the text between
+        two markers has its lines stripped and joined with single spaces.
+        Only the current block is copied, so memory stays proportional to
+        the longest segment rather than the manuscript. Roles whose block
+        has no text, and the text of an empty "****" role, come out as "".
+        """
+        role = None
+        start = 0
+        markers = _ROLE_MARKER.finditer(content)
+        leading = _LEADING_ROLE_MARKER.match(content)
+        if leading:
+            markers = itertools.chain((leading,), markers)
+        for match in markers:
+            if role is not None:
+                yield role, _block_text(content, start, match.start()) if role else ""
+            role = match.group(1).strip()
+            start = match.end()
+        if role is not None:
+            yield role, _block_text(content, start, len(content)) if role else ""
+
+    @staticmethod
+    def segment_hash(role: str, text: str) -> str:
+        """Stable content hash of a segment, for matching it across edits.
+
+        Whitespace-only changes keep the hash; the same line given to
+        another role does not.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(role.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(normalize_text(text).encode("utf-8"))
+        return digest.hexdigest()
+
     @staticmethod
-    def parse_content_and_roles(content):
+    def iter_text_chunks(
+        stream: BinaryIO,
+        max_chars: Optional[int] = MAX_INPUT_CHARS,
+        chunk_size: int = UPLOAD_CHUNK_BYTES,
+    ) -> Iterator[str]:
+        """Decode and sanitize a UTF-8 byte stream one chunk at a time.
+
+        Yields the same text sanitize_text_input would return for the whole
+        stream, and stops reading once max_chars have been produced. Raises
+        UnicodeDecodeError on invalid input, including a truncated final
+        character.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        remaining = max_chars
+        while remaining is None or remaining > 0:
+            data = stream.read(chunk_size)
+            text = decoder.decode(data, final=not data).translate(_UNSAFE_CHARS)
+            if remaining is not None:
+                text = text[:remaining]
+                remaining -= len(text)
+            if text:
+                yield text
+            if not data:
+                break
+
+    @staticmethod
+    def read_text(stream: BinaryIO, max_chars: Optional[int] = MAX_INPUT_CHARS) -> str:
+        return "".join(ContentParser.iter_text_chunks(stream, max_chars))
+
+    @staticmethod
+    def collect_segments(
+        blocks: Iterable[Tuple[str, str]],
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """Segment dicts and first-seen role names for parsed blocks."""
         segments = []
-        roles = set()
-        lines = content.split("\n")
-        current_role = None
-        current_text = []
-
-        for line in lines:
-            role_match = re.match(r"^\s*\*\*(.*?)\*\*", line)
-            if role_match:
-                if current_role and current_text:
-                    segment = {
-                        "role": current_role,
-                        "text": " ".join(current_text).strip(),
-                    }
-                    segments.append(segment)
-
-                current_role = role_match.group(1).strip()
-                roles.add(current_role)
-                text_after_role = line[role_match.end():].strip()
-                current_text = [text_after_role] if text_after_role else []
-            elif line.strip() and current_role:
-                current_text.append(line.strip())
-
-        if current_role and current_text:
-            final_segment = {
-                "role": current_role,
-                "text": " ".join(current_text).strip(),
-            }
-            segments.append(final_segment)
-
-        return segments, list(roles)
\ No newline at end of file
+        roles = {}
+        for role, text in blocks:
+            roles[role] = None
+            if text:
+                segments.append({"role": role, "text": text})
+        return segments, list(roles)
+
+    @staticmethod
+    def parse_content_and_roles(content) -> Tuple[List[Dict[str, str]], List[str]]:
+        return ContentParser.collect_segments(ContentParser.iter_segments(content))
+
+
+class SegmentStream:
+    """Parses an upload into (role, text) blocks while it is being read.
+
+    Iterating reads the stream chunk by chunk through an incremental
+    decoder and yields each block as soon as the next role marker shows
+    up. Only the block being built is buffered, so peak memory follows
+    the longest segment, not the file. chars counts the sanitized
+    characters consumed so far.
+
+    With chapters=True a "# Title" or "## Title" line also ends the block
+    and is yielded as (None, title); the open role carries on after it.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        max_chars: Optional[int] = MAX_INPUT_CHARS,
+        chunk_size: int = UPLOAD_CHUNK_BYTES,
+        chapters: bool = False,
+    ):
+        self.stream = stream
+        self.max_chars = max_chars
+        self.chunk_size = chunk_size
+        self.chars = 0
+        self._marker = _ROLE_OR_CHAPTER_MARKER if chapters else _ROLE_MARKER
+        self._role = None
+
+    def __iter__(self) -> Iterator[Tuple[Optional[str], str]]:
+        # The leading newline lets the markers match on line one
+        buffer = "\n"
+        scan_from = 0
+        self._role = None
+        chunks = ContentParser.iter_text_chunks(
+            self.stream, self.max_chars, self.chunk_size
+        )
+        for chunk in chunks:
+            self.chars += len(chunk)
+            buffer += chunk
+            # Markers are only trusted on complete lines
+            last_line = buffer.rfind("\n")
+            if last_line <= scan_from:
+                continue
+            start = yield from self._split(buffer, scan_from, last_line)
+            # Drop what has been consumed: everything before the current
+            # block, or before the incomplete line while no role is open
+            keep_from = start if self._role is not None else last_line
+            buffer = buffer[keep_from:]
+            scan_from = last_line - keep_from
+
+        start = yield from self._split(buffer, scan_from, len(buffer))
+        if self._role is not None:
+            yield self._role, self._text(buffer, start, len(buffer))
+
+    def _split(self, buffer: str, scan_from: int, end: int):
+        """Yield the blocks closed by markers in buffer[scan_from:end].
+
+        The open block starts at the beginning of buffer; returns where
+        the block left open afterwards starts.
+        """
+        start = 0
+        for match in self._marker.finditer(buffer, scan_from, end):
+            if self._role is not None:
+                yield self._role, self._text(buffer, start, match.start())
+            if match.group(1) is not None:
+                self._role = match.group(1).strip()
+            else:
+                yield None, match.group(2).strip()
+            start = match.end()
+        return start
+
+    def _text(self, buffer: str, start: int, end: int) -> str:
+        return _block_text(buffer, start, end) if self._role else ""
+
+
+def _block_text(content: str, start: int, end: int) -> str:
+    text = content[start:end].strip()
+    if "\n" in text:
+        # Only this block is split; cheaper than a regex over its whitespace
+        text = " ".join(filter(None, map(str.strip, text.split("\n"))))
+    return text
@@ -0,0 +1,489 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.segment_dedupe import normalize_text
+from utils.audio_cache import audio_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_JOB_TTL_SECONDS = 7 * 24 * 3600  # 1 week
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    voice_mapping TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_segments (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    audio BLOB,
+    synthesis_key TEXT,
+    chapter INTEGER,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS job_segments_by_key
+    ON job_segments (job_id, synthesis_key);
+"""
+
+
+def ensure_column(conn: sqlite3.Connection, table: str, column: str, decl: str):
+    """Add a column that databases created by older versions lack."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# Live stores, so a forked child can drop the connections it inherited
+_stores: "weakref.WeakSet[SQLiteStore]" = weakref.WeakSet()
+# Closing an inherited connection in the child would still act on the
+# parent's database handle, so those are kept here and never touched
+_inherited_connections: List[sqlite3.Connection] = []
+
+
+class SQLiteStore:
+    """Base for the SQLite stores: one lock and a connection per process.
+
+    A connection must not be carried across fork(), and gunicorn --preload
+    creates the stores in the master. The connection is therefore opened
+    on first use, and a forked child starts over with a lock and
+    connection of its own.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        _stores.add(self)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Only used while holding _lock, so it is opened once per process
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+        return self._connection
+
+    def close(self):
+        """Close this process's connection; the next call reopens it."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _after_fork(self):
+        if self._connection is not None:
+            _inherited_connections.append(self._connection)
+        self._connection = None
+        self._lock = threading.Lock()
+
+
+def _reset_stores_after_fork():
+    for store in list(_stores):
+        store._after_fork()
+
+
+# Not available on Windows, where workers are never forked
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stores_after_fork)
+
+
+class JobStore(SQLiteStore):
+    """SQLite-backed persistence for synthesis jobs and their segments."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            ensure_column(self._conn, "jobs", "attempts", "INTEGER NOT NULL DEFAULT 0")
+            ensure_column(self._conn, "job_segments", "synthesis_key", "TEXT")
+            ensure_column(self._conn, "job_segments", "chapter", "INTEGER")
+            self._conn.executescript(_INDEXES)
+        # Migrations ran in whatever process built the store; leave no
+        # connection open for forked workers to inherit
+        self.close()
+
+    def create_job(
+        self,
+        job_id: str,
+        segments: List[Dict],
+        voice_mapping: Dict[str, Any],
+        keys: Optional[List[Optional[str]]] = None,
+        base_job_id: Optional[str] = None,
+    ) -> int:
+        """Store a queued job; returns how many segments were reused.
+
+        Segments whose synthesis key matches a finished segment of the
+        base job take its audio and start out done.
+        """
+        keys = keys or [None] * len(segments)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, voice_mapping, total, created_at,"
+                " updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(voice_mapping), len(segments), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_segments"
+                " (job_id, idx, role, text, status, synthesis_key, chapter)"
+                " VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                [
+                    (
+                        job_id,
+                        idx,
+                        str(seg.get("role", "")),
+                        str(seg.get("text", "")),
+                        key,
+                        _chapter_of(seg),
+                    )
+                    for idx, (seg, key) in enumerate(zip(segments, keys))
+                ],
+            )
+            if base_job_id is None:
+                return 0
+            cursor = self._conn.execute(
+                "UPDATE job_segments SET status = 'done', audio = ("
+                "  SELECT base.audio FROM job_segments AS base"
+                "  WHERE base.job_id = ? AND base.status = 'done'"
+                "  AND base.synthesis_key = job_segments.synthesis_key LIMIT 1)"
+                " WHERE job_id = ? AND synthesis_key IN ("
+                "  SELECT synthesis_key FROM job_segments"
+                "  WHERE job_id = ? AND status = 'done')",
+                (base_job_id, job_id, base_job_id),
+            )
+            return cursor.rowcount
+
+    def claim_job(self, job_id: str, worker: str, lease_seconds: int) -> bool:
+        """Mark a job as running by this worker unless another holds a live lease.
+
+        Each successful claim counts as an attempt at the job.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, updated_at = ?,"
+                " attempts = attempts + 1"
+                " WHERE id = ? AND (status = 'queued'"
+                " OR (status = 'running' AND updated_at < ?))",
+                (worker, now, job_id, now - lease_seconds),
+            )
+            return cursor.rowcount == 1
+
+    def resumable_job_ids(self, lease_seconds: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND updated_at < ?) ORDER BY created_at",
+                (time.time() - lease_seconds,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def pending_segments(self, job_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, role, text FROM job_segments"
+                " WHERE job_id = ? AND status = 'pending' ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_segment(
+        self,
+        job_id: str,
+        idx: int,
+        audio: Optional[bytes] = None,
+        error: Optional[str] = None,
+    ):
+        status = "done" if error is None else "failed"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_segments SET status = ?, error = ?, audio = ?"
+                " WHERE job_id = ? AND idx = ?",
+                (status, error, audio, job_id, idx),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def finish_job(self, job_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, time.time(), job_id),
+            )
+
+    def delete_finished(self, before: float) -> int:
+        """Delete jobs that finished before a timestamp; returns how many."""
+        finished = (
+            "SELECT id FROM jobs WHERE status IN ('completed', 'failed')"
+            " AND updated_at < ?"
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"DELETE FROM job_segments WHERE job_id IN ({finished})", (before,)
+            )
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE id IN ({finished})", (before,)
+            )
+            return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            segments = self._conn.execute(
+                "SELECT idx, role, status, error FROM job_segments"
+                " WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        job = dict(job)
+        job["voice_mapping"] = json.loads(job["voice_mapping"])
+        job["segments"] = [dict(row) for row in segments]
+        return job
+
+    def get_results(self, job_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, role, text, status, error, audio FROM job_segments"
+                " WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_results(self, job_id: str, batch: int = 100) -> Iterator[Dict]:
+        """Like get_results, holding only one batch of audio at a time."""
+        after = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT idx, role, text, status, error, audio, chapter"
+                    " FROM job_segments WHERE job_id = ? AND idx > ?"
+                    " ORDER BY idx LIMIT ?",
+                    (job_id, after, batch),
+                ).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < batch:
+                return
+            after = rows[-1]["idx"]
+
+
+class JobService:
+    """Runs synthesis jobs in the background and persists their progress.
+
+    Segments already synthesized are never redone: a job interrupted by a
+    restart is picked up again by a started service once its previous
+    worker's lease has expired. A job is marked failed after max_attempts
+    tries, and finished jobs are deleted ttl_seconds after they end.
+    """
+
+    def __init__(
+        self,
+        tts_service,
+        store: Optional[JobStore] = None,
+        max_concurrent_jobs: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.tts_service = tts_service
+        self.store = store or JobStore(
+            os.environ.get("JOBS_DB_PATH")
+            or os.path.join(tempfile.gettempdir(), "etoaudiobook-jobs.sqlite3")
+        )
+        self.lease_seconds = lease_seconds or int(
+            os.environ.get("JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+        )
+        self.max_attempts = max_attempts or int(
+            os.environ.get("JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+        )
+        self.ttl_seconds = ttl_seconds or int(
+            os.environ.get("JOB_TTL_SECONDS", DEFAULT_JOB_TTL_SECONDS)
+        )
+        # Job runners only orchestrate; the synthesis calls themselves go
+        # through the TTS service's shared worker pool.
+        self._runner = ThreadPoolExecutor(
+            max_workers=max_concurrent_jobs or int(os.environ.get("JOB_RUNNERS", "2")),
+            thread_name_prefix="job-runner",
+        )
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> str:
+        # Looked up on use: the service is built in the preload master
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        """Resume unfinished jobs and keep sweeping for expired leases."""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self.resume_unfinished()
+        threading.Thread(target=self._sweep, name="job-sweeper", daemon=True).start()
+
+    def resume_unfinished(self):
+        for job_id in self.store.resumable_job_ids(self.lease_seconds):
+            logger.info(f"Resuming synthesis job {job_id}")
+            self._schedule(job_id)
+
+    def purge_expired(self):
+        deleted = self.store.delete_finished(time.time() - self.ttl_seconds)
+        if deleted:
+            logger.info(f"Deleted {deleted} expired synthesis jobs")
+
+    def _sweep(self):
+        while True:
+            time.sleep(self.lease_seconds / 2)
+            try:
+                self.resume_unfinished()
+                self.purge_expired()
+            except Exception as e:
+                logger.error(f"Job sweep failed: {e}")
+
+    def submit(
+        self,
+        segments: List[Dict],
+        voice_mapping: Dict[str, Any],
+        base_job_id: Optional[str] = None,
+    ) -> str:
+        """Queue a job; with base_job_id, unchanged segments reuse its audio.
+
+        A segment counts as unchanged when its normalized text and mapped
+        voice match a segment the base job finished, wherever it was in
+        the book, so an edit only re-synthesizes what it touched.
+        """
+        job_id = uuid.uuid4().hex
+        keys = [_synthesis_key(segment, voice_mapping) for segment in segments]
+        reused = self.store.create_job(
+            job_id, segments, voice_mapping, keys, base_job_id
+        )
+        if reused:
+            logger.info(f"Job {job_id} reuses audio for {reused} segments")
+        self._schedule(job_id)
+        return job_id
+
+    def get_status(self, job_id: str) -> Optional[Dict]:
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+
+        counts = {"pending": 0, "done": 0, "failed": 0}
+        for segment in job["segments"]:
+            counts[segment["status"]] += 1
+        total = job["total"]
+
+        return {
+            "jobId": job["id"],
+            "status": job["status"],
+            "total": total,
+            "completed": counts["done"],
+            "failed": counts["failed"],
+            "pending": counts["pending"],
+            "progress": (counts["done"] + counts["failed"]) / total if total else 1.0,
+            "createdAt": job["created_at"],
+            "updatedAt": job["updated_at"],
+            "segments": [
+                {
+                    "index": segment["idx"],
+                    "role": segment["role"],
+                    "status": segment["status"],
+                    "error": segment["error"],
+                }
+                for segment in job["segments"]
+            ],
+        }
+
+    def get_results(self, job_id: str) -> List[Dict]:
+        return self.store.get_results(job_id)
+
+    def iter_results(self, job_id: str) -> Iterator[Dict]:
+        return self.store.iter_results(job_id)
+
+    def _schedule(self, job_id: str):
+        self._runner.submit(self._run_job, job_id)
+
+    def _run_job(self, job_id: str):
+        if not self.store.claim_job(job_id, self.worker_id, self.lease_seconds):
+            return
+
+        job = None
+        try:
+            job = self.store.get_job(job_id)
+            if job["attempts"] > self.max_attempts:
+                # Every earlier attempt died along with its worker
+                self._give_up(job_id)
+                return
+            pending = self.store.pending_segments(job_id)
+            results = self.tts_service.iter_synthesized_segments(
+                pending, job["voice_mapping"], binary=True
+            )
+            for segment, result in zip(pending, results):
+                self.store.record_segment(
+                    job_id,
+                    segment["idx"],
+                    audio=result.get("audio"),
+                    error=result.get("error"),
+                )
+            self.store.finish_job(job_id, "completed")
+            logger.info(f"Synthesis job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Synthesis job {job_id} interrupted: {e}")
+            # Below the limit the job stays running, so its lease expires
+            # and it is retried
+            if job is not None and job["attempts"] >= self.max_attempts:
+                self._give_up(job_id)
+
+    def _give_up(self, job_id: str):
+        self.store.finish_job(job_id, "failed")
+        logger.error(
+            f"Synthesis job {job_id} failed after {self.max_attempts} attempts"
+        )
+
+
+def _synthesis_key(segment: Dict, voice_mapping: Dict[str, Any]) -> Optional[str]:
+    """What the segment's audio depends on, or None if it cannot be synthesized."""
+    voice = voice_mapping.get(segment.get("role", ""))
+    text = segment.get("text")
+    if not isinstance(voice, dict) or not isinstance(text, str):
+        return None
+    return audio_cache_key(
+        normalize_text(text), voice.get("voiceName"), voice.get("languageCode")
+    )
+
+
+def _chapter_of(segment: Dict) -> Optional[int]:
+    # Segments paged from a manuscript carry their chapter index
+    chapter = segment.get("chapter")
+    return chapter if isinstance(chapter, int) else None
@@ -0,0 +1,389 @@
+import base64
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from difflib import SequenceMatcher
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from services.content_parser import ContentParser, SegmentStream
+from services.job_service import SQLiteStore, ensure_column
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Parsed segments are written in batches of this many rows
+INSERT_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manuscripts (
+    id TEXT PRIMARY KEY,
+    roles TEXT NOT NULL,
+    total_segments INTEGER NOT NULL,
+    total_chars INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manuscript_chapters (
+    manuscript_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    title TEXT,
+    first_segment INTEGER NOT NULL,
+    segment_count INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    roles TEXT NOT NULL,
+    PRIMARY KEY (manuscript_id, idx)
+);
+CREATE TABLE IF NOT EXISTS manuscript_segments (
+    manuscript_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    hash TEXT,
+    PRIMARY KEY (manuscript_id, idx)
+);
+"""
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class ManuscriptStore(SQLiteStore):
+    """SQLite-backed storage for parsed manuscripts, read back in pages."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            ensure_column(self._conn, "manuscript_segments", "hash", "TEXT")
+        # Leave no connection open for forked workers to inherit
+        self.close()
+
+    def add_segments(self, manuscript_id: str, rows: List[tuple]):
+        """Insert (idx, chapter, role, text, hash) rows for a manuscript."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO manuscript_segments"
+                " (manuscript_id, idx, chapter, role, text, hash)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(manuscript_id, *row) for row in rows],
+            )
+
+    def finish_manuscript(
+        self,
+        manuscript_id: str,
+        roles: List[str],
+        chapters: List[Dict],
+        total_segments: int,
+        total_chars: int,
+    ):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO manuscript_chapters (manuscript_id, idx, title,"
+                " first_segment, segment_count, chars, roles)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        manuscript_id,
+                        chapter["index"],
+                        chapter["title"],
+                        chapter["firstSegment"],
+                        chapter["segmentCount"],
+                        chapter["characters"],
+                        json.dumps(chapter["roles"]),
+                    )
+                    for chapter in chapters
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO manuscripts (id, roles, total_segments, total_chars,"
+                " created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    manuscript_id,
+                    json.dumps(roles),
+                    total_segments,
+                    total_chars,
+                    time.time(),
+                ),
+            )
+
+    def get_manuscript(self, manuscript_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM manuscripts WHERE id = ?", (manuscript_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            chapters = self._conn.execute(
+                "SELECT * FROM manuscript_chapters WHERE manuscript_id = ?"
+                " ORDER BY idx",
+                (manuscript_id,),
+            ).fetchall()
+        manuscript = dict(row)
+        manuscript["roles"] = json.loads(manuscript["roles"])
+        manuscript["chapters"] = [dict(chapter) for chapter in chapters]
+        for chapter in manuscript["chapters"]:
+            chapter["roles"] = json.loads(chapter["roles"])
+        return manuscript
+
+    def get_segments(
+        self,
+        manuscript_id: str,
+        after: int,
+        limit: int,
+        chapter: Optional[int] = None,
+    ) -> List[Dict]:
+        """Up to limit segments with an index above after, in order."""
+        query = (
+            "SELECT idx, chapter, role, text, hash FROM manuscript_segments"
+            " WHERE manuscript_id = ? AND idx > ?"
+        )
+        params: List[Any] = [manuscript_id, after]
+        if chapter is not None:
+            query += " AND chapter = ?"
+            params.append(chapter)
+        query += " ORDER BY idx LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_hashes(self, manuscript_id: str) -> List[str]:
+        """Segment hashes in order; all a diff between revisions needs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hash FROM manuscript_segments WHERE manuscript_id = ?"
+                " ORDER BY idx",
+                (manuscript_id,),
+            ).fetchall()
+        return [row["hash"] for row in rows]
+
+    def delete_manuscript(self, manuscript_id: str):
+        with self._lock, self._conn:
+            for table, column in (
+                ("manuscript_segments", "manuscript_id"),
+                ("manuscript_chapters", "manuscript_id"),
+                ("manuscripts", "id"),
+            ):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE {column} = ?", (manuscript_id,)
+                )
+
+    def expired_ids(self, older_than: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM manuscripts WHERE created_at < ?", (older_than,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+
+class ManuscriptService:
+    """Parses uploads of any size into a stored, paged manuscript.
+
+    Segments are written to the store as the upload is parsed and served
+    back a page at a time, so neither the server nor the client has to
+    hold a whole book. "# Title" lines split the book into chapters, each
+    with a summary of who speaks in it; text before the first heading is
+    chapter 0 with no title.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ManuscriptStore] = None,
+        page_size: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.store = store or ManuscriptStore(
+            os.environ.get("MANUSCRIPTS_DB_PATH")
+            or os.path.join(tempfile.gettempdir(), "etoaudiobook-manuscripts.sqlite3")
+        )
+        self.page_size = page_size or int(
+            os.environ.get("MANUSCRIPT_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+        )
+        self.ttl_seconds = ttl_seconds or int(
+            os.environ.get("MANUSCRIPT_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+        )
+
+    def ingest(self, stream: BinaryIO) -> Optional[str]:
+        """Parse and store an upload; returns its id, or None if it is empty.
+
+        Raises UnicodeDecodeError for input that is not valid UTF-8, in
+        which case nothing is kept.
+        """
+        self.purge_expired()
+        manuscript_id = uuid.uuid4().hex
+        blocks = SegmentStream(stream, max_chars=None, chapters=True)
+        roles: Dict[str, None] = {}
+        chapters = [_new_chapter(0, None, 0)]
+        rows: List[tuple] = []
+        total = 0
+
+        try:
+            for role, text in blocks:
+                if role is None:
+                    if chapters[-1]["segmentCount"] or chapters[-1]["title"]:
+                        chapters.append(_new_chapter(len(chapters), text, total))
+                    else:
+                        chapters[-1]["title"] = text
+                    continue
+                roles[role] = None
+                if not text:
+                    continue
+                chapter = chapters[-1]
+                chapter["segmentCount"] += 1
+                chapter["characters"] += len(text)
+                chapter["roles"][role] = chapter["roles"].get(role, 0) + 1
+                rows.append(
+                    (
+                        total,
+                        chapter["index"],
+                        role,
+                        text,
+                        ContentParser.segment_hash(role, text),
+                    )
+                )
+                total += 1
+                if len(rows) >= INSERT_BATCH:
+                    self.store.add_segments(manuscript_id, rows)
+                    rows = []
+            if rows:
+                self.store.add_segments(manuscript_id, rows)
+        except Exception:
+            self.store.delete_manuscript(manuscript_id)
+            raise
+
+        if not blocks.chars:
+            self.store.delete_manuscript(manuscript_id)
+            return None
+
+        self.store.finish_manuscript(
+            manuscript_id, list(roles), chapters, total, blocks.chars
+        )
+        logger.info(
+            f"Stored manuscript {manuscript_id}: {total} segments"
+            f" in {len(chapters)} chapters"
+        )
+        return manuscript_id
+
+    def get_summary(self, manuscript_id: str) -> Optional[Dict]:
+        manuscript = self.store.get_manuscript(manuscript_id)
+        if manuscript is None:
+            return None
+        return {
+            "manuscriptId": manuscript["id"],
+            "roles": manuscript["roles"],
+            "totalSegments": manuscript["total_segments"],
+            "totalCharacters": manuscript["total_chars"],
+            "chapters": [
+                {
+                    "index": chapter["idx"],
+                    "title": chapter["title"],
+                    "firstSegment": chapter["first_segment"],
+                    "segmentCount": chapter["segment_count"],
+                    "characters": chapter["chars"],
+                    "roles": chapter["roles"],
+                }
+                for chapter in manuscript["chapters"]
+            ],
+        }
+
+    def get_page(
+        self,
+        manuscript_id: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        chapter: Optional[int] = None,
+    ) -> Dict:
+        """One page of segments and the cursor for the next, if any.
+
+        A cursor carries its chapter filter, so later pages need only the
+        cursor. Raises InvalidCursor for a cursor from another manuscript
+        or one that cannot be decoded.
+        """
+        after = -1
+        if cursor:
+            after, chapter = _decode_cursor(cursor, manuscript_id)
+        limit = max(1, min(limit or self.page_size, MAX_PAGE_SIZE))
+
+        # One extra row tells whether another page follows
+        rows = self.store.get_segments(manuscript_id, after, limit + 1, chapter)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(manuscript_id, rows[-1]["idx"], chapter)
+
+        return {
+            "segments": [
+                {
+                    "index": row["idx"],
+                    "chapter": row["chapter"],
+                    "role": row["role"],
+                    "text": row["text"],
+                    "hash": row["hash"],
+                }
+                for row in rows
+            ],
+            "nextCursor": next_cursor,
+        }
+
+    def diff(self, base_id: str, manuscript_id: str) -> Dict:
+        """Which segments of a revision are new compared with its base.
+
+        Segments are matched by content hash in order, so inserting or
+        deleting a paragraph does not mark everything after it as changed.
+        changed lists the revision's segment indexes that need synthesis.
+        """
+        base = self.store.get_hashes(base_id)
+        revision = self.store.get_hashes(manuscript_id)
+        matcher = SequenceMatcher(None, base, revision, autojunk=False)
+        changed = []
+        unchanged = 0
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                unchanged += i2 - i1
+            else:
+                changed.extend(range(j1, j2))
+        return {
+            "baseManuscriptId": base_id,
+            "unchanged": unchanged,
+            "changed": changed,
+            "removed": len(base) - unchanged,
+        }
+
+    def purge_expired(self):
+        for manuscript_id in self.store.expired_ids(time.time() - self.ttl_seconds):
+            self.store.delete_manuscript(manuscript_id)
+
+
+def _new_chapter(index: int, title: Optional[str], first_segment: int) -> Dict:
+    return {
+        "index": index,
+        "title": title,
+        "firstSegment": first_segment,
+        "segmentCount": 0,
+        "characters": 0,
+        "roles": {},
+    }
+
+
+def _encode_cursor(manuscript_id: str, after: int, chapter: Optional[int]) -> str:
+    payload = json.dumps({"m": manuscript_id, "a": after, "c": chapter})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, manuscript_id: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        after, chapter = int(payload["a"]), payload["c"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if payload.get("m") != manuscript_id:
+        raise InvalidCursor("Cursor belongs to another manuscript")
+    return after, chapter
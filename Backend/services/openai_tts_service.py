@@ -40,6 +40,10 @@ class OpenAITTSService:
         ]
     
     def synthesize_speech(self, text, voice_name):
+        audio_content = self.synthesize_audio(text, voice_name)
+        return base64.b64encode(audio_content).decode("utf-8")
+
+    def synthesize_audio(self, text, voice_name) -> bytes:
         if not self.client:
             raise Exception("OpenAI API key not configured")
             
@@ -52,4 +56,4 @@ class OpenAITTSService:
             input=text
         )
         
-        return base64.b64encode(response.content).decode("utf-8")
\ No newline at end of file
+        return response.content
\ No newline at end of file
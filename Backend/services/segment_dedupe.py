@@ -0,0 +1,61 @@
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+SynthesisRequest = Tuple[str, str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used both to match repeats and to synthesize them."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class DedupePlan:
+    """Maps each segment of a request to a unique synthesis request.
+
+    Built before anything is dispatched: identical (normalized text, voice,
+    language) tuples share the first occurrence's synthesis, which is kept
+    only until its last repeat has been handed out.
+    """
+
+    def __init__(
+        self,
+        segments: List[Dict],
+        resolve: Callable[[Dict], SynthesisRequest],
+    ):
+        self.requests: List[Optional[SynthesisRequest]] = []
+        self.errors: List[Optional[str]] = []
+        self.last_index: Dict[SynthesisRequest, int] = {}
+        first_seen = set()
+        self.calls_saved = 0
+        self.chars_saved = 0
+
+        for index, segment in enumerate(segments):
+            try:
+                text, voice_name, language_code = resolve(segment)
+            except ValueError as e:
+                self.requests.append(None)
+                self.errors.append(str(e))
+                continue
+
+            request = (normalize_text(text), voice_name, language_code)
+            self.requests.append(request)
+            self.errors.append(None)
+            self.last_index[request] = index
+            if request in first_seen:
+                self.calls_saved += 1
+                self.chars_saved += len(request[0])
+            else:
+                first_seen.add(request)
+
+        self.unique = len(first_seen)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self.requests),
+            "uniqueSegments": self.unique,
+            "callsSaved": self.calls_saved,
+            "charactersSaved": self.chars_saved,
+        }
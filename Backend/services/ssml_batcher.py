@@ -0,0 +1,86 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# Bytes each segment adds to the SSML besides its text
+_MARKUP_BYTES = len('<mark name="s000"/><break time="000ms"/>')
+DEFAULT_PAUSE_MS = 250
+
+BatchKey = Tuple[str, str]
+BatchItem = Tuple[str, Future]
+
+
+def mark_name(position: int) -> str:
+    return f"s{position}"
+
+
+def build_marked_ssml(texts: Sequence[str], pause_ms: int = DEFAULT_PAUSE_MS) -> str:
+    """One SSML document with a <mark> before each text.
+
+    A short break separates the lines so they are not read as one
+    sentence; the break ends up at the tail of the earlier clip.
+    """
+    parts = ["<speak>"]
+    for position, text in enumerate(texts):
+        if position:
+            parts.append(f'<break time="{pause_ms}ms"/>')
+        parts.append(f'<mark name="{mark_name(position)}"/>{escape(text)}')
+    parts.append("</speak>")
+    return "".join(parts)
+
+
+class SegmentBatcher:
+    """Groups short synthesis requests by voice into SSML batches.
+
+    add() returns a Future for the request's clip right away; the batch is
+    handed to submit_batch once it reaches max_segments or max_bytes, or
+    when the caller needs one of its results.
+    """
+
+    def __init__(
+        self,
+        submit_batch: Callable[[str, str, List[BatchItem]], None],
+        max_segments: int,
+        max_bytes: int,
+    ):
+        self._submit_batch = submit_batch
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self._open: Dict[BatchKey, List[BatchItem]] = {}
+        self._sizes: Dict[BatchKey, int] = {}
+        self._batch_of: Dict[Future, BatchKey] = {}
+        self.batches = 0
+
+    def add(self, text: str, voice_name: str, language_code: str) -> Future:
+        key = (voice_name, language_code)
+        size = len(escape(text).encode("utf-8")) + _MARKUP_BYTES
+        if key in self._open and self._sizes[key] + size > self.max_bytes:
+            self._flush(key)
+
+        future = Future()
+        self._open.setdefault(key, []).append((text, future))
+        self._sizes[key] = self._sizes.get(key, len("<speak></speak>")) + size
+        self._batch_of[future] = key
+        if len(self._open[key]) >= self.max_segments:
+            self._flush(key)
+        return future
+
+    def flush_pending(self, future: Future):
+        """Submit the batch holding future, if it has not been sent yet."""
+        key = self._batch_of.get(future)
+        if key is not None:
+            self._flush(key)
+
+    def flush(self):
+        for key in list(self._open):
+            self._flush(key)
+
+    def _flush(self, key: BatchKey):
+        items = self._open.pop(key, None)
+        self._sizes.pop(key, None)
+        if not items:
+            return
+        for _, future in items:
+            self._batch_of.pop(future, None)
+        self.batches += 1
+        self._submit_batch(key[0], key[1], items)
@@ -0,0 +1,99 @@
+import os
+import re
+from typing import Iterator, List
+
+# Google TTS rejects SynthesisInput text over 5000 bytes; keep some headroom
+DEFAULT_MAX_BYTES = int(os.environ.get("TTS_CHUNK_MAX_BYTES", "4500"))
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])[\"')\]”’]*\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _byte_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _hard_split(text: str, max_bytes: int) -> Iterator[str]:
+    """Split a single oversized word on UTF-8 character boundaries."""
+    encoded = text.encode("utf-8")
+    while encoded:
+        piece = encoded[:max_bytes].decode("utf-8", errors="ignore")
+        if not piece:
+            # Budget smaller than one character; emit the character anyway
+            piece = encoded.decode("utf-8")[0]
+        yield piece
+        encoded = encoded[len(piece.encode("utf-8")) :]
+
+
+def _split_words(sentence: str, max_bytes: int) -> Iterator[str]:
+    for word in _WHITESPACE.split(sentence):
+        if not word:
+            continue
+        if _byte_len(word) > max_bytes:
+            yield from _hard_split(word, max_bytes)
+        else:
+            yield word
+
+
+def _pack(units: List[str], separator: str, max_bytes: int) -> List[str]:
+    """Greedily join units into pieces no larger than max_bytes."""
+    pieces = []
+    current: List[str] = []
+    current_bytes = 0
+    sep_bytes = _byte_len(separator)
+
+    for unit in units:
+        unit_bytes = _byte_len(unit)
+        added = unit_bytes + (sep_bytes if current else 0)
+        if current and current_bytes + added > max_bytes:
+            pieces.append(separator.join(current))
+            current, current_bytes = [], 0
+            added = unit_bytes
+        current.append(unit)
+        current_bytes += added
+
+    if current:
+        pieces.append(separator.join(current))
+    return pieces
+
+
+def _split_paragraph(paragraph: str, max_bytes: int) -> List[str]:
+    if _byte_len(paragraph) <= max_bytes:
+        return [paragraph]
+
+    sentences = []
+    for sentence in _SENTENCE_BREAK.split(paragraph):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if _byte_len(sentence) <= max_bytes:
+            sentences.append(sentence)
+        else:
+            sentences.extend(
+                _pack(list(_split_words(sentence, max_bytes)), " ", max_bytes)
+            )
+    return _pack(sentences, " ", max_bytes)
+
+
+def chunk_text(text: str, max_bytes: int = DEFAULT_MAX_BYTES) -> List[str]:
+    """Split text into chunks under max_bytes of UTF-8.
+
+    Paragraph boundaries are preferred, then sentence ends, then spaces;
+    only a single word longer than the budget is cut mid-word.
+    """
+    if max_bytes <= 0:
+        raise ValueError("max_bytes must be positive")
+
+    text = text.strip()
+    if not text:
+        return []
+    if _byte_len(text) <= max_bytes:
+        return [text]
+
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            units.extend(_split_paragraph(paragraph, max_bytes))
+    return _pack(units, "\n\n", max_bytes)
@@ -0,0 +1,186 @@
+import itertools
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from google.cloud import texttospeech, texttospeech_v1beta1
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import (
+    TextToSpeechGrpcTransport,
+)
+from google.cloud.texttospeech_v1beta1.services.text_to_speech.transports import (
+    TextToSpeechGrpcTransport as BetaTextToSpeechGrpcTransport,
+)
+from google.oauth2 import service_account
+
+try:
+    from core.credentials import get_credentials
+except ImportError:
+    try:
+        from credentials import get_credentials
+    except ImportError:
+        get_credentials = None
+
+logger = logging.getLogger(__name__)
+
+API_HOST = "texttospeech.googleapis.com"
+DEFAULT_CHANNELS = 4
+# Long-form MP3 responses can exceed gRPC's 4MB receive default
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_send_message_length", MAX_MESSAGE_BYTES),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_BYTES),
+    # Give each channel its own connection instead of one shared subchannel
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
+
+class TTSClientPool:
+    """Round-robins calls over several clients, one gRPC channel each.
+
+    Exposes the TextToSpeechClient methods the app uses, so it can stand in
+    wherever a single client was used before.
+    """
+
+    def __init__(self, clients: List):
+        if not clients:
+            raise ValueError("TTSClientPool needs at least one client")
+        self._clients = list(clients)
+        self._next = itertools.count()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _pick(self):
+        return self._clients[next(self._next) % len(self._clients)]
+
+    def synthesize_speech(self, *args, **kwargs):
+        return self._pick().synthesize_speech(*args, **kwargs)
+
+    def list_voices(self, *args, **kwargs):
+        return self._pick().list_voices(*args, **kwargs)
+
+    def warmup(self, timeout: float = 10):
+        """Open every channel and complete auth with a cheap call each."""
+        for client in self._clients:
+            client.list_voices(language_code="en-US", timeout=timeout)
+
+
+def _load_credentials():
+    """Service account credentials, or None to fall back to ADC.
+
+    Raises when the credentials helper exists but fails, matching the
+    previous behaviour of running on mock data in that case.
+    """
+    if get_credentials is None:
+        return None
+    creds = get_credentials()
+    if not creds:
+        return None
+    return service_account.Credentials.from_service_account_info(creds)
+
+
+def _create_client(credentials, beta: bool = False):
+    if beta:
+        transport_class = BetaTextToSpeechGrpcTransport
+        client_class = texttospeech_v1beta1.TextToSpeechClient
+    else:
+        transport_class = TextToSpeechGrpcTransport
+        client_class = texttospeech.TextToSpeechClient
+    channel = transport_class.create_channel(
+        API_HOST, credentials=credentials, options=CHANNEL_OPTIONS
+    )
+    transport = transport_class(host=API_HOST, channel=channel)
+    return client_class(transport=transport)
+
+
+def create_client_pool(
+    size: Optional[int] = None, beta: bool = False
+) -> Optional[TTSClientPool]:
+    size = size or int(os.environ.get("TTS_CHANNELS", DEFAULT_CHANNELS))
+    try:
+        credentials = _load_credentials()
+    except Exception as e:
+        logger.warning("Credentials helper failed: %s; falling back to mock", e)
+        return None
+
+    try:
+        pool = TTSClientPool([_create_client(credentials, beta) for _ in range(size)])
+    except Exception as e:
+        logger.error(f"Failed to initialize TTS client: {e}")
+        return None
+
+    source = "service account" if credentials is not None else "ADC"
+    api = "v1beta1" if beta else "v1"
+    logger.info(f"TTS {api} client pool initialized from {source} ({size} channels)")
+    return pool
+
+
+_pool: Optional[TTSClientPool] = None
+_beta_pool: Optional[TTSClientPool] = None
+_pool_lock = threading.Lock()
+_warmup_started = False
+
+
+def get_tts_client() -> Optional[TTSClientPool]:
+    """Return the process-wide client pool, creating it on first use.
+
+    Returns None when no client can be built; a later call tries again.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = create_client_pool()
+    return _pool
+
+
+def get_tts_beta_client() -> Optional[TTSClientPool]:
+    """Like get_tts_client, for v1beta1-only features such as timepoints."""
+    global _beta_pool
+    if _beta_pool is None:
+        with _pool_lock:
+            if _beta_pool is None:
+                _beta_pool = create_client_pool(
+                    int(os.environ.get("TTS_BETA_CHANNELS", "1")), beta=True
+                )
+    return _beta_pool
+
+
+def start_warmup():
+    """Build and warm the pool in the background, once per process."""
+    global _warmup_started
+    with _pool_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    threading.Thread(target=_warmup, name="tts-warmup", daemon=True).start()
+
+
+def _warmup():
+    client = get_tts_client()
+    if client is None:
+        return
+    try:
+        client.warmup()
+        logger.info("TTS channels warmed up")
+    except Exception as e:
+        logger.warning(f"TTS warmup failed: {e}")
+
+
+def _reset_after_fork():
+    # gRPC channels do not survive fork(); each worker builds its own
+    global _pool, _beta_pool, _pool_lock, _warmup_started
+    _pool = None
+    _beta_pool = None
+    _pool_lock = threading.Lock()
+    _warmup_started = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from google.api_core import exceptions
+
+from utils.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Google Cloud TTS default quotas per project
+DEFAULT_REQUESTS_PER_MINUTE = 1000
+DEFAULT_CHARS_PER_MINUTE = 150000
+# Bucket depth in seconds of quota; bounds how bursty a refill can be
+BURST_SECONDS = 5
+# AIMD: halve the rate on throttling, win it back a little per success
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.01
+MIN_SCALE = 0.05
+# Concurrent throttled calls report together; count them as one signal
+DECREASE_COOLDOWN = 1.0
+BUCKET_TTL = 3600
+
+# KEYS[1]: bucket hash. ARGV: requests/s, chars/s, burst seconds, chars.
+# Returns "wait_seconds scale"; a zero wait means the tokens were taken.
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'req', 'chars', 'ts', 'scale')
+local scale = tonumber(state[4]) or 1
+local req_rate = tonumber(ARGV[1]) * scale
+local char_rate = tonumber(ARGV[2]) * scale
+local req_cap = math.max(1, req_rate * tonumber(ARGV[3]))
+local char_cap = char_rate * tonumber(ARGV[3])
+local chars = math.min(tonumber(ARGV[4]), char_cap)
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local req = math.min(req_cap, (tonumber(state[1]) or req_cap) + elapsed * req_rate)
+local avail = math.min(char_cap, (tonumber(state[2]) or char_cap) + elapsed * char_rate)
+local wait = 0
+if req < 1 then wait = (1 - req) / req_rate end
+if avail < chars then wait = math.max(wait, (chars - avail) / char_rate) end
+if wait == 0 then
+    req = req - 1
+    avail = avail - chars
+end
+redis.call('HSET', KEYS[1], 'req', req, 'chars', avail, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return tostring(wait) .. ' ' .. tostring(scale)
+"""
+
+# KEYS[1]: bucket hash. ARGV: 'decrease' or 'increase', factor or step,
+# minimum scale, decrease cooldown. Returns the new scale.
+_ADJUST_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local scale = tonumber(redis.call('HGET', KEYS[1], 'scale')) or 1
+if ARGV[1] == 'decrease' then
+    local cut_at = tonumber(redis.call('HGET', KEYS[1], 'cut_at')) or 0
+    if now - cut_at >= tonumber(ARGV[4]) then
+        scale = math.max(tonumber(ARGV[3]), scale * tonumber(ARGV[2]))
+        redis.call('HSET', KEYS[1], 'scale', scale, 'cut_at', now)
+    end
+else
+    scale = math.min(1, scale + tonumber(ARGV[2]))
+    redis.call('HSET', KEYS[1], 'scale', scale)
+end
+return tostring(scale)
+"""
+
+
+class LocalBucket:
+    """In-process twin of the Redis scripts, used when Redis is unavailable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._req = None
+        self._chars = None
+        self._ts = None
+        self.scale = 1.0
+        self._cut_at = 0.0
+
+    def take(
+        self, req_rate: float, char_rate: float, burst: float, chars: int
+    ) -> Tuple[float, float]:
+        with self._lock:
+            now = time.monotonic()
+            req_rate *= self.scale
+            char_rate *= self.scale
+            req_cap = max(1.0, req_rate * burst)
+            char_cap = char_rate * burst
+            chars = min(chars, char_cap)
+            elapsed = max(0.0, now - (self._ts if self._ts is not None else now))
+            req = min(
+                req_cap,
+                (self._req if self._req is not None else req_cap) + elapsed * req_rate,
+            )
+            avail = min(
+                char_cap,
+                (self._chars if self._chars is not None else char_cap)
+                + elapsed * char_rate,
+            )
+            wait = 0.0
+            if req < 1:
+                wait = (1 - req) / req_rate
+            if avail < chars:
+                wait = max(wait, (chars - avail) / char_rate)
+            if wait == 0:
+                req -= 1
+                avail -= chars
+            self._req, self._chars, self._ts = req, avail, now
+            return wait, self.scale
+
+    def adjust(self, decrease: bool) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if decrease:
+                if now - self._cut_at >= DECREASE_COOLDOWN:
+                    self.scale = max(MIN_SCALE, self.scale * DECREASE_FACTOR)
+                    self._cut_at = now
+            else:
+                self.scale = min(1.0, self.scale + INCREASE_STEP)
+            return self.scale
+
+
+class AdaptiveRateLimiter:
+    """Token bucket over requests and characters with AIMD rate control.
+
+    Every synthesis call takes one request token and a token per character
+    before it is sent. The refill rate starts at the configured quota and
+    is halved whenever Google answers RESOURCE_EXHAUSTED, then recovers
+    additively with each success. With Redis the bucket and its rate live
+    in one hash updated by Lua scripts, so all workers draw from, and back
+    off on, the same budget; without it each process keeps its own.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        chars_per_minute: Optional[int] = None,
+        redis_client=None,
+        key: str = "tts:ratelimit",
+        is_available: Optional[Callable[[], bool]] = None,
+    ):
+        self.requests_per_minute = requests_per_minute or int(
+            os.environ.get("TTS_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)
+        )
+        self.chars_per_minute = chars_per_minute or int(
+            os.environ.get("TTS_CHARS_PER_MINUTE", DEFAULT_CHARS_PER_MINUTE)
+        )
+        self.key = key
+        self.redis_client = redis_client
+        # Lets the cache's circuit breaker skip Redis during an outage
+        self._is_available = is_available or (lambda: True)
+        self._local = LocalBucket()
+        self._scale = 1.0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        if redis_client is not None:
+            self._take = redis_client.register_script(_TAKE_SCRIPT)
+            self._adjust = redis_client.register_script(_ADJUST_SCRIPT)
+
+    def _shared(self) -> bool:
+        return self.redis_client is not None and self._is_available()
+
+    def _take_tokens(self, chars: int) -> float:
+        req_rate = self.requests_per_minute / 60
+        char_rate = self.chars_per_minute / 60
+        if self._shared():
+            try:
+                reply = self._take(
+                    keys=[self.key],
+                    args=[req_rate, char_rate, BURST_SECONDS, chars, BUCKET_TTL],
+                )
+                wait, scale = (float(part) for part in reply.split())
+                self._scale = scale
+                return wait
+            except Exception as e:
+                logger.warning(f"Shared TTS rate limit unavailable, using local: {e}")
+        wait, self._scale = self._local.take(req_rate, char_rate, BURST_SECONDS, chars)
+        return wait
+
+    def _adjust_rate(self, decrease: bool):
+        if self._shared():
+            try:
+                if decrease:
+                    args = ["decrease", DECREASE_FACTOR, MIN_SCALE, DECREASE_COOLDOWN]
+                else:
+                    args = ["increase", INCREASE_STEP, MIN_SCALE, DECREASE_COOLDOWN]
+                self._scale = float(self._adjust(keys=[self.key], args=args))
+                return
+            except Exception as e:
+                logger.warning(f"Shared TTS rate limit unavailable, using local: {e}")
+        self._scale = self._local.adjust(decrease)
+
+    def acquire(self, chars: int, timeout: float):
+        """Block until the call may be sent, or raise ResourceExhausted.
+
+        Raising the same error as a server-side throttle lets the caller's
+        retry policy treat both alike.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take_tokens(chars)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise exceptions.ResourceExhausted(
+                    "Client-side TTS rate limit: no capacity before the deadline"
+                )
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def on_throttled(self):
+        self.throttled += 1
+        self._adjust_rate(decrease=True)
+        logger.warning(f"TTS quota exhausted, rate scaled to {self._scale:.2f}")
+
+    def on_success(self):
+        # Skip the round-trip while already at full rate
+        if self._scale < 1.0:
+            self._adjust_rate(decrease=False)
+
+    def get_stats(self):
+        return {
+            "requests_per_minute": self.requests_per_minute * self._scale,
+            "chars_per_minute": self.chars_per_minute * self._scale,
+            "scale": self._scale,
+            "throttled": self.throttled,
+            "waited_seconds": self.waited_seconds,
+            "shared": self._shared(),
+        }
+
+
+def create_rate_limiter() -> AdaptiveRateLimiter:
+    """Limiter sharing its bucket through the app's Redis cache connection."""
+    return AdaptiveRateLimiter(
+        redis_client=cache.redis_client, is_available=lambda: cache.enabled
+    )
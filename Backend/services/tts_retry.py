@@ -0,0 +1,169 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+from google.api_core import exceptions
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# gRPC status codes worth another attempt; anything else is a caller error
+RETRYABLE_ERRORS = (
+    exceptions.ServiceUnavailable,  # UNAVAILABLE
+    exceptions.DeadlineExceeded,  # DEADLINE_EXCEEDED
+    exceptions.ResourceExhausted,  # RESOURCE_EXHAUSTED
+    exceptions.InternalServerError,  # INTERNAL
+    exceptions.Aborted,  # ABORTED
+    exceptions.Unknown,  # UNKNOWN, e.g. connection reset mid-call
+)
+
+DEFAULT_DEADLINE = 120.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_INITIAL_BACKOFF = 0.25
+DEFAULT_MAX_BACKOFF = 8.0
+# Hedging waits for enough samples before trusting the percentile
+MIN_HEDGE_SAMPLES = 20
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RetryPolicy:
+    """Runs a TTS call under one deadline shared by all of its attempts.
+
+    Retryable failures are retried with full-jitter exponential backoff
+    while the budget lasts; each attempt's gRPC timeout is whatever budget
+    remains. With hedging on, a duplicate request is sent once the first
+    has been outstanding longer than the observed p95 latency, and the
+    first success wins.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        hedge: Optional[bool] = None,
+        hedge_percentile: float = 0.95,
+    ):
+        self.deadline = deadline or float(
+            os.environ.get("TTS_DEADLINE_SECONDS", DEFAULT_DEADLINE)
+        )
+        self.max_attempts = max_attempts or int(
+            os.environ.get("TTS_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+        )
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        if hedge is None:
+            hedge = os.environ.get("TTS_HEDGING", "false").lower() == "true"
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def call(self, fn: Callable[[float], T]) -> T:
+        """Call fn(timeout) until it succeeds, fails permanently or runs out."""
+        expires_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = expires_at - time.monotonic()
+            try:
+                return self._attempt(fn, remaining)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                backoff = random.uniform(
+                    0, min(self.max_backoff, self.initial_backoff * 2 ** (attempt - 1))
+                )
+                if time.monotonic() + backoff >= expires_at:
+                    logger.warning(f"TTS deadline exhausted after {attempt} attempts")
+                    raise
+                self.retries += 1
+                logger.warning(
+                    f"TTS attempt {attempt} failed ({type(e).__name__}), "
+                    f"retrying in {backoff:.2f}s"
+                )
+                time.sleep(backoff)
+
+    def _attempt(self, fn: Callable[[float], T], timeout: float) -> T:
+        delay = self.latency.percentile(self.hedge_percentile) if self.hedge else None
+        started = time.monotonic()
+        if delay is None or delay >= timeout:
+            result = fn(timeout)
+        else:
+            result = self._hedged(fn, timeout, delay)
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Separate from the synthesis pool: attempts are submitted from its
+        # worker threads, and waiting on the same pool could deadlock.
+        if self._hedge_executor is None:
+            with self._executor_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        thread_name_prefix="tts-hedge"
+                    )
+        return self._hedge_executor
+
+    def _hedged(self, fn: Callable[[float], T], timeout: float, delay: float) -> T:
+        executor = self._executor()
+        started = time.monotonic()
+        primary = executor.submit(fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedges_sent += 1
+        hedge = executor.submit(fn, timeout - (time.monotonic() - started))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def get_stats(self):
+        return {
+            "retries": self.retries,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "p95_seconds": self.latency.percentile(0.95),
+        }
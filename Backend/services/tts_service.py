@@ -1,65 +1,91 @@
 import asyncio
 import base64
-import concurrent.futures
 import json
 import logging
 import os
-from typing import Any, Dict, List
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from google.api_core import exceptions
 from google.cloud import texttospeech
-from google.oauth2 import service_account
 
-try:
-    from core.credentials import get_credentials
-except ImportError:
-    from credentials import get_credentials
+from services.segment_dedupe import DedupePlan
+from services.text_chunker import DEFAULT_MAX_BYTES, chunk_text
+from services.ssml_batcher import SegmentBatcher, build_marked_ssml, mark_name
+from services.tts_client import get_tts_beta_client, get_tts_client
+from services.tts_rate_limiter import create_rate_limiter
+from services.tts_retry import RetryPolicy
+from services.voice_catalog import VoiceCatalog
+from utils.audio_cache import audio_cache, audio_cache_key
+from utils.mp3 import join_clips, split_at_times
+from utils.voice_snapshot import VoiceSnapshot, VoiceSnapshotReader, write_snapshot
+from utils.worker_pool import get_pool_size, get_worker_pool, in_worker_thread
 
 logger = logging.getLogger(__name__)
 
 
 class TTSService:
-    def __init__(self, max_workers=4):
+    def __init__(
+        self,
+        executor=None,
+        cache=None,
+        max_input_bytes=DEFAULT_MAX_BYTES,
+        snapshot_reader=None,
+        retry_policy=None,
+        rate_limiter=None,
+        ssml_batching=None,
+    ):
         self._client = None
-        self.max_workers = max_workers
-        self._voices_cache = None
+        self._beta_client = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or create_rate_limiter()
+        self.max_input_bytes = max_input_bytes
+        self.audio_cache = cache if cache is not None else audio_cache
+        self.executor = executor if executor is not None else get_worker_pool()
+        self._voice_catalog = None
         self._cache_timestamp = None
         self._cache_ttl = 3600  # 1 hour
+        self._cache_retry = 60  # wait after a failed refresh
+        self._cache_expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+        # Voice list shared with other worker processes through a snapshot file
+        self._snapshot = snapshot_reader or VoiceSnapshotReader()
+        self._snapshot_version = None
+        self._snapshot_poll = 5
+        self._snapshot_checked_at = 0.0
+        # Pack short lines per voice into one SSML request (see ssml_batcher)
+        if ssml_batching is None:
+            ssml_batching = (
+                os.environ.get("TTS_SSML_BATCHING", "false").lower() == "true"
+            )
+        self.ssml_batching = ssml_batching
+        self.batch_max_segments = int(os.environ.get("TTS_BATCH_MAX_SEGMENTS", "20"))
+        self.batch_segment_max_chars = int(
+            os.environ.get("TTS_BATCH_SEGMENT_MAX_CHARS", "200")
+        )
 
     @property
     def client(self):
         if self._client is None:
             self._client = self._get_tts_client()
         return self._client
+
+    @property
+    def beta_client(self):
+        # v1beta1 is only needed for SSML mark timepoints
+        if self._beta_client is None:
+            self._beta_client = get_tts_beta_client()
+        return self._beta_client
     
     def _is_client_available(self):
         return self.client is not None
 
     def _get_tts_client(self):
-        try:
-            creds = get_credentials()
-            if creds:
-                credentials = service_account.Credentials.from_service_account_info(
-                    creds
-                )
-                # Add retry configuration for network issues
-                import google.api_core.retry as retry
-                client = texttospeech.TextToSpeechClient(
-                    credentials=credentials,
-                    client_options={"api_endpoint": "texttospeech.googleapis.com:443"}
-                )
-                logger.info("TTS client initialized from service account")
-                return client
-        except Exception as e:
-            logger.warning("Credentials helper failed: %s; falling back to mock", e)
-            return None
-
-        try:
-            client = texttospeech.TextToSpeechClient()
-            logger.info("TTS client initialized using ADC")
-            return client
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS client: {e}")
-            return None
+        # Shared by every service instance in the process
+        return get_tts_client()
 
     def list_voices(
         self,
@@ -71,64 +97,141 @@ class TTSService:
         language_filter: str = None
     ):
         try:
-            # Check if client is available
-            if not self._is_client_available():
-                logger.warning("TTS client not available, using mock voices")
+            catalog = self._get_voice_catalog()
+            if catalog is None:
+                logger.warning("No voice catalog available, using mock voices")
                 return self._get_mock_voices(language or language_filter)
-            
-            # Check cache first
-            import time
-            current_time = time.time()
-            if (self._voices_cache is None or 
-                self._cache_timestamp is None or 
-                current_time - self._cache_timestamp > self._cache_ttl):
-                
-                try:
-                    # Fetch only English voices from Google Cloud TTS API
-                    response = self.client.list_voices(language_code="en", timeout=10)
-                    english_voices = [self._process_voice(voice) for voice in response.voices 
-                                    if any("en" in code for code in voice.language_codes)]
-                    self._voices_cache = english_voices
-                    self._cache_timestamp = current_time
-                    logger.info(f"Fetched {len(self._voices_cache)} English voices from TTS API")
-                except Exception as api_error:
-                    logger.error(f"TTS API call failed: {api_error}")
-                    return self._get_mock_voices("en")
-            
-            voices = self._voices_cache.copy()
-            
-            # Apply filters (voices are already English-only)
-            if gender:
-                voices = [v for v in voices if v["ssml_gender"].upper() == gender.upper()]
-            
-            if q:
-                voices = [v for v in voices if q.lower() in v["name"].lower()]
-            
-            # Apply pagination
-            start = (page - 1) * per_page
-            end = start + per_page
-            return voices[start:end]
+
+            # Filters and pagination are index lookups on the shared catalog
+            # (voices are already English-only)
+            return catalog.query(
+                filters={"gender": gender}, q=q, page=page, per_page=per_page
+            )
             
         except Exception as e:
             logger.error(f"Error fetching voices: {e}")
             return self._get_mock_voices("en")
 
+    def _get_voice_catalog(self):
+        """Return the voice catalog, refreshing it stale-while-revalidate.
+
+        Only one refresh runs per process. Once a catalog has loaded,
+        callers keep getting it while a background thread refreshes it, and
+        a failed refresh keeps the last good catalog instead of mock voices.
+        """
+        catalog = self._voice_catalog
+        if catalog is None:
+            # Cold start: one caller fetches while the others wait for it
+            with self._refresh_lock:
+                if self._voice_catalog is None and time.time() >= self._cache_expires_at:
+                    self._refresh_voice_catalog()
+            return self._voice_catalog
+
+        now = time.time()
+        stale = now >= self._cache_expires_at
+        if not stale and now - self._snapshot_checked_at >= self._snapshot_poll:
+            # Another worker may have published a newer snapshot
+            self._snapshot_checked_at = now
+            stale = self._snapshot.changed()
+
+        if stale and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._background_refresh, name="voice-refresh", daemon=True
+            ).start()
+        return catalog
+
+    def _background_refresh(self):
+        try:
+            self._refresh_voice_catalog()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_voice_catalog(self):
+        """Load voices into a new catalog; on failure keep the last good one.
+
+        A fresh snapshot published by any worker (or the scheduled seeder)
+        is used as-is; the API is only called when the snapshot is missing
+        or older than the cache TTL, and the result is published for the
+        other workers.
+        """
+        now = time.time()
+        snapshot = self._snapshot.load()
+        if snapshot is not None and now - snapshot.created_at < self._cache_ttl:
+            self._use_snapshot(snapshot, now)
+            return
+
+        try:
+            if not self._is_client_available():
+                raise Exception("TTS client not available")
+
+            response = self.client.list_voices(language_code="en", timeout=10)
+            voices = [self._process_voice(voice) for voice in response.voices]
+        except Exception as api_error:
+            logger.error(f"TTS API call failed: {api_error}")
+            self._cache_expires_at = now + self._cache_retry * random.uniform(0.5, 1.5)
+            if self._voice_catalog is None and snapshot is not None:
+                # An outdated snapshot still beats mock voices
+                self._use_snapshot(snapshot, now, expires_at=self._cache_expires_at)
+            return
+
+        version = time.time_ns()
+        self._use_snapshot(VoiceSnapshot(version, now, voices), now)
+        logger.info(f"Fetched {len(self._voice_catalog)} English voices from TTS API")
+        try:
+            write_snapshot(voices, self._snapshot.path, version=version)
+        except Exception as e:
+            # Other workers fetch their own; this one keeps what it fetched
+            logger.error(f"Could not publish voice snapshot {self._snapshot.path}: {e}")
+
+    def _use_snapshot(self, snapshot, now, expires_at=None):
+        if snapshot.version != self._snapshot_version:
+            # Only English voices are served
+            english_voices = [
+                voice
+                for voice in snapshot.voices
+                if any("en" in code for code in voice["language_codes"])
+            ]
+            self._voice_catalog = VoiceCatalog(english_voices)
+            self._snapshot_version = snapshot.version
+            self._cache_timestamp = snapshot.created_at
+        if expires_at is None:
+            # Jitter keeps workers that started together from refreshing together
+            expires_at = snapshot.created_at + self._cache_ttl * random.uniform(
+                0.9, 1.1
+            )
+        self._cache_expires_at = expires_at
+        self._snapshot_checked_at = now
+
+    @staticmethod
+    def _fix_voice(voice_name, language_code):
+        """Validate and fix the voice/language combination."""
+        if not voice_name or "Standard" not in voice_name:
+            return "en-US-Standard-A", "en-US"
+        return voice_name, language_code or "en-US"
+
     def synthesize_speech(self, text, voice_name, language_code):
+        audio_content = self.synthesize_audio(text, voice_name, language_code)
+        return base64.b64encode(audio_content).decode("utf-8")
+
+    def synthesize_audio(self, text, voice_name, language_code) -> bytes:
+        """Synthesize MP3 bytes, served from the audio cache when possible."""
         try:
+            voice_name, language_code = self._fix_voice(voice_name, language_code)
+
+            if len(text.encode("utf-8")) > self.max_input_bytes:
+                return self._synthesize_chunked(text, voice_name, language_code)
+
+            cache_key = audio_cache_key(text, voice_name, language_code, "MP3")
+            cached_audio = self.audio_cache.get(cache_key)
+            if cached_audio is not None:
+                return cached_audio
+
             if not self._is_client_available():
                 logger.error("TTS client not available for synthesis")
                 raise Exception("TTS service unavailable")
             
             synthesis_input = texttospeech.SynthesisInput(text=text)
 
-            # Validate and fix voice/language combination
-            if not voice_name or "Standard" not in voice_name:
-                voice_name = "en-US-Standard-A"
-                language_code = "en-US"
-            
-            if not language_code:
-                language_code = "en-US"
-
             voice = texttospeech.VoiceSelectionParams(
                 name=voice_name, language_code=language_code
             )
@@ -136,18 +239,141 @@ class TTSService:
                 audio_encoding=texttospeech.AudioEncoding.MP3
             )
 
-            response = self.client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config,
-                timeout=30
+            response = self.retry_policy.call(
+                lambda timeout: self._rate_limited_synthesis(
+                    len(text),
+                    timeout,
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config,
+                )
             )
 
-            return base64.b64encode(response.audio_content).decode("utf-8")
+            self.audio_cache.set(cache_key, response.audio_content)
+            return response.audio_content
         except Exception as e:
             logger.error(f"TTS synthesis error: {e}")
             raise
 
+    def _rate_limited_synthesis(self, chars, timeout, client=None, **request):
+        """One API attempt, admitted by the quota limiter and feeding it back."""
+        started = time.monotonic()
+        self.rate_limiter.acquire(chars, timeout)
+        try:
+            response = (client or self.client).synthesize_speech(
+                timeout=timeout - (time.monotonic() - started), **request
+            )
+        except exceptions.ResourceExhausted:
+            self.rate_limiter.on_throttled()
+            raise
+        self.rate_limiter.on_success()
+        return response
+
+    def synthesize_batch(self, texts, voice_name, language_code) -> List[bytes]:
+        """Synthesize several short texts in one voice with a single request.
+
+        The texts are joined into SSML with a <mark> before each; the mark
+        timepoints returned by v1beta1 say where to cut the MP3 back into
+        one clip per text. Cached texts are left out of the request.
+        """
+        voice_name, language_code = self._fix_voice(voice_name, language_code)
+        keys = [audio_cache_key(t, voice_name, language_code, "MP3") for t in texts]
+        clips = [self.audio_cache.get(key) for key in keys]
+        missing = [i for i, clip in enumerate(clips) if clip is None]
+        if not missing:
+            return clips
+
+        client = self.beta_client
+        if client is None:
+            raise Exception("TTS service unavailable")
+
+        ssml = build_marked_ssml([texts[i] for i in missing])
+        response = self.retry_policy.call(
+            lambda timeout: self._rate_limited_synthesis(
+                len(ssml),
+                timeout,
+                client=client,
+                request={
+                    "input": {"ssml": ssml},
+                    "voice": {"name": voice_name, "language_code": language_code},
+                    "audio_config": {"audio_encoding": "MP3"},
+                    "enable_time_pointing": ["SSML_MARK"],
+                },
+            )
+        )
+
+        marks = {tp.mark_name: tp.time_seconds for tp in response.timepoints}
+        try:
+            cuts = [marks[mark_name(n)] for n in range(1, len(missing))]
+        except KeyError as e:
+            raise ValueError(f"SSML batch is missing timepoint {e}")
+        pieces = split_at_times(response.audio_content, cuts)
+        if not all(pieces):
+            raise ValueError("SSML batch produced an empty clip")
+
+        for i, piece in zip(missing, pieces):
+            clips[i] = piece
+            self.audio_cache.set(keys[i], piece)
+        return clips
+
+    def _run_batch(self, voice_name, language_code, items, binary):
+        texts = [text for text, _ in items]
+        try:
+            clips = self.synthesize_batch(texts, voice_name, language_code)
+        except Exception as e:
+            logger.warning(
+                f"SSML batch of {len(texts)} segments failed, "
+                f"synthesizing them separately: {e}"
+            )
+            clips = [None] * len(items)
+
+        for (text, future), clip in zip(items, clips):
+            try:
+                if clip is None:
+                    clip = self.synthesize_audio(text, voice_name, language_code)
+                future.set_result(
+                    clip if binary else base64.b64encode(clip).decode("utf-8")
+                )
+            except Exception as e:
+                future.set_exception(e)
+
+    def _new_batcher(self, binary) -> SegmentBatcher:
+        def submit_batch(voice_name, language_code, items):
+            self.executor.submit(
+                self._run_batch, voice_name, language_code, items, binary
+            )
+
+        return SegmentBatcher(
+            submit_batch, self.batch_max_segments, self.max_input_bytes
+        )
+
+    def _synthesize_chunked(self, text, voice_name, language_code) -> bytes:
+        """Synthesize text over the request limit as concurrent chunks.
+
+        Each chunk is cached on its own, so editing one paragraph of a long
+        text only re-synthesizes the chunk containing it.
+        """
+        chunks = chunk_text(text, self.max_input_bytes)
+        logger.info(f"Splitting {len(text)} characters into {len(chunks)} chunks")
+
+        if in_worker_thread():
+            # Already on the pool (e.g. one segment of /api/synthesize)
+            parts = [
+                self.synthesize_audio(chunk, voice_name, language_code)
+                for chunk in chunks
+            ]
+        else:
+            futures = [
+                self.executor.submit(
+                    self.synthesize_audio, chunk, voice_name, language_code
+                )
+                for chunk in chunks
+            ]
+            parts = [future.result() for future in futures]
+
+        # Frames are joined as they are; any per-chunk header is dropped
+        return join_clips(parts)
+
     def _process_voice(self, voice):
         return {
             "name": voice.name,
@@ -192,50 +418,170 @@ class TTSService:
             ]
         return all_mock_voices
 
-    async def process_segments_async(
+    def _resolve_segment(
+        self, segment: Dict, voice_mapping: Dict[str, Any]
+    ) -> Tuple[str, str, str]:
+        """Return (text, voice_name, language_code) or raise ValueError."""
+        role = segment.get("role", "")
+        text = segment.get("text", "")
+
+        if not role or not text:
+            raise ValueError("Segment requires role and text")
+        if role not in voice_mapping:
+            raise ValueError(f"No voice mapped for role {role}")
+
+        voice_info = voice_mapping[role]
+        voice_name = voice_info.get("voiceName")
+        language_code = voice_info.get("languageCode")
+
+        if not voice_name or not language_code:
+            raise ValueError(f"Incomplete voice mapping for role {role}")
+
+        return text, voice_name, language_code
+
+    def plan_segments(
         self, segments: List[Dict], voice_mapping: Dict[str, Any]
+    ) -> DedupePlan:
+        """Resolve segments and collapse repeats before any synthesis."""
+        return DedupePlan(
+            segments, lambda segment: self._resolve_segment(segment, voice_mapping)
+        )
+
+    def synthesize_segments(
+        self,
+        segments: List[Dict],
+        voice_mapping: Dict[str, Any],
+        binary=False,
+        plan: Optional[DedupePlan] = None,
     ) -> List[Dict]:
-        """Process multiple audio segments concurrently"""
-        loop = asyncio.get_event_loop()
+        """Synthesize segments concurrently on the shared worker pool.
 
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.max_workers
-        ) as executor:
-            tasks = []
+        Returns one result per input segment, in input order. Each result
+        carries either "audio" (base64, or raw bytes when binary) or "error".
+        """
+        return list(
+            self.iter_synthesized_segments(
+                segments, voice_mapping, binary=binary, plan=plan
+            )
+        )
 
-            for segment in segments:
-                role = segment.get("role", "")
-                text = segment.get("text", "")
+    def iter_synthesized_segments(
+        self,
+        segments: List[Dict],
+        voice_mapping: Dict[str, Any],
+        max_in_flight: Optional[int] = None,
+        binary=False,
+        plan: Optional[DedupePlan] = None,
+    ) -> Iterator[Dict]:
+        """Yield segment results in input order as soon as each is ready.
 
-                if not role or not text or role not in voice_mapping:
-                    continue
+        At most max_in_flight segments are queued or held at once, so memory
+        stays flat regardless of how many segments the book has. Repeated
+        lines are synthesized once (see DedupePlan) and fanned back out.
+        """
+        synthesize = self.synthesize_audio if binary else self.synthesize_speech
+        plan = plan or self.plan_segments(segments, voice_mapping)
+        batcher = self._new_batcher(binary) if self.ssml_batching else None
+        if max_in_flight is None:
+            max_in_flight = get_pool_size() * 2
+            if batcher is not None:
+                # Look far enough ahead to fill batches for every voice
+                max_in_flight *= self.batch_max_segments
+        shared = {}
+        pending = deque()
 
-                voice_info = voice_mapping[role]
-                voice_name = voice_info.get("voiceName")
-                language_code = voice_info.get("languageCode")
+        for index, segment in enumerate(segments):
+            pending.append(
+                self._submit_segment(
+                    index, segment, plan, shared, synthesize, batcher
+                )
+            )
+            if len(pending) >= max_in_flight:
+                yield self._collect_next(pending, batcher)
 
-                if not voice_name or not language_code:
-                    continue
+        while pending:
+            yield self._collect_next(pending, batcher)
 
-                task = loop.run_in_executor(
-                    executor,
-                    self.synthesize_speech,
-                    text,
-                    voice_name,
-                    language_code,
+    def _submit_segment(
+        self,
+        index: int,
+        segment: Dict,
+        plan: DedupePlan,
+        shared: Dict,
+        synthesize,
+        batcher: Optional[SegmentBatcher] = None,
+    ):
+        request = plan.requests[index]
+        if request is None:
+            return index, segment, None, plan.errors[index]
+
+        future = shared.get(request)
+        if future is None:
+            if batcher is not None and len(request[0]) <= self.batch_segment_max_chars:
+                future = batcher.add(*request)
+            else:
+                future = self.executor.submit(synthesize, *request)
+        # Hold the shared future only until its last repeat is submitted
+        if plan.last_index[request] > index:
+            shared[request] = future
+        else:
+            shared.pop(request, None)
+        return index, segment, future, None
+
+    def _collect_next(self, pending: deque, batcher: Optional[SegmentBatcher]):
+        index, segment, future, error = pending.popleft()
+        if batcher is not None and future is not None:
+            # Never wait on a batch that is still collecting segments
+            batcher.flush_pending(future)
+        return self._collect_segment(index, segment, future, error)
+
+    def _collect_segment(self, index: int, segment: Dict, future, error) -> Dict:
+        result = {
+            "index": index,
+            "role": segment.get("role", ""),
+            "text": segment.get("text", ""),
+        }
+        if future is not None:
+            try:
+                result["audio"] = future.result()
+            except Exception as e:
+                logger.error(f"Error synthesizing segment {index}: {e}")
+                error = str(e)
+        if error:
+            result["error"] = error
+        return result
+
+    async def process_segments_async(
+        self, segments: List[Dict], voice_mapping: Dict[str, Any]
+    ) -> List[Dict]:
+        """Process multiple audio segments concurrently"""
+        indexed_tasks = []
+
+        for index, segment in enumerate(segments):
+            try:
+                text, voice_name, language_code = self._resolve_segment(
+                    segment, voice_mapping
                 )
-                tasks.append(task)
+            except ValueError:
+                continue
+
+            future = self.executor.submit(
+                self.synthesize_speech, text, voice_name, language_code
+            )
+            indexed_tasks.append((index, asyncio.wrap_future(future)))
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(
+            *(task for _, task in indexed_tasks), return_exceptions=True
+        )
 
-            # Process results
-            audio_segments = []
-            for i, result in enumerate(results):
-                if isinstance(result, str):  # Base64 audio data
-                    segment = segments[i].copy()
-                    segment["audio"] = result
-                    audio_segments.append(segment)
-                elif isinstance(result, Exception):
-                    logger.error(f"Async processing error: {result}")
+        # Process results
+        audio_segments = []
+        for (index, _), result in zip(indexed_tasks, results):
+            if isinstance(result, str):  # Base64 audio data
+                segment = segments[index].copy()
+                segment["audio"] = result
+                audio_segments.append(segment)
+            elif isinstance(result, Exception):
+                logger.error(f"Async processing error: {result}")
 
-            return audio_segments
+        return audio_segments
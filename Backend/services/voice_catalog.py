@@ -0,0 +1,151 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from .voice_classifier import VoiceClassifier
+
+FACETS = (
+    "language",
+    "gender",
+    "region",
+    "quality",
+    "tone",
+    "age",
+    "use_case",
+    "character_theme",
+)
+MAX_GRAM = 3
+
+
+class VoiceRecord(dict):
+    """Read-only voice dict shared by every caller of a catalog."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("VoiceRecord is immutable")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return VoiceRecord({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _grams(text: str) -> Set[str]:
+    """All substrings of length 1..MAX_GRAM, so short queries hit the index."""
+    return {
+        text[i : i + n]
+        for n in range(1, MAX_GRAM + 1)
+        for i in range(len(text) - n + 1)
+    }
+
+
+class VoiceCatalog:
+    """Immutable voice list with inverted indexes for facets and search.
+
+    Built once per voice refresh. Facet filters become set intersections,
+    and search looks up the query's trigrams before checking candidates.
+    Voices carrying VoiceTagger "tags" are indexed on those tags; plain
+    voices are classified with VoiceClassifier.
+    """
+
+    def __init__(self, voices: Iterable[Dict]):
+        self._records = tuple(_freeze(voice) for voice in voices)
+        self._facets: Dict[str, Dict[str, FrozenSet[int]]] = {}
+        self._search_text: List[str] = []
+        grams: Dict[str, Set[int]] = {}
+        facets: Dict[str, Dict[str, Set[int]]] = {facet: {} for facet in FACETS}
+
+        for voice_id, record in enumerate(self._records):
+            tags = record.get("tags") or self._classify(record)
+            for facet in FACETS:
+                value = tags.get(facet)
+                if value is not None:
+                    facets[facet].setdefault(str(value).lower(), set()).add(voice_id)
+
+            text = (record.get("search_text") or record["name"]).lower()
+            self._search_text.append(text)
+            for gram in _grams(text):
+                grams.setdefault(gram, set()).add(voice_id)
+
+        self._facets = {
+            facet: {value: frozenset(ids) for value, ids in values.items()}
+            for facet, values in facets.items()
+        }
+        self._grams = {gram: frozenset(ids) for gram, ids in grams.items()}
+
+    def __len__(self):
+        return len(self._records)
+
+    @staticmethod
+    def _classify(record: Dict) -> Dict:
+        language_codes = record.get("language_codes") or ["unknown"]
+        return VoiceClassifier.classify_voice(
+            record["name"], language_codes[0], record.get("ssml_gender", "")
+        )
+
+    def facet_values(self, facet: str) -> List[str]:
+        return sorted(self._facets.get(facet, {}))
+
+    def query(
+        self,
+        filters: Optional[Dict[str, str]] = None,
+        q: Optional[str] = None,
+        page: int = 1,
+        per_page: Optional[int] = None,
+    ) -> List[VoiceRecord]:
+        """Return matching shared records in catalog order, optionally paged."""
+        ids = self._match(filters or {}, q)
+        if ids is None:
+            matches = self._records
+        else:
+            matches = tuple(self._records[voice_id] for voice_id in sorted(ids))
+
+        if per_page is None:
+            return list(matches)
+        start = (page - 1) * per_page
+        return list(matches[start : start + per_page])
+
+    def count(
+        self, filters: Optional[Dict[str, str]] = None, q: Optional[str] = None
+    ) -> int:
+        ids = self._match(filters or {}, q)
+        return len(self._records) if ids is None else len(ids)
+
+    def _match(self, filters: Dict[str, str], q: Optional[str]):
+        """Intersect index postings; None means every record matches."""
+        postings = []
+        for facet, value in filters.items():
+            if not value or facet not in self._facets:
+                continue
+            postings.append(self._facets[facet].get(str(value).lower(), frozenset()))
+
+        term = q.lower() if q else ""
+        if term:
+            if len(term) <= MAX_GRAM:
+                grams = {term}
+            else:
+                grams = {
+                    term[i : i + MAX_GRAM] for i in range(len(term) - MAX_GRAM + 1)
+                }
+            for gram in grams:
+                postings.append(self._grams.get(gram, frozenset()))
+
+        if not postings:
+            return None
+
+        postings.sort(key=len)
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            if not ids:
+                break
+            ids &= posting
+
+        if len(term) > MAX_GRAM:
+            ids = {voice_id for voice_id in ids if term in self._search_text[voice_id]}
+        return ids
@@ -1,4 +1,5 @@
 import json
+from .voice_catalog import VoiceCatalog
 from .voice_classifier import VoiceClassifier
 
 class VoiceTagger:
@@ -51,20 +52,21 @@ class VoiceTagger:
     
     @staticmethod
     def filter_voices(tagged_voices, filters=None):
-        """Filter voices by tags"""
-        if not filters:
+        """Filter voices by tags
+
+        Accepts a VoiceCatalog or a list; callers filtering the same voices
+        repeatedly should build the catalog once and pass it in.
+        """
+        if isinstance(tagged_voices, VoiceCatalog):
+            catalog = tagged_voices
+        elif not filters:
             return tagged_voices
-        
-        filtered = tagged_voices
-        
-        for key, value in filters.items():
-            if value and key in ['language', 'region', 'gender', 'quality', 'use_case', 'character_theme', 'tone', 'age']:
-                filtered = [v for v in filtered if v['tags'].get(key) == value]
-            elif key == 'search' and value:
-                search_term = value.lower()
-                filtered = [v for v in filtered if search_term in v['search_text']]
-        
-        return filtered
+        else:
+            catalog = VoiceCatalog(tagged_voices)
+
+        filters = filters or {}
+        facet_filters = {k: v for k, v in filters.items() if k != 'search'}
+        return catalog.query(filters=facet_filters, q=filters.get('search'))
     
     @staticmethod
     def get_filter_options(tagged_voices):
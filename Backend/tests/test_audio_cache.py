@@ -0,0 +1,116 @@
+import os
+from unittest.mock import Mock
+
+from utils.audio_cache import AudioCache, DiskAudioStore, audio_cache_key
+
+
+class TestAudioCacheKey:
+    def test_key_is_stable(self):
+        """Test identical inputs produce identical keys."""
+        assert audio_cache_key("Hello", "en-US-Standard-A", "en-US") == audio_cache_key(
+            "Hello", "en-US-Standard-A", "en-US"
+        )
+
+    def test_key_separates_fields(self):
+        """Test field boundaries are part of the key."""
+        assert audio_cache_key("ab", "c", "en-US") != audio_cache_key(
+            "a", "bc", "en-US"
+        )
+
+    def test_key_includes_encoding(self):
+        """Test audio encoding is part of the key."""
+        assert audio_cache_key("Hi", "v", "en-US", "MP3") != audio_cache_key(
+            "Hi", "v", "en-US", "OGG_OPUS"
+        )
+
+
+class TestAudioCache:
+    def test_memory_hit_and_miss(self):
+        """Test lookups are counted as hits and misses."""
+        cache = AudioCache(max_memory_bytes=1024)
+        assert cache.get("missing") is None
+
+        cache.set("key", b"audio")
+        assert cache.get("key") == b"audio"
+
+        stats = cache.get_stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """Test least recently used entries are evicted past the byte budget."""
+        cache = AudioCache(max_memory_bytes=10)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+        cache.set("c", b"1234")
+
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["memory_bytes"] == 8
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1234"
+
+    def test_oversized_entry_skips_memory_tier(self):
+        """Test entries larger than the budget are not kept in memory."""
+        cache = AudioCache(max_memory_bytes=4)
+        cache.set("big", b"123456")
+        assert cache.get_stats()["memory_entries"] == 0
+
+    def test_disk_tier_round_trip(self, tmp_path):
+        """Test raw bytes survive a fresh in-process tier."""
+        AudioCache(store=DiskAudioStore(str(tmp_path))).set("abcdef", b"\xff\xfbmp3")
+
+        cache = AudioCache(store=DiskAudioStore(str(tmp_path)))
+        assert cache.get("abcdef") == b"\xff\xfbmp3"
+        assert cache.get("abcdef") == b"\xff\xfbmp3"
+
+        stats = cache.get_stats()
+        assert stats["store_hits"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_disk_tier_prunes_least_recently_used(self, tmp_path):
+        """Test the disk tier deletes the oldest files once over its cap."""
+        store = DiskAudioStore(str(tmp_path), max_bytes=12)
+        for age, key in enumerate(["aa1", "bb2", "cc3"]):
+            store.set(key, b"1234")
+            os.utime(store._path(key), (1000 + age, 1000 + age))
+        store.get("aa1")
+        store.set("dd4", b"1234")
+
+        assert store.get("bb2") is None
+        assert store.get("cc3") is None
+        assert store.get("aa1") == b"1234"
+        assert store.get("dd4") == b"1234"
+
+    def test_disk_tier_counts_existing_files(self, tmp_path):
+        """Test files left by an earlier process count towards the cap."""
+        DiskAudioStore(str(tmp_path)).set("aa1", b"12345678")
+
+        store = DiskAudioStore(str(tmp_path), max_bytes=10)
+        store.set("bb2", b"1234")
+
+        assert store.get("aa1") is None
+        assert store.get("bb2") == b"1234"
+
+    def test_disk_tier_overwrite_replaces_size(self, tmp_path):
+        """Test rewriting a key counts only the new file's bytes."""
+        store = DiskAudioStore(str(tmp_path), max_bytes=10)
+        for _ in range(3):
+            store.set("aa1", b"12345678")
+
+        assert store._total_bytes == 8
+        assert store.get("aa1") == b"12345678"
+
+    def test_store_errors_degrade_to_miss(self):
+        """Test a failing second tier is reported and treated as a miss."""
+        store = Mock()
+        store.name = "redis"
+        store.get.side_effect = Exception("connection refused")
+        cache = AudioCache(store=store)
+
+        assert cache.get("key") is None
+        stats = cache.get_stats()
+        assert stats["store_errors"] == 1
+        assert stats["misses"] == 1
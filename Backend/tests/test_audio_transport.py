@@ -0,0 +1,65 @@
+from flask import Flask
+
+from utils.audio_transport import (
+    audio_response,
+    multipart_segments_response,
+    wants_binary_audio,
+)
+
+app = Flask(__name__)
+
+
+class TestContentNegotiation:
+    def test_json_is_default(self):
+        """Test clients without an audio Accept header keep getting JSON."""
+        with app.test_request_context("/", headers={"Accept": "*/*"}):
+            assert not wants_binary_audio()
+
+    def test_audio_accept_header(self):
+        """Test Accept: audio/mpeg selects the binary transport."""
+        with app.test_request_context("/", headers={"Accept": "audio/mpeg"}):
+            assert wants_binary_audio()
+
+    def test_format_query_parameter(self):
+        """Test ?format=binary selects the binary transport."""
+        with app.test_request_context("/?format=binary"):
+            assert wants_binary_audio()
+
+
+class TestAudioResponse:
+    def test_range_request(self):
+        """Test a Range request returns partial content."""
+        with app.test_request_context("/", headers={"Range": "bytes=2-4"}):
+            response = audio_response(b"0123456789")
+
+            assert response.status_code == 206
+            assert response.headers["Content-Range"] == "bytes 2-4/10"
+            assert response.get_data() == b"234"
+
+    def test_etag_revalidation(self):
+        """Test a matching If-None-Match returns 304."""
+        with app.test_request_context("/"):
+            etag = audio_response(b"audio").headers["ETag"]
+
+        with app.test_request_context("/", headers={"If-None-Match": etag}):
+            assert audio_response(b"audio").status_code == 304
+
+
+class TestMultipartResponse:
+    def test_parts_carry_audio_and_errors(self):
+        """Test every segment becomes its own part in order."""
+        response = multipart_segments_response(
+            [
+                {"index": 0, "role": "Narrator", "audio": b"\xff\xfb"},
+                {"index": 1, "role": "Ghost", "error": "No voice mapped"},
+            ]
+        )
+        boundary = response.mimetype_params["boundary"]
+        body = response.get_data()
+        parts = body.split(f"--{boundary}".encode())
+
+        assert response.mimetype == "multipart/mixed"
+        assert b"Content-Type: audio/mpeg" in parts[1]
+        assert parts[1].endswith(b"\r\n\r\n\xff\xfb\r\n")
+        assert b"No voice mapped" in parts[2]
+        assert parts[3] == b"--\r\n"
@@ -0,0 +1,91 @@
+import struct
+from unittest.mock import Mock
+
+import pytest
+
+from services.audiobook_assembler import AudiobookAssembler, AudiobookService
+from utils.mp3 import id3v2_size, iter_frames
+
+# MPEG-2 Layer III, 32kbps, 24kHz: 24ms frames of 96 bytes
+HEADER = bytes([0xFF, 0xF3, 0x44, 0xC4])
+
+
+def clip(frames, marker=1):
+    return b"".join(HEADER + bytes([marker]) * 92 for _ in range(frames))
+
+
+def read_chapters(data):
+    """(element id, start ms, end ms, title) for each CHAP frame."""
+    chapters = []
+    offset, end = 10, id3v2_size(data)
+    while offset < end and data[offset] != 0:
+        frame_id = data[offset : offset + 4]
+        size = struct.unpack(">I", data[offset + 4 : offset + 8])[0]
+        body = data[offset + 10 : offset + 10 + size]
+        if frame_id == b"CHAP":
+            element_id, rest = body.split(b"\x00", 1)
+            start, stop = struct.unpack(">II", rest[:8])
+            title = rest[16 + 11 :].decode("utf-16")
+            chapters.append((element_id.decode(), start, stop, title))
+        offset += 10 + size
+    return chapters
+
+
+class TestAudiobookAssembler:
+    def test_pauses_are_silent_frames_between_clips(self, tmp_path):
+        """Test gaps follow speaker changes and round up to whole frames."""
+        assembler = AudiobookAssembler(
+            str(tmp_path / "book.mp3"), segment_gap_ms=48, speaker_gap_ms=100
+        )
+        assembler.add_clip(b"ID3\x03\x00\x00\x00\x00\x00\x00" + clip(2), role="A")
+        assembler.add_clip(clip(1, marker=2), role="A")
+        assembler.add_clip(clip(1, marker=3), role="B")
+        path = assembler.finish()
+
+        with open(path, "rb") as f:
+            data = f.read()
+        frames = [data[frame.offset + 4] for frame in iter_frames(data)]
+        assert frames == [1, 1, 0, 0, 2, 0, 0, 0, 0, 0, 3]
+        assert assembler.duration_ms == pytest.approx(11 * 24)
+        assert not list(tmp_path.glob("*.audio"))
+
+    def test_chapter_markers_cover_each_chapter(self, tmp_path):
+        """Test CHAP frames carry titles and start where each chapter does."""
+        assembler = AudiobookAssembler(
+            str(tmp_path / "book.mp3"), segment_gap_ms=0, chapter_gap_ms=48
+        )
+        assembler.add_clip(clip(2), role="A", chapter=0, title="Opening")
+        assembler.add_clip(clip(1), role="A", chapter=0)
+        assembler.add_clip(clip(3), role="B", chapter=1)
+        path = assembler.finish()
+
+        with open(path, "rb") as f:
+            data = f.read()
+        assert read_chapters(data) == [
+            ("chp0", 0, 72 + 48, "Opening"),
+            ("chp1", 72 + 48, 72 + 48 + 72, "Chapter 2"),
+        ]
+        assert b"CTOC" in data[: id3v2_size(data)]
+
+
+class TestAudiobookService:
+    def test_builds_once_and_skips_failed_segments(self, tmp_path):
+        """Test a job's audiobook is assembled once and then served from disk."""
+        job_service = Mock()
+        job_service.iter_results.side_effect = lambda job_id: iter(
+            [
+                {"status": "done", "audio": clip(1), "role": "A", "chapter": None},
+                {"status": "failed", "audio": None, "role": "A", "chapter": None},
+                {"status": "done", "audio": clip(1), "role": "A", "chapter": None},
+            ]
+        )
+        service = AudiobookService(job_service, directory=str(tmp_path))
+
+        first = service.get_audiobook("job-1", segment_gap_ms=0)
+        second = service.get_audiobook("job-1", segment_gap_ms=0)
+        other = service.get_audiobook("job-1", segment_gap_ms=24)
+
+        assert first == second != other
+        assert job_service.iter_results.call_count == 2
+        with open(first, "rb") as f:
+            assert f.read() == clip(2)
@@ -0,0 +1,626 @@
+import dataclasses
+import os
+import signal
+import threading
+import time
+from collections import namedtuple
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+
+import utils.cache as cache_module
+import utils.cache_codec as codec_module
+from utils.cache import (
+    CacheManager,
+    CircuitBreaker,
+    LocalCache,
+    cached,
+    default_key_builder,
+    get_connection_pool,
+)
+from utils.cache_codec import CacheCodec, CodecError
+
+
+@pytest.fixture
+def cache_manager():
+    manager = CacheManager(redis_client=fakeredis.FakeRedis(), l1_max_bytes=0)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def tiered_pair():
+    """Two workers sharing one Redis, each with its own L1."""
+    server = fakeredis.FakeServer()
+    managers = [
+        CacheManager(redis_client=fakeredis.FakeRedis(server=server)) for _ in range(2)
+    ]
+    yield managers
+    for manager in managers:
+        manager.close()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestNamespaces:
+    def test_bump_changes_namespaced_keys(self, cache_manager):
+        """Test bumping a namespace orphans its existing entries."""
+        key = cache_manager.namespace_key("voices", "all")
+        cache_manager.set(key, ["en-US-Standard-A"])
+
+        cache_manager.bump_namespace("voices")
+
+        assert cache_manager.get(cache_manager.namespace_key("voices", "all")) is None
+        assert cache_manager.get(key) == ["en-US-Standard-A"]
+
+    def test_bump_leaves_other_namespaces(self, cache_manager):
+        """Test a voice refresh does not invalidate unrelated data."""
+        audio_key = cache_manager.namespace_key("audio", "clip")
+        cache_manager.set(audio_key, "data")
+
+        cache_manager.bump_namespace("voices")
+
+        assert cache_manager.namespace_key("audio", "clip") == audio_key
+        assert cache_manager.get(audio_key) == "data"
+
+    def test_version_is_shared_through_redis(self, cache_manager):
+        """Test another process sees the bumped generation."""
+        other = CacheManager(redis_client=cache_manager.redis_client)
+        other.get_namespace_version("voices")
+
+        cache_manager.bump_namespace("voices")
+        other._namespace_versions.clear()
+
+        assert other.get_namespace_version("voices") == 1
+
+    def test_disabled_cache_still_versions_locally(self):
+        """Test namespaces work without Redis."""
+        cache_manager = CacheManager(
+            redis_client=Mock(ping=Mock(side_effect=ConnectionError("refused")))
+        )
+
+        assert not cache_manager.enabled
+        assert cache_manager.bump_namespace("voices") == 1
+        assert cache_manager.namespace_key("voices", "k") == "voices:v1:k"
+
+
+@pytest.fixture
+def shared_cache(cache_manager, monkeypatch):
+    monkeypatch.setattr(cache_module, "cache", cache_manager)
+    return cache_manager
+
+
+class TestStampedeProtection:
+    def test_concurrent_misses_compute_once(self, shared_cache):
+        """Test concurrent callers of a missing key share one computation."""
+        calls = []
+        release = threading.Event()
+
+        @cached(ttl=60)
+        def slow(value):
+            calls.append(value)
+            release.wait(5)
+            return value * 2
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert calls == [21]
+        assert results == [42] * 8
+
+    def test_waiters_see_leader_error(self, shared_cache):
+        """Test a failed computation is raised to every coalesced caller."""
+        release = threading.Event()
+
+        @cached(ttl=60)
+        def broken():
+            release.wait(5)
+            raise RuntimeError("backend down")
+
+        errors = []
+
+        def call():
+            try:
+                broken()
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert errors == ["backend down"] * 3
+
+    def test_lease_holder_result_is_awaited(self, shared_cache, monkeypatch):
+        """Test a process without the lease waits for the leader's value."""
+        monkeypatch.setattr(cache_module, "LEASE_POLL_INTERVAL", 0.01)
+        compute = Mock(return_value="mine")
+
+        @cached(ttl=60)
+        def lookup():
+            return compute()
+
+        other_process = CacheManager(redis_client=shared_cache.redis_client)
+        original_acquire = shared_cache.acquire_lease
+
+        def held_elsewhere(cache_key, timeout):
+            # The other process wins the lease and publishes shortly after
+            assert other_process.acquire_lease(cache_key, timeout) is not None
+            envelope = {
+                "__cached__": 1,
+                "value": "theirs",
+                "delta": 0.0,
+                "expiry": time.time() + 60,
+            }
+            threading.Timer(0.05, other_process.set, (cache_key, envelope)).start()
+            return original_acquire(cache_key, timeout)
+
+        monkeypatch.setattr(shared_cache, "acquire_lease", held_elsewhere)
+
+        assert lookup() == "theirs"
+        compute.assert_not_called()
+
+    def test_release_only_drops_own_lease(self, cache_manager):
+        """Test an expired leader cannot release a newer leader's lease."""
+        token = cache_manager.acquire_lease("k", 30)
+        assert cache_manager.acquire_lease("k", 30) is None
+
+        cache_manager.release_lease("k", "stale-token")
+        assert cache_manager.acquire_lease("k", 30) is None
+
+        cache_manager.release_lease("k", token)
+        assert cache_manager.acquire_lease("k", 30) is not None
+
+    def test_early_recompute_near_expiry(self, shared_cache):
+        """Test an entry about to expire is refreshed before it does."""
+        compute = Mock(side_effect=["first", "second"])
+
+        @cached(ttl=60)
+        def lookup():
+            return compute()
+
+        assert lookup() == "first"
+        (key,) = [k for k in shared_cache.redis_client.keys("*")]
+        entry = shared_cache.get(key)
+        entry["delta"] = 1000.0
+        entry["expiry"] = time.time() + 0.001
+        shared_cache.set(key, entry)
+
+        assert lookup() == "second"
+        assert lookup() == "second"
+        assert compute.call_count == 2
+
+    def test_fresh_entry_is_not_recomputed(self, shared_cache):
+        """Test entries far from expiry are served from cache."""
+        compute = Mock(return_value="value")
+
+        @cached(ttl=3600)
+        def lookup():
+            return compute()
+
+        assert [lookup() for _ in range(5)] == ["value"] * 5
+        compute.assert_called_once()
+
+
+class Synthesizer:
+    def __init__(self, name):
+        self.name = name
+
+    def speak(self, text, voice="en-US-Standard-A"):
+        return f"{self.name}:{text}:{voice}"
+
+
+Point = namedtuple("Point", "x y")
+
+
+@dataclasses.dataclass(frozen=True)
+class Voice:
+    name: str
+
+
+class TestKeyBuilder:
+    def test_key_ignores_self(self):
+        """Test method keys match across instances of the same class."""
+        first = default_key_builder(Synthesizer.speak, (Synthesizer("a"), "hi"), {})
+        second = default_key_builder(Synthesizer.speak, (Synthesizer("b"), "hi"), {})
+
+        assert first == second
+        assert "0x" not in first
+
+    def test_key_canonicalizes_arguments(self):
+        """Test positional, keyword and defaulted spellings share a key."""
+        instance = Synthesizer("a")
+        keys = {
+            default_key_builder(Synthesizer.speak, (instance, "hi"), {}),
+            default_key_builder(Synthesizer.speak, (instance,), {"text": "hi"}),
+            default_key_builder(
+                Synthesizer.speak, (instance, "hi", "en-US-Standard-A"), {}
+            ),
+        }
+
+        assert len(keys) == 1
+
+    def test_key_distinguishes_values_and_types(self):
+        """Test different arguments never collide on their string form."""
+
+        def lookup(value):
+            return value
+
+        keys = {
+            default_key_builder(lookup, (value,), {})
+            for value in ("1", 1, 1.0, b"1", ["1"], {"1": 1}, None)
+        }
+
+        assert len(keys) == 7
+
+    def test_dict_key_order_is_irrelevant(self):
+        """Test equal mappings hash identically regardless of insertion order."""
+
+        def lookup(filters):
+            return filters
+
+        assert default_key_builder(
+            lookup, ({"gender": "female", "language": "en"},), {}
+        ) == default_key_builder(lookup, ({"language": "en", "gender": "female"},), {})
+
+    def test_objects_without_identity_are_rejected(self):
+        """Test instances that only differ in state never share a key."""
+
+        def lookup(value):
+            return value
+
+        with pytest.raises(TypeError):
+            default_key_builder(lookup, (Synthesizer("a"),), {})
+
+    def test_dataclasses_are_keyed_by_fields(self):
+        """Test dataclass arguments hash by their field values."""
+
+        def lookup(voice):
+            return voice
+
+        first = default_key_builder(lookup, (Voice("a"),), {})
+
+        assert first == default_key_builder(lookup, (Voice("a"),), {})
+        assert first != default_key_builder(lookup, (Voice("b"),), {})
+
+    def test_unkeyable_call_is_not_cached(self, shared_cache):
+        """Test a call whose arguments cannot be keyed runs uncached."""
+
+        @cached(ttl=60)
+        def describe(synthesizer):
+            return synthesizer.name
+
+        assert describe(Synthesizer("a")) == "a"
+        assert describe(Synthesizer("b")) == "b"
+
+    def test_custom_key_builder(self, shared_cache):
+        """Test a pluggable key builder decides which calls share an entry."""
+        compute = Mock(side_effect=lambda text: text.upper())
+
+        @cached(ttl=60, key_builder=lambda func, args, kwargs: args[0].lower())
+        def shout(text):
+            return compute(text)
+
+        assert shout("Hello") == "HELLO"
+        assert shout("hello") == "HELLO"
+        compute.assert_called_once()
+
+
+class TestCodec:
+    def test_round_trips_binary_values(self):
+        """Test bytes and nested values survive encoding unchanged."""
+        codec = CacheCodec(serializer="pickle", compression="zlib")
+        value = {"audio": b"\x00\xff" * 10, "voices": ["a", "b"], "count": 2}
+
+        assert codec.loads(codec.dumps(value)) == value
+
+    @pytest.mark.parametrize("serializer", ["msgpack", "pickle"])
+    def test_round_trips_tuples_with_their_types(self, serializer):
+        """Test tuples and namedtuples are not read back as lists."""
+        if serializer == "msgpack":
+            pytest.importorskip("msgpack")
+        codec = CacheCodec(serializer=serializer)
+        value = {"pair": (1, (2, "3")), "items": [(4,)], "point": Point(1, 2)}
+
+        decoded = codec.loads(codec.dumps(value))
+
+        assert decoded == value
+        assert type(decoded["pair"][1]) is tuple
+        assert type(decoded["items"][0]) is tuple
+        assert type(decoded["point"]) is Point
+
+    def test_auto_falls_back_without_optional_libraries(self, monkeypatch):
+        """Test pickle and zlib are used when msgpack and zstandard are missing."""
+        monkeypatch.setattr(codec_module, "msgpack", None)
+        monkeypatch.setattr(codec_module, "zstandard", None)
+        monkeypatch.delenv("CACHE_SERIALIZER", raising=False)
+        monkeypatch.delenv("CACHE_COMPRESSION", raising=False)
+        codec = CacheCodec(compress_min_bytes=64)
+        value = {"pair": (1, 2), "text": "the same sentence again " * 20}
+
+        encoded = codec.dumps(value)
+
+        assert (codec.serializer, codec.compression) == ("pickle", "zlib")
+        assert encoded[:2] == b"pz"
+        assert codec.loads(encoded) == value
+        with pytest.raises(ValueError):
+            CacheCodec(serializer="msgpack")
+        with pytest.raises(CodecError):
+            codec.loads(b"mn\x80")
+
+    def test_compresses_large_payloads(self):
+        """Test payloads over the threshold are stored compressed."""
+        codec = CacheCodec(compression="zlib", compress_min_bytes=64)
+        text = "the same sentence again " * 200
+
+        encoded = codec.dumps(text)
+
+        assert encoded[1:2] == b"z"
+        assert len(encoded) < len(text) // 4
+        assert codec.loads(encoded) == text
+
+    def test_incompressible_payload_stays_raw(self):
+        """Test data that does not shrink is not compressed."""
+        codec = CacheCodec(compression="zlib", compress_min_bytes=64)
+
+        encoded = codec.dumps(os.urandom(4096))
+
+        assert encoded[1:2] == b"n"
+
+    def test_unknown_entry_is_a_miss(self, cache_manager):
+        """Test entries written in an older format read as cache misses."""
+        cache_manager.redis_client.set("legacy", '{"value": 1}')
+
+        assert cache_manager.get("legacy") is None
+
+    def test_manager_stores_bytes(self, cache_manager):
+        """Test raw audio bytes round-trip through Redis."""
+        cache_manager.set("clip", b"ID3\x00mp3-bytes")
+
+        assert cache_manager.get("clip") == b"ID3\x00mp3-bytes"
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used_by_bytes(self):
+        """Test the byte budget evicts the coldest entries first."""
+        local = LocalCache(max_bytes=10, max_ttl=60)
+        local.set("a", b"aaaa", 60)
+        local.set("b", b"bbbb", 60)
+        local.get("a")
+        local.set("c", b"cccc", 60)
+
+        assert local.get("b") is None
+        assert local.get("a") == b"aaaa"
+        assert local.get_stats()["evictions"] == 1
+        assert local.get_stats()["bytes"] == 8
+
+    def test_entries_expire(self):
+        """Test entries live no longer than the smaller of both TTLs."""
+        local = LocalCache(max_bytes=100, max_ttl=0.05)
+        local.set("a", b"a", 3600)
+
+        time.sleep(0.1)
+
+        assert local.get("a") is None
+
+    def test_oversized_values_skip_the_tier(self):
+        """Test a value larger than the budget is not stored."""
+        local = LocalCache(max_bytes=4, max_ttl=60)
+        local.set("big", b"too large", 60)
+
+        assert local.get_stats()["entries"] == 0
+
+
+class TestTieredCache:
+    def test_hot_reads_skip_redis(self, tiered_pair):
+        """Test a value read once is then served from L1."""
+        writer, reader = tiered_pair
+        writer.set("voices", ["en-US-Standard-A"])
+        assert reader.get("voices") == ["en-US-Standard-A"]
+
+        reader.redis_client.delete("voices")
+
+        assert reader.get("voices") == ["en-US-Standard-A"]
+        stats = reader.get_stats()
+        assert stats["l1"]["hits"] == 1
+        assert stats["redis"]["hits"] == 1
+
+    def test_l1_copies_are_independent(self, tiered_pair):
+        """Test mutating a returned value does not change the cached one."""
+        _, reader = tiered_pair
+        reader.set("voices", ["a"])
+
+        reader.get("voices").append("b")
+
+        assert reader.get("voices") == ["a"]
+
+    def test_set_invalidates_other_workers(self, tiered_pair):
+        """Test a write in one worker evicts the stale L1 copy in another."""
+        writer, reader = tiered_pair
+        writer.set("voices", "old")
+        assert reader.get("voices") == "old"
+
+        writer.set("voices", "new")
+
+        assert wait_for(lambda: reader.get("voices") == "new")
+        assert reader.get_stats()["l1"]["invalidations"] == 1
+
+    def test_namespace_bump_reaches_other_workers(self, tiered_pair):
+        """Test other workers pick up a bump without waiting out their TTL."""
+        writer, reader = tiered_pair
+        assert reader.get_namespace_version("voices") == 0
+
+        writer.bump_namespace("voices")
+
+        assert wait_for(lambda: reader.get_namespace_version("voices") == 1)
+
+    def test_forked_worker_gets_its_own_l1_and_listener(self, tiered_pair):
+        """Test a worker forked after startup still hears invalidations."""
+        writer, reader = tiered_pair
+        writer.set("voices", "old")
+        assert reader.get("voices") == "old"
+        parent_id = reader._instance_id
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                # A hang in the child fails the test instead of blocking it
+                signal.alarm(10)
+                ok = reader._listener is None and reader._instance_id != parent_id
+                ok = ok and reader.get("voices") == "old"
+                ok = ok and reader._listener.is_alive()
+                writer.set("voices", "new")
+                ok = ok and wait_for(lambda: reader.get("voices") == "new")
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert reader.get("voices") == "old"
+
+    def test_l1_can_be_disabled(self, cache_manager):
+        """Test CACHE_L1_MAX_BYTES=0 leaves every read to Redis."""
+        cache_manager.set("k", 1)
+
+        assert cache_manager.get("k") == 1
+        assert cache_manager.get_stats()["l1"] is None
+
+
+class TestBatchOperations:
+    def test_set_many_and_get_many(self, cache_manager):
+        """Test batches round-trip and missing keys are left out."""
+        cache_manager.set_many({"a": 1, "b": [2], "c": b"3"}, ttl=60)
+
+        assert cache_manager.get_many(["a", "b", "c", "missing"]) == {
+            "a": 1,
+            "b": [2],
+            "c": b"3",
+        }
+
+    def test_get_many_uses_one_pipeline(self, cache_manager, monkeypatch):
+        """Test a batch read is a single round-trip to Redis."""
+        cache_manager.set_many({f"k{i}": i for i in range(10)}, ttl=60)
+        pipeline = Mock(wraps=cache_manager.redis_client.pipeline)
+        monkeypatch.setattr(cache_manager.redis_client, "pipeline", pipeline)
+
+        values = cache_manager.get_many([f"k{i}" for i in range(10)])
+
+        assert values == {f"k{i}": i for i in range(10)}
+        pipeline.assert_called_once()
+
+    def test_get_many_prefers_l1(self, tiered_pair):
+        """Test keys already held locally are not fetched again."""
+        manager, _ = tiered_pair
+        manager.set_many({"a": 1, "b": 2}, ttl=60)
+        manager.redis_client.delete("a", "b")
+
+        assert manager.get_many(["a", "b"]) == {"a": 1, "b": 2}
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_recovers(self):
+        """Test repeated failures open the breaker until a probe succeeds."""
+        probe = Mock(side_effect=[ConnectionError("down"), True])
+        breaker = CircuitBreaker(probe, failure_threshold=3, reset_timeout=0.01)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        assert not breaker.is_open
+        breaker.record_failure()
+        assert breaker.is_open
+        assert not breaker.allow()
+
+        assert wait_for(breaker.allow)
+        assert not breaker.is_open
+        assert probe.call_count == 2
+        assert breaker.get_stats()["trips"] == 1
+
+    def test_success_resets_failure_count(self):
+        """Test only consecutive failures trip the breaker."""
+        breaker = CircuitBreaker(Mock(), failure_threshold=2)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert not breaker.is_open
+
+    def test_open_breaker_skips_redis(self, cache_manager):
+        """Test an outage stops costing Redis calls once the breaker opens."""
+        client = cache_manager.redis_client
+        failing = Mock(side_effect=ConnectionError("timed out"))
+        cache_manager.redis_client = Mock(pipeline=failing, ping=failing)
+        cache_manager.breaker = CircuitBreaker(
+            cache_manager.redis_client.ping, failure_threshold=2, reset_timeout=60
+        )
+
+        for _ in range(5):
+            assert cache_manager.get("k") is None
+
+        assert failing.call_count == 2
+        assert not cache_manager.enabled
+        assert cache_manager.get_stats()["breaker"]["state"] == "open"
+        cache_manager.redis_client = client
+
+    def test_unreachable_redis_is_reprobed(self, monkeypatch):
+        """Test a cache started without Redis enables itself once it is back."""
+        monkeypatch.setenv("REDIS_BREAKER_RESET_TIMEOUT", "0.01")
+        ping = Mock(side_effect=[ConnectionError("refused"), True])
+        manager = CacheManager(redis_client=Mock(ping=ping))
+        assert not manager.enabled
+        assert not manager.redis_available
+
+        assert wait_for(lambda: manager.enabled)
+        assert manager.redis_available
+
+    def test_forked_worker_recovers_from_open_breaker(self, monkeypatch):
+        """Test a breaker opened before fork() still closes in the child."""
+        monkeypatch.setenv("REDIS_BREAKER_RESET_TIMEOUT", "0.01")
+        ping = Mock(side_effect=[ConnectionError("refused"), True])
+        manager = CacheManager(redis_client=Mock(ping=ping), l1_max_bytes=0)
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                signal.alarm(10)
+                ok = wait_for(lambda: manager.enabled)
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
+
+
+class TestConnectionPool:
+    def test_pool_is_shared_and_sized_from_env(self, monkeypatch):
+        """Test each URL gets one pool bounded by REDIS_POOL_MAX_CONNECTIONS."""
+        monkeypatch.setenv("REDIS_POOL_MAX_CONNECTIONS", "7")
+        url = "redis://pool-test.invalid:6379/3"
+
+        pool = get_connection_pool(url)
+
+        assert get_connection_pool(url) is pool
+        assert pool.max_connections == 7
+        assert pool.connection_kwargs["socket_timeout"] == 0.5
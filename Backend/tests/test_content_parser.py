@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from services.content_parser import MAX_INPUT_CHARS, ContentParser, SegmentStream
+
+
+class TestSanitizeTextInput:
+    def test_strips_markup_characters_and_caps_length(self):
+        """Test unsafe characters are removed before the length cap."""
+        assert ContentParser.sanitize_text_input('<b>"Hi"</b> it\'s') == "bHi/b its"
+        assert len(ContentParser.sanitize_text_input("x" * 20000)) == MAX_INPUT_CHARS
+        assert ContentParser.sanitize_text_input(None) == ""
+
+
+class TestParseContentAndRoles:
+    def test_joins_block_lines_per_role(self):
+        """Test each role's lines are stripped and joined with single spaces."""
+        content = (
+            "Front matter is ignored.\n"
+            "**Narrator:** It was late.\n"
+            "   The rain kept on.  \r\n"
+            "\n"
+            "  **Hero** Who's there?\n"
+            "**Villain**\n"
+            "**Hero**\n"
+            "Me.\n"
+        )
+
+        segments, roles = ContentParser.parse_content_and_roles(content)
+
+        assert segments == [
+            {"role": "Narrator:", "text": "It was late. The rain kept on."},
+            {"role": "Hero", "text": "Who's there?"},
+            {"role": "Hero", "text": "Me."},
+        ]
+        assert roles == ["Narrator:", "Hero", "Villain"]
+
+    def test_iter_segments_reports_empty_blocks(self):
+        """Test the generator yields every marker, even without text."""
+        blocks = list(ContentParser.iter_segments("**A**\n**B** b\n****\nlost"))
+
+        assert blocks == [("A", ""), ("B", "b"), ("", "")]
+
+
+class TestSegmentHash:
+    def test_hash_ignores_whitespace_but_not_role(self):
+        """Test the hash survives reflowed lines but not a new speaker."""
+        digest = ContentParser.segment_hash("Hero", "Who goes  there?")
+
+        assert ContentParser.segment_hash("Hero", " Who goes there? ") == digest
+        assert ContentParser.segment_hash("Villain", "Who goes there?") != digest
+        assert ContentParser.segment_hash("Hero", "Who goes there!") != digest
+
+
+class TestSegmentStream:
+    CONTENT = (
+        "**Narrator:** Caf\u00e9 au lait,\n  \U0001f4a5 <bang>.\n\n"
+        "**Hero** Who's there?\n**Villain**\n"
+    )
+
+    def test_chunked_stream_matches_whole_text_parse(self):
+        """Test tiny chunks that split characters and markers parse the same."""
+        expected = ContentParser.parse_content_and_roles(
+            ContentParser.sanitize_text_input(self.CONTENT)
+        )
+        blocks = SegmentStream(io.BytesIO(self.CONTENT.encode()), chunk_size=1)
+
+        assert ContentParser.collect_segments(blocks) == expected
+        assert blocks.chars == len(ContentParser.sanitize_text_input(self.CONTENT))
+
+    def test_stops_reading_at_max_chars(self):
+        """Test the character cap ends the read instead of truncating after."""
+        stream = io.BytesIO(b"**A** " + b"x" * 100)
+        blocks = list(SegmentStream(stream, max_chars=10, chunk_size=4))
+
+        assert blocks == [("A", "xxxx")]
+        assert stream.tell() < 20
+
+    def test_invalid_utf8_raises(self):
+        """Test undecodable bytes surface as UnicodeDecodeError."""
+        with pytest.raises(UnicodeDecodeError):
+            list(SegmentStream(io.BytesIO(b"**A** \xc3")))
@@ -0,0 +1,194 @@
+import os
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from services.job_service import JobService, JobStore
+
+VOICE_MAPPING = {"Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}}
+
+
+def fake_synthesis(segments, voice_mapping, binary=False):
+    for index, segment in enumerate(segments):
+        if segment["role"] in voice_mapping:
+            yield {"index": index, "audio": segment["text"].encode()}
+        else:
+            yield {"index": index, "error": "No voice mapped"}
+
+
+def wait_for(job_service, job_id, status="completed", timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_service.get_status(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached {status}")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+class TestJobService:
+    def test_job_completes_with_per_segment_status(self, store):
+        """Test a submitted job reports progress for every segment."""
+        tts_service = Mock(iter_synthesized_segments=fake_synthesis)
+        job_service = JobService(tts_service, store=store)
+
+        job_id = job_service.submit(
+            [{"role": "Narrator", "text": "One."}, {"role": "Ghost", "text": "Boo."}],
+            VOICE_MAPPING,
+        )
+        job = wait_for(job_service, job_id)
+
+        assert job["completed"] == 1
+        assert job["failed"] == 1
+        assert job["progress"] == 1.0
+        results = job_service.get_results(job_id)
+        assert results[0]["audio"] == b"One."
+        assert results[1]["status"] == "failed"
+
+    def test_restart_resumes_only_unfinished_segments(self, store):
+        """Test a resumed job skips segments finished before the restart."""
+        store.create_job(
+            "job-1",
+            [
+                {"role": "Narrator", "text": "One."},
+                {"role": "Narrator", "text": "Two."},
+            ],
+            VOICE_MAPPING,
+        )
+        store.claim_job("job-1", "dead-worker", lease_seconds=60)
+        store.record_segment("job-1", 0, audio=b"One.")
+
+        synthesized = []
+
+        def tracking_synthesis(segments, voice_mapping, binary=False):
+            synthesized.extend(segment["text"] for segment in segments)
+            return fake_synthesis(segments, voice_mapping, binary)
+
+        tts_service = Mock(iter_synthesized_segments=tracking_synthesis)
+        job_service = JobService(tts_service, store=store, lease_seconds=1)
+        time.sleep(1.1)
+        job_service.resume_unfinished()
+
+        job = wait_for(job_service, "job-1")
+        assert synthesized == ["Two."]
+        assert job["completed"] == 2
+
+    def test_live_lease_is_not_claimed_twice(self, store):
+        """Test a running job is not picked up by a second worker."""
+        store.create_job("job-1", [{"role": "Narrator", "text": "One."}], VOICE_MAPPING)
+
+        assert store.claim_job("job-1", "worker-a", lease_seconds=60)
+        assert not store.claim_job("job-1", "worker-b", lease_seconds=60)
+
+    def test_job_that_keeps_failing_is_marked_failed(self, store):
+        """Test a job is given up on once it has used all its attempts."""
+        tts_service = Mock()
+        tts_service.iter_synthesized_segments.side_effect = RuntimeError("boom")
+        job_service = JobService(tts_service, store=store, max_attempts=1)
+
+        job_id = job_service.submit(
+            [{"role": "Narrator", "text": "One."}], VOICE_MAPPING
+        )
+
+        assert wait_for(job_service, job_id, status="failed")["pending"] == 1
+
+    def test_job_abandoned_by_dead_workers_is_marked_failed(self, store):
+        """Test attempts that died with their worker count towards the limit."""
+        store.create_job("job-1", [{"role": "Narrator", "text": "One."}], VOICE_MAPPING)
+        for _ in range(2):
+            store.claim_job("job-1", "dead-worker", lease_seconds=0)
+        tts_service = Mock()
+        job_service = JobService(
+            tts_service, store=store, lease_seconds=0.01, max_attempts=2
+        )
+        time.sleep(0.02)
+
+        job_service.resume_unfinished()
+
+        wait_for(job_service, "job-1", status="failed")
+        tts_service.iter_synthesized_segments.assert_not_called()
+
+    def test_finished_jobs_expire(self, store):
+        """Test expired finished jobs are deleted and running ones kept."""
+        for job_id in ("done", "running"):
+            store.create_job(job_id, [{"role": "Narrator", "text": "One."}], {})
+        store.record_segment("done", 0, audio=b"One.")
+        store.finish_job("done", "completed")
+        store.claim_job("running", "worker-a", lease_seconds=60)
+
+        assert store.delete_finished(before=time.time() + 1) == 1
+        assert store.get_job("done") is None
+        assert store.get_results("done") == []
+        assert store.get_job("running") is not None
+
+    def test_forked_worker_opens_its_own_connection(self, store):
+        """Test a forked worker does not reuse the parent's SQLite connection."""
+        store.create_job("job-1", [{"role": "Narrator", "text": "One."}], {})
+        job_service = JobService(Mock(), store=store)
+        inherited = store._conn
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                ok = (
+                    store._connection is None
+                    and store.claim_job("job-1", job_service.worker_id, 60)
+                    and store._conn is not inherited
+                    and job_service.worker_id.endswith(f":{os.getpid()}")
+                )
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert store.get_job("job-1")["worker"].endswith(f":{pid}")
+
+    def test_resubmitted_edit_only_synthesizes_changed_segments(self, store):
+        """Test unchanged segments take the base job's audio."""
+        synthesized = []
+
+        def tracking_synthesis(segments, voice_mapping, binary=False):
+            synthesized.extend(segment["text"] for segment in segments)
+            return fake_synthesis(segments, voice_mapping, binary)
+
+        tts_service = Mock(iter_synthesized_segments=tracking_synthesis)
+        job_service = JobService(tts_service, store=store)
+        base_id = job_service.submit(
+            [{"role": "Narrator", "text": t} for t in ("One.", "Two.", "Three.")],
+            VOICE_MAPPING,
+        )
+        wait_for(job_service, base_id)
+        synthesized.clear()
+
+        edited = [{"role": "Narrator", "text": t} for t in ("Zero.", "One.", "Three. ")]
+        job_id = job_service.submit(edited, VOICE_MAPPING, base_job_id=base_id)
+        wait_for(job_service, job_id)
+
+        assert synthesized == ["Zero."]
+        results = job_service.get_results(job_id)
+        assert [r["audio"] for r in results] == [b"Zero.", b"One.", b"Three."]
+
+    def test_changed_voice_is_not_reused(self, store):
+        """Test audio is only reused when the mapped voice is the same."""
+        store.create_job(
+            "base", [{"role": "Narrator", "text": "One."}], VOICE_MAPPING, ["key-a"]
+        )
+        store.record_segment("base", 0, audio=b"One.")
+
+        reused = store.create_job(
+            "edit",
+            [{"role": "Narrator", "text": "One."}],
+            VOICE_MAPPING,
+            ["key-b"],
+            base_job_id="base",
+        )
+
+        assert reused == 0
+        assert store.pending_segments("edit")[0]["text"] == "One."
@@ -0,0 +1,134 @@
+import io
+import os
+
+import pytest
+
+from services.manuscript_service import (
+    InvalidCursor,
+    ManuscriptService,
+    ManuscriptStore,
+)
+
+BOOK = (
+    "Title page\n"
+    "**Narrator** It begins.\n"
+    "# Chapter One\n"
+    "**Hero** Hello.\n"
+    "**Villain** Goodbye.\n"
+    "## Chapter Two\n"
+    "**Hero** Again.\n"
+    "**Narrator** " + "word " * 5000 + "\n"
+)
+
+
+@pytest.fixture
+def service(tmp_path):
+    store = ManuscriptStore(str(tmp_path / "manuscripts.sqlite3"))
+    return ManuscriptService(store=store, page_size=2)
+
+
+def ingest(service, text):
+    return service.ingest(io.BytesIO(text.encode()))
+
+
+class TestManuscriptService:
+    def test_large_input_is_kept_whole(self, service):
+        """Test nothing is truncated and chapters summarize their roles."""
+        summary = service.get_summary(ingest(service, BOOK))
+
+        assert summary["totalSegments"] == 5
+        assert summary["totalCharacters"] > 25000
+        assert summary["roles"] == ["Narrator", "Hero", "Villain"]
+        assert [(c["title"], c["firstSegment"]) for c in summary["chapters"]] == [
+            (None, 0),
+            ("Chapter One", 1),
+            ("Chapter Two", 3),
+        ]
+        assert summary["chapters"][2]["roles"] == {"Hero": 1, "Narrator": 1}
+
+    def test_cursor_pages_through_every_segment(self, service):
+        """Test following nextCursor visits each segment exactly once."""
+        manuscript_id = ingest(service, BOOK)
+
+        indexes = []
+        page = service.get_page(manuscript_id)
+        while True:
+            indexes += [segment["index"] for segment in page["segments"]]
+            if not page["nextCursor"]:
+                break
+            page = service.get_page(manuscript_id, cursor=page["nextCursor"])
+
+        assert indexes == [0, 1, 2, 3, 4]
+
+    def test_cursor_keeps_chapter_filter(self, service):
+        """Test a chapter page's cursor stays within that chapter."""
+        manuscript_id = ingest(service, BOOK)
+
+        first = service.get_page(manuscript_id, chapter=1, limit=1)
+        second = service.get_page(manuscript_id, cursor=first["nextCursor"], limit=1)
+
+        assert [s["text"] for s in first["segments"]] == ["Hello."]
+        assert [s["text"] for s in second["segments"]] == ["Goodbye."]
+        assert second["nextCursor"] is None
+
+    def test_rejects_foreign_or_malformed_cursors(self, service):
+        """Test cursors cannot be replayed against another manuscript."""
+        first_id = ingest(service, BOOK)
+        second_id = ingest(service, BOOK)
+        cursor = service.get_page(first_id)["nextCursor"]
+
+        with pytest.raises(InvalidCursor):
+            service.get_page(second_id, cursor=cursor)
+        with pytest.raises(InvalidCursor):
+            service.get_page(first_id, cursor="not-a-cursor")
+
+    def test_empty_and_invalid_uploads_are_not_stored(self, service):
+        """Test nothing is kept for uploads that cannot become a manuscript."""
+        assert ingest(service, "") is None
+        with pytest.raises(UnicodeDecodeError):
+            service.ingest(io.BytesIO(b"**A** ok\n\xff"))
+
+        assert service.store.expired_ids(float("inf")) == []
+
+    def test_expired_manuscripts_are_purged(self, service):
+        """Test manuscripts older than the TTL are removed on the next ingest."""
+        old_id = ingest(service, BOOK)
+        service.ttl_seconds = -1
+
+        ingest(service, BOOK)
+
+        assert service.get_summary(old_id) is None
+
+    def test_diff_marks_only_edited_segments(self, service):
+        """Test an insert and an edit leave the other segments unchanged."""
+        base_id = ingest(service, "**A** one\n**B** two\n**A** three\n")
+        revision_id = ingest(
+            service, "**A** zero\n**A**  one \n**B** two, edited\n**A** three\n"
+        )
+
+        assert service.diff(base_id, revision_id) == {
+            "baseManuscriptId": base_id,
+            "unchanged": 2,
+            "changed": [0, 2],
+            "removed": 1,
+        }
+
+    def test_forked_worker_opens_its_own_connection(self, service):
+        """Test a forked worker does not reuse the parent's SQLite connection."""
+        manuscript_id = ingest(service, BOOK)
+        inherited = service.store._conn
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                ok = service.store._connection is None
+                ok = ok and service.get_summary(manuscript_id)["totalSegments"] == 5
+                ok = ok and service.store._conn is not inherited
+                ok = ok and ingest(service, "**Hero** From the child.\n") is not None
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert service.get_summary(manuscript_id)["totalSegments"] == 5
@@ -0,0 +1,47 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastmcp")
+pytest.importorskip("openai")
+
+MCP_DIR = Path(__file__).resolve().parents[2] / "mcp_files"
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("TTS_OUTPUT_DIR", str(tmp_path / "out"))
+    monkeypatch.syspath_prepend(str(MCP_DIR))
+    sys.modules.pop("mcp_openai_tts_server", None)
+    yield importlib.import_module("mcp_openai_tts_server")
+    sys.modules.pop("mcp_openai_tts_server", None)
+
+
+class TestOutputPath:
+    def test_relative_path_lands_in_output_dir(self, server, tmp_path):
+        """Test a relative output_path resolves inside TTS_OUTPUT_DIR."""
+        path = server.resolve_output_path("book/chapter-1.mp3")
+
+        assert path == os.path.join(
+            os.path.realpath(tmp_path / "out"), "book", "chapter-1.mp3"
+        )
+
+    @pytest.mark.parametrize(
+        "output_path", ["/etc/passwd", "../escape.mp3", "book/../../escape.mp3", "."]
+    )
+    def test_paths_outside_output_dir_are_rejected(self, server, output_path):
+        """Test absolute paths and parent references are refused."""
+        with pytest.raises(ValueError):
+            server.resolve_output_path(output_path)
+
+    def test_symlink_out_of_output_dir_is_rejected(self, server, tmp_path):
+        """Test a symlink cannot be used to write outside the directory."""
+        os.makedirs(server.OUTPUT_DIR)
+        os.symlink(tmp_path, os.path.join(server.OUTPUT_DIR, "link"))
+
+        with pytest.raises(ValueError):
+            server.resolve_output_path("link/escape.mp3")
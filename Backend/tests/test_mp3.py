@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from utils.mp3 import frame_runs, iter_frames, join_clips, split_at_times, write_frames
+
+# MPEG-2 Layer III, 32kbps, 24kHz, no CRC: 576 samples (24ms) in 96 bytes
+HEADER = bytes([0xFF, 0xF3, 0x44, 0xC4])
+
+
+def frame(marker: int) -> bytes:
+    return HEADER + bytes([marker]) * 92
+
+
+def id3_tag(body: bytes) -> bytes:
+    size = len(body)
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + syncsafe + body
+
+
+class TestIterFrames:
+    def test_skips_tags_info_frame_and_garbage(self):
+        """Test only audio frames are yielded from a tagged stream."""
+        info = HEADER + b"\x00" * 32 + b"Info" + b"\x00" * 56
+        data = id3_tag(b"\x00" * 20) + info + frame(1) + b"junk" + frame(2) + b"TAG"
+
+        frames = list(iter_frames(data))
+
+        assert [data[f.offset + 4] for f in frames] == [1, 2]
+        assert all(f.length == 96 for f in frames)
+        assert frames[0].duration == pytest.approx(0.024)
+
+
+def tagged_clip(*markers) -> bytes:
+    info = HEADER + b"\x00" * 32 + b"Xing" + b"\x00" * 56
+    return id3_tag(b"\x00" * 20) + info + b"".join(frame(m) for m in markers)
+
+
+class TestFrameRuns:
+    def test_stray_sync_bits_in_garbage_are_not_frames(self):
+        """Test a header-like pattern needs a following frame to count."""
+        data = b"junk" + HEADER + b"no" + frame(1) + frame(2)
+
+        assert [data[f.offset + 4] for f in iter_frames(data)] == [1, 2]
+
+    def test_runs_are_views_over_the_audio_only(self):
+        """Test runs skip the tag and info frame without copying."""
+        data = tagged_clip(1, 2)
+        runs = list(frame_runs(data))
+
+        assert [bytes(run) for run in runs] == [frame(1) + frame(2)]
+        assert runs[0].obj is data
+
+    def test_write_frames_goes_straight_to_the_descriptor(self, tmp_path):
+        """Test clips are written to an fd back to back, headers stripped."""
+        path = tmp_path / "out.mp3"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+        try:
+            first = write_frames(fd, tagged_clip(1, 2))
+            second = write_frames(fd, tagged_clip(3) + b"TAG" + b"\x00" * 125)
+        finally:
+            os.close(fd)
+
+        assert path.read_bytes() == frame(1) + frame(2) + frame(3)
+        assert (first.frames, first.bytes, first.header) == (2, 192, HEADER)
+        assert second.duration == pytest.approx(0.024)
+
+    def test_join_clips_keeps_non_mp3_data(self):
+        """Test joining never silently drops a clip it cannot parse."""
+        assert join_clips([tagged_clip(1), b"raw", tagged_clip(2)]) == (
+            frame(1) + b"raw" + frame(2)
+        )
+
+
+class TestSplitAtTimes:
+    def test_cuts_on_nearest_frame_boundary(self):
+        """Test cuts stay on the closest boundary when every frame borrows."""
+        data = b"".join(frame(i) for i in range(10))
+
+        clips = split_at_times(data, [0.05, 0.17])
+
+        assert [len(c) // 96 for c in clips] == [2, 5, 3]
+        assert b"".join(clips) == data
+        assert clips[1][4] == 2
+
+    def test_cut_moves_back_to_frame_without_reservoir(self):
+        """Test a clip starts on the nearest earlier frame that decodes alone."""
+        # Byte 4 is main_data_begin; frame 4 is the only one not borrowing
+        data = b"".join(frame(0 if i == 4 else 50) for i in range(10))
+
+        clips = split_at_times(data, [0.17])
+
+        assert [len(c) // 96 for c in clips] == [4, 6]
+        assert clips[1][4] == 0
+
+    def test_cut_moves_at_most_max_shift(self):
+        """Test a clean frame further back than max_shift is not used."""
+        data = b"".join(frame(0 if i == 4 else 50) for i in range(10))
+
+        clips = split_at_times(data, [0.17], max_shift=0.05)
+
+        assert [len(c) // 96 for c in clips] == [7, 3]
+
+    def test_rejects_data_without_frames(self):
+        """Test non-MP3 input is an error, not an empty clip list."""
+        with pytest.raises(ValueError):
+            split_at_times(b"not audio", [1.0])
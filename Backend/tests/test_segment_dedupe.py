@@ -0,0 +1,53 @@
+from services.segment_dedupe import DedupePlan, normalize_text
+
+
+def resolve(segment):
+    if not segment.get("text"):
+        raise ValueError("Segment requires role and text")
+    return segment["text"], segment.get("voice", "en-US-Standard-A"), "en-US"
+
+
+class TestNormalizeText:
+    def test_collapses_whitespace(self):
+        """Test spacing differences do not defeat deduplication."""
+        assert normalize_text("  He said\n  nothing. ") == "He said nothing."
+
+    def test_unicode_forms_match(self):
+        """Test composed and decomposed accents normalize alike."""
+        assert normalize_text("Caf\u00e9") == normalize_text("Cafe\u0301")
+
+    def test_case_is_kept(self):
+        """Test case is preserved since it can change pronunciation."""
+        assert normalize_text("US") != normalize_text("us")
+
+
+class TestDedupePlan:
+    def test_repeats_share_a_request(self):
+        """Test repeats map to the first occurrence's request."""
+        plan = DedupePlan(
+            [{"text": "Yes."}, {"text": "No."}, {"text": "Yes."}], resolve
+        )
+
+        assert plan.requests[0] == plan.requests[2]
+        assert plan.last_index[plan.requests[0]] == 2
+        assert plan.calls_saved == 1
+        assert plan.chars_saved == 4
+
+    def test_voice_is_part_of_the_key(self):
+        """Test the same line in two voices is synthesized twice."""
+        plan = DedupePlan(
+            [{"text": "Yes."}, {"text": "Yes.", "voice": "en-US-Standard-B"}],
+            resolve,
+        )
+
+        assert plan.unique == 2
+        assert plan.calls_saved == 0
+
+    def test_invalid_segments_keep_their_error(self):
+        """Test unresolvable segments are reported, not deduplicated."""
+        plan = DedupePlan([{"text": ""}, {"text": "Ok."}], resolve)
+
+        assert plan.requests[0] is None
+        assert plan.errors[0] == "Segment requires role and text"
+        assert plan.get_stats()["segments"] == 2
+        assert plan.get_stats()["uniqueSegments"] == 1
@@ -0,0 +1,56 @@
+from services.ssml_batcher import SegmentBatcher, build_marked_ssml
+
+
+class TestBuildMarkedSsml:
+    def test_marks_each_text_and_escapes_it(self):
+        """Test every text gets a mark and markup characters are escaped."""
+        ssml = build_marked_ssml(["Hi.", "A < B & C"], pause_ms=100)
+
+        assert ssml == (
+            '<speak><mark name="s0"/>Hi.<break time="100ms"/>'
+            '<mark name="s1"/>A &lt; B &amp; C</speak>'
+        )
+
+
+class TestSegmentBatcher:
+    def make_batcher(self, max_segments=3, max_bytes=5000):
+        batches = []
+        batcher = SegmentBatcher(
+            lambda voice, lang, items: batches.append(
+                (voice, [text for text, _ in items])
+            ),
+            max_segments,
+            max_bytes,
+        )
+        return batcher, batches
+
+    def test_groups_by_voice_until_full(self):
+        """Test a voice's batch is submitted once it holds max_segments."""
+        batcher, batches = self.make_batcher()
+        for text, voice in [("a", "A"), ("b", "B"), ("c", "A"), ("d", "A")]:
+            batcher.add(text, voice, "en-US")
+
+        assert batches == [("A", ["a", "c", "d"])]
+
+        batcher.flush()
+        assert batches[1:] == [("B", ["b"])]
+        assert batcher.batches == 2
+
+    def test_byte_limit_starts_a_new_batch(self):
+        """Test a batch never grows past the request byte limit."""
+        batcher, batches = self.make_batcher(max_segments=10, max_bytes=120)
+        batcher.add("x" * 30, "A", "en-US")
+        batcher.add("y" * 30, "A", "en-US")
+
+        assert batches == [("A", ["x" * 30])]
+
+    def test_flush_pending_sends_only_the_needed_batch(self):
+        """Test waiting on one result does not flush other voices."""
+        batcher, batches = self.make_batcher()
+        first = batcher.add("a", "A", "en-US")
+        batcher.add("b", "B", "en-US")
+
+        batcher.flush_pending(first)
+        batcher.flush_pending(first)
+
+        assert batches == [("A", ["a"])]
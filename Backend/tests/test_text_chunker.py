@@ -0,0 +1,48 @@
+import pytest
+
+from services.text_chunker import chunk_text
+
+
+class TestChunkText:
+    def test_short_text_is_single_chunk(self):
+        """Test text under the budget is returned unchanged."""
+        assert chunk_text("Hello there.", max_bytes=100) == ["Hello there."]
+
+    def test_empty_text_has_no_chunks(self):
+        """Test whitespace-only input produces no requests."""
+        assert chunk_text("  \n\n ", max_bytes=100) == []
+
+    def test_splits_on_paragraphs_first(self):
+        """Test paragraph boundaries are preferred split points."""
+        text = "First paragraph here.\n\nSecond paragraph here."
+        assert chunk_text(text, max_bytes=30) == [
+            "First paragraph here.",
+            "Second paragraph here.",
+        ]
+
+    def test_splits_long_paragraph_on_sentences(self):
+        """Test sentences are kept whole when a paragraph is too large."""
+        text = "One sentence here. Another one here! A third? Yes."
+        chunks = chunk_text(text, max_bytes=25)
+
+        assert chunks == ["One sentence here.", "Another one here!", "A third? Yes."]
+
+    def test_chunks_respect_byte_budget_for_multibyte_text(self):
+        """Test the budget counts UTF-8 bytes rather than characters."""
+        text = " ".join(["café naïve résumé"] * 200)
+        chunks = chunk_text(text, max_bytes=100)
+
+        assert all(len(chunk.encode("utf-8")) <= 100 for chunk in chunks)
+        assert " ".join(chunks).split() == text.split()
+
+    def test_oversized_word_is_hard_split(self):
+        """Test a single word longer than the budget is still chunked."""
+        chunks = chunk_text("é" * 30, max_bytes=11)
+
+        assert all(len(chunk.encode("utf-8")) <= 11 for chunk in chunks)
+        assert "".join(chunks) == "é" * 30
+
+    def test_invalid_budget(self):
+        """Test a non-positive budget is rejected."""
+        with pytest.raises(ValueError):
+            chunk_text("text", max_bytes=0)
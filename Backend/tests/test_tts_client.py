@@ -0,0 +1,78 @@
+from unittest.mock import Mock
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import services.tts_client as tts_client
+from services.tts_client import TTSClientPool, get_tts_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(tts_client, "_pool", None)
+    monkeypatch.setattr(tts_client, "_beta_pool", None)
+    monkeypatch.setattr(tts_client, "_warmup_started", False)
+
+
+class TestTTSClientPool:
+    def test_round_robin(self):
+        """Test calls rotate evenly across the pooled clients."""
+        clients = [Mock(), Mock(), Mock()]
+        pool = TTSClientPool(clients)
+
+        for _ in range(6):
+            pool.synthesize_speech(input="x")
+
+        assert [c.synthesize_speech.call_count for c in clients] == [2, 2, 2]
+
+    def test_warmup_touches_every_channel(self):
+        """Test warmup makes one cheap call per client."""
+        clients = [Mock(), Mock()]
+
+        TTSClientPool(clients).warmup(timeout=5)
+
+        for client in clients:
+            client.list_voices.assert_called_once_with(language_code="en-US", timeout=5)
+
+    def test_requires_a_client(self):
+        """Test an empty pool is rejected."""
+        with pytest.raises(ValueError):
+            TTSClientPool([])
+
+    def test_channels_are_independent(self, monkeypatch):
+        """Test each pooled client gets its own tuned gRPC channel."""
+        monkeypatch.setattr(tts_client, "_load_credentials", AnonymousCredentials)
+
+        pool = tts_client.create_client_pool(size=2)
+
+        channels = [client.transport.grpc_channel for client in pool._clients]
+        assert len(pool) == 2
+        assert channels[0] is not channels[1]
+        assert ("grpc.keepalive_time_ms", 30000) in tts_client.CHANNEL_OPTIONS
+
+
+class TestGetTTSClient:
+    def test_shared_across_callers(self, monkeypatch):
+        """Test the process builds one pool for every caller."""
+        create = Mock(return_value=TTSClientPool([Mock()]))
+        monkeypatch.setattr(tts_client, "create_client_pool", create)
+
+        assert get_tts_client() is get_tts_client()
+        create.assert_called_once()
+
+    def test_failure_is_retried(self, monkeypatch):
+        """Test a failed build is attempted again on the next call."""
+        pool = TTSClientPool([Mock()])
+        create = Mock(side_effect=[None, pool])
+        monkeypatch.setattr(tts_client, "create_client_pool", create)
+
+        assert get_tts_client() is None
+        assert get_tts_client() is pool
+
+    def test_reset_after_fork(self, monkeypatch):
+        """Test a forked worker does not reuse the parent's channels."""
+        monkeypatch.setattr(tts_client, "_pool", TTSClientPool([Mock()]))
+
+        tts_client._reset_after_fork()
+
+        assert tts_client._pool is None
@@ -0,0 +1,118 @@
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+from google.api_core import exceptions
+
+import services.tts_rate_limiter as limiter_module
+from services.tts_rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+class TestTokenBucket:
+    def test_burst_then_wait(self):
+        """Test requests beyond the burst allowance must wait for refill."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=60, chars_per_minute=10**6)
+
+        for _ in range(limiter_module.BURST_SECONDS):
+            limiter.acquire(10, timeout=0)
+
+        with pytest.raises(exceptions.ResourceExhausted):
+            limiter.acquire(10, timeout=0.1)
+
+    def test_characters_are_limited(self):
+        """Test a long text waits on the character budget."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=10**6, chars_per_minute=600)
+        limiter.acquire(50, timeout=0)
+
+        with pytest.raises(exceptions.ResourceExhausted):
+            limiter.acquire(50, timeout=0.1)
+
+    def test_waits_for_refill(self):
+        """Test a caller with enough budget sleeps until tokens refill."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=6000, chars_per_minute=10**6)
+        for _ in range(100 * limiter_module.BURST_SECONDS):
+            limiter.acquire(1, timeout=0)
+
+        limiter.acquire(1, timeout=1)
+
+        assert limiter.get_stats()["waited_seconds"] > 0
+
+
+class TestAIMD:
+    def test_throttling_halves_rate(self):
+        """Test RESOURCE_EXHAUSTED cuts the rate once per cooldown."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=1000)
+
+        limiter.on_throttled()
+        limiter.on_throttled()
+
+        assert limiter.get_stats()["scale"] == 0.5
+        assert limiter.get_stats()["requests_per_minute"] == 500
+        assert limiter.throttled == 2
+
+    def test_success_recovers_additively(self):
+        """Test successes win the rate back step by step."""
+        limiter = AdaptiveRateLimiter()
+        limiter.on_throttled()
+
+        for _ in range(10):
+            limiter.on_success()
+
+        assert limiter.get_stats()["scale"] == pytest.approx(0.6)
+
+
+class TestSharedLimiter:
+    def test_workers_share_bucket(self, redis_client):
+        """Test two processes draw from one Redis-held budget."""
+        first, second = (
+            AdaptiveRateLimiter(
+                requests_per_minute=60,
+                chars_per_minute=10**6,
+                redis_client=redis_client,
+            )
+            for _ in range(2)
+        )
+
+        for _ in range(limiter_module.BURST_SECONDS):
+            first.acquire(1, timeout=0)
+
+        with pytest.raises(exceptions.ResourceExhausted):
+            second.acquire(1, timeout=0.1)
+
+    def test_workers_share_backoff(self, redis_client):
+        """Test a throttle seen by one worker slows every worker."""
+        first, second = (
+            AdaptiveRateLimiter(redis_client=redis_client) for _ in range(2)
+        )
+
+        first.on_throttled()
+        second.acquire(1, timeout=0)
+
+        assert second.get_stats()["scale"] == 0.5
+        assert second.get_stats()["shared"]
+
+    def test_falls_back_to_local_bucket(self):
+        """Test a Redis failure does not block synthesis."""
+        client = Mock()
+        client.register_script.return_value = Mock(side_effect=ConnectionError())
+        limiter = AdaptiveRateLimiter(redis_client=client)
+
+        limiter.acquire(10, timeout=0)
+        limiter.on_throttled()
+
+        assert limiter.get_stats()["scale"] == 0.5
+
+    def test_unavailable_redis_is_skipped(self, redis_client):
+        """Test an open circuit breaker keeps the limiter local."""
+        limiter = AdaptiveRateLimiter(
+            redis_client=redis_client, is_available=lambda: False
+        )
+
+        limiter.acquire(10, timeout=0)
+
+        assert not redis_client.exists("tts:ratelimit")
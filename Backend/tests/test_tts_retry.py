@@ -0,0 +1,124 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from google.api_core import exceptions
+
+from services.tts_retry import MIN_HEDGE_SAMPLES, RetryPolicy, is_retryable
+
+
+def fast_policy(**kwargs):
+    options = {"deadline": 5, "max_attempts": 4, "initial_backoff": 0.001}
+    options.update(kwargs)
+    return RetryPolicy(**options)
+
+
+class TestRetries:
+    def test_retries_transient_errors(self):
+        """Test retryable gRPC errors are retried until a call succeeds."""
+        fn = Mock(
+            side_effect=[
+                exceptions.ServiceUnavailable("unavailable"),
+                exceptions.ResourceExhausted("quota"),
+                "audio",
+            ]
+        )
+        policy = fast_policy()
+
+        assert policy.call(fn) == "audio"
+        assert fn.call_count == 3
+        assert policy.retries == 2
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test caller errors such as INVALID_ARGUMENT fail immediately."""
+        fn = Mock(side_effect=exceptions.InvalidArgument("bad voice"))
+
+        with pytest.raises(exceptions.InvalidArgument):
+            fast_policy().call(fn)
+        fn.assert_called_once()
+
+    def test_attempt_limit(self):
+        """Test retries stop after max_attempts."""
+        fn = Mock(side_effect=exceptions.ServiceUnavailable("down"))
+
+        with pytest.raises(exceptions.ServiceUnavailable):
+            fast_policy(max_attempts=3).call(fn)
+        assert fn.call_count == 3
+
+    def test_attempts_share_the_deadline(self):
+        """Test each attempt's timeout is the budget left, not a fresh one."""
+        timeouts = []
+
+        def fn(timeout):
+            timeouts.append(timeout)
+            time.sleep(0.05)
+            if len(timeouts) < 3:
+                raise exceptions.DeadlineExceeded("slow")
+            return "audio"
+
+        assert fast_policy(deadline=1).call(fn) == "audio"
+        assert timeouts[0] <= 1
+        assert timeouts[0] > timeouts[1] > timeouts[2]
+
+    def test_gives_up_when_budget_is_spent(self):
+        """Test no retry is attempted that could not finish in time."""
+        fn = Mock(side_effect=exceptions.ServiceUnavailable("down"))
+        policy = fast_policy(deadline=0.05, initial_backoff=1, max_attempts=10)
+
+        started = time.monotonic()
+        with pytest.raises(exceptions.ServiceUnavailable):
+            policy.call(fn)
+
+        assert time.monotonic() - started < 0.5
+
+    def test_retryable_codes(self):
+        """Test the retryable set covers throttling and availability."""
+        assert is_retryable(exceptions.ResourceExhausted("quota"))
+        assert is_retryable(exceptions.DeadlineExceeded("slow"))
+        assert not is_retryable(exceptions.PermissionDenied("no"))
+        assert not is_retryable(ValueError("bug"))
+
+
+class TestHedging:
+    def warmed_policy(self, latency):
+        policy = fast_policy(hedge=True)
+        for _ in range(MIN_HEDGE_SAMPLES):
+            policy.latency.record(latency)
+        return policy
+
+    def test_no_hedge_without_history(self):
+        """Test hedging waits until latency percentiles are known."""
+        fn = Mock(return_value="audio")
+        policy = fast_policy(hedge=True)
+
+        assert policy.call(fn) == "audio"
+        assert policy.hedges_sent == 0
+
+    def test_slow_call_is_hedged(self):
+        """Test a call outliving p95 gets a duplicate and the faster one wins."""
+        first_call = threading.Event()
+        release = threading.Event()
+
+        def fn(timeout):
+            if not first_call.is_set():
+                first_call.set()
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        policy = self.warmed_policy(0.01)
+
+        assert policy.call(fn) == "fast"
+        release.set()
+        assert policy.hedges_sent == 1
+        assert policy.hedges_won == 1
+
+    def test_fast_call_is_not_hedged(self):
+        """Test calls finishing under p95 send no duplicate."""
+        fn = Mock(return_value="audio")
+        policy = self.warmed_policy(1.0)
+
+        assert policy.call(fn) == "audio"
+        fn.assert_called_once()
+        assert policy.hedges_sent == 0
@@ -0,0 +1,367 @@
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from google.api_core import exceptions
+
+from services.tts_rate_limiter import AdaptiveRateLimiter
+from services.tts_service import TTSService
+from utils.audio_cache import AudioCache
+from utils.voice_snapshot import VoiceSnapshotReader
+
+
+@pytest.fixture
+def tts_service(tmp_path):
+    """TTS service with a mocked client, private audio cache and snapshot."""
+    service = TTSService(
+        cache=AudioCache(max_memory_bytes=1024 * 1024),
+        snapshot_reader=VoiceSnapshotReader(str(tmp_path / "voices.snapshot")),
+    )
+    service._client = Mock()
+    service._client.synthesize_speech.return_value = Mock(audio_content=b"mp3-bytes")
+    return service
+
+
+class TestSynthesisCache:
+    def test_repeated_synthesis_hits_cache(self, tts_service):
+        """Test identical requests only call the TTS API once."""
+        first = tts_service.synthesize_speech("Hello", "en-US-Standard-A", "en-US")
+        second = tts_service.synthesize_speech("Hello", "en-US-Standard-A", "en-US")
+
+        assert first == second
+        assert tts_service.client.synthesize_speech.call_count == 1
+        assert tts_service.audio_cache.get_stats()["memory_hits"] == 1
+
+    def test_changed_text_misses_cache(self, tts_service):
+        """Test only changed segments are synthesized again."""
+        tts_service.synthesize_audio("Line one.", "en-US-Standard-A", "en-US")
+        tts_service.synthesize_audio("Line two.", "en-US-Standard-A", "en-US")
+        tts_service.synthesize_audio("Line one.", "en-US-Standard-A", "en-US")
+
+        assert tts_service.client.synthesize_speech.call_count == 2
+
+
+class TestSynthesizeSegments:
+    def test_results_align_with_input_order(self, tts_service):
+        """Test results keep input order and report invalid segments."""
+        tts_service.client.synthesize_speech.side_effect = lambda **kwargs: Mock(
+            audio_content=kwargs["input"].text.encode()
+        )
+        segments = [
+            {"role": "Narrator", "text": "One."},
+            {"role": "Ghost", "text": "Boo."},
+            {"role": "Narrator", "text": "Two."},
+        ]
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}
+        }
+
+        results = tts_service.synthesize_segments(segments, voice_mapping)
+
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert base64.b64decode(results[0]["audio"]) == b"One."
+        assert "error" in results[1]
+        assert base64.b64decode(results[2]["audio"]) == b"Two."
+
+    def test_repeated_lines_are_synthesized_once(self, tts_service):
+        """Test identical lines in one request share a single API call."""
+        tts_service.client.synthesize_speech.side_effect = lambda **kwargs: Mock(
+            audio_content=kwargs["input"].text.encode()
+        )
+        segments = [
+            {"role": "Narrator", "text": "Yes."},
+            {"role": "Hero", "text": "No."},
+            {"role": "Narrator", "text": " Yes. "},
+            {"role": "Hero", "text": "Yes."},
+            {"role": "Narrator", "text": "Yes."},
+        ]
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"},
+            "Hero": {"voiceName": "en-US-Standard-B", "languageCode": "en-US"},
+        }
+        plan = tts_service.plan_segments(segments, voice_mapping)
+
+        results = tts_service.synthesize_segments(
+            segments, voice_mapping, binary=True, plan=plan
+        )
+
+        assert [r["audio"] for r in results] == [
+            b"Yes.",
+            b"No.",
+            b"Yes.",
+            b"Yes.",
+            b"Yes.",
+        ]
+        assert tts_service.client.synthesize_speech.call_count == 3
+        assert plan.get_stats() == {
+            "segments": 5,
+            "uniqueSegments": 3,
+            "callsSaved": 2,
+            "charactersSaved": 8,
+        }
+
+    def test_failures_are_reported_per_segment(self, tts_service):
+        """Test one failed API call does not drop the other segments."""
+        tts_service.client.synthesize_speech.side_effect = [
+            Exception("DEADLINE_EXCEEDED"),
+            Mock(audio_content=b"ok"),
+        ]
+        tts_service.executor = ThreadPoolExecutor(max_workers=1)
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}
+        }
+
+        results = tts_service.synthesize_segments(
+            [{"role": "Narrator", "text": "A."}, {"role": "Narrator", "text": "B."}],
+            voice_mapping,
+        )
+
+        assert results[0]["error"] == "DEADLINE_EXCEEDED"
+        assert "audio" in results[1]
+
+    def test_streaming_bounds_in_flight_segments(self, tts_service):
+        """Test the generator never queues more than max_in_flight segments."""
+        submitted = []
+        original_submit = tts_service.executor.submit
+
+        def tracking_submit(*args):
+            submitted.append(args[1])
+            return original_submit(*args)
+
+        tts_service.executor = Mock(submit=tracking_submit)
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}
+        }
+        segments = [{"role": "Narrator", "text": f"Line {i}."} for i in range(10)]
+
+        stream = tts_service.iter_synthesized_segments(
+            segments, voice_mapping, max_in_flight=3
+        )
+        first = next(stream)
+
+        assert first["index"] == 0
+        assert len(submitted) == 3
+        assert [r["index"] for r in stream] == list(range(1, 10))
+
+
+class TestChunkedSynthesis:
+    def test_long_text_is_split_and_joined_in_order(self, tts_service):
+        """Test text over the byte limit becomes several ordered requests."""
+        tts_service.max_input_bytes = 20
+        tts_service.client.synthesize_speech.side_effect = lambda **kwargs: Mock(
+            audio_content=kwargs["input"].text.encode()
+        )
+
+        audio = tts_service.synthesize_audio(
+            "First sentence. Second sentence. Third sentence.",
+            "en-US-Standard-A",
+            "en-US",
+        )
+
+        assert tts_service.client.synthesize_speech.call_count == 3
+        assert audio == b"First sentence.Second sentence.Third sentence."
+
+    def test_edited_chunk_is_the_only_new_request(self, tts_service):
+        """Test unchanged chunks of a long text come from the audio cache."""
+        tts_service.max_input_bytes = 20
+        tts_service.synthesize_audio(
+            "First sentence. Second sentence.", "en-US-Standard-A", "en-US"
+        )
+        tts_service.synthesize_audio(
+            "First sentence. Second edited.", "en-US-Standard-A", "en-US"
+        )
+
+        assert tts_service.client.synthesize_speech.call_count == 3
+
+
+def make_voice(name, gender):
+    voice = Mock()
+    voice.name = name
+    voice.language_codes = ["en-US"]
+    voice.ssml_gender = gender
+    voice.natural_sample_rate_hertz = 24000
+    return voice
+
+
+class TestListVoices:
+    def test_filters_use_catalog_and_cache(self, tts_service):
+        """Test repeated filtered queries reuse one API fetch."""
+        tts_service.client.list_voices.return_value = Mock(
+            voices=[
+                make_voice("en-US-Standard-A", 2),
+                make_voice("en-US-Standard-B", 1),
+                make_voice("en-US-Wavenet-C", 2),
+            ]
+        )
+
+        female = tts_service.list_voices(gender="female")
+        wavenet = tts_service.list_voices(q="Wavenet")
+
+        assert [v["name"] for v in female] == ["en-US-Standard-A", "en-US-Wavenet-C"]
+        assert [v["name"] for v in wavenet] == ["en-US-Wavenet-C"]
+        assert tts_service.client.list_voices.call_count == 1
+
+    def test_expired_catalog_refreshes_once_in_background(self, tts_service):
+        """Test concurrent callers get the stale catalog during one refresh."""
+        tts_service.client.list_voices.return_value = Mock(
+            voices=[make_voice("en-US-Standard-A", 2)]
+        )
+        tts_service._cache_ttl = 0.5
+        tts_service.list_voices()
+        time.sleep(0.6)
+
+        release = threading.Event()
+
+        def slow_list_voices(**kwargs):
+            release.wait(5)
+            return Mock(voices=[make_voice("en-US-Standard-B", 1)])
+
+        tts_service.client.list_voices.side_effect = slow_list_voices
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: tts_service.list_voices(), range(8)))
+
+        assert all(r[0]["name"] == "en-US-Standard-A" for r in results)
+        release.set()
+        deadline = time.time() + 5
+        while tts_service.list_voices()[0]["name"] != "en-US-Standard-B":
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert tts_service.client.list_voices.call_count == 2
+
+    def test_failed_refresh_keeps_last_good_catalog(self, tts_service):
+        """Test an API outage never degrades to mock voices."""
+        tts_service.client.list_voices.return_value = Mock(
+            voices=[make_voice("en-US-Wavenet-F", 2)]
+        )
+        tts_service._cache_ttl = 0.5
+        tts_service.list_voices()
+        time.sleep(0.6)
+        tts_service.client.list_voices.side_effect = Exception("UNAVAILABLE")
+
+        tts_service.list_voices()
+        with tts_service._refresh_lock:
+            voices = tts_service.list_voices()
+
+        assert [v["name"] for v in voices] == ["en-US-Wavenet-F"]
+        assert tts_service._cache_expires_at > time.time()
+
+    def test_workers_share_published_snapshot(self, tts_service, tmp_path):
+        """Test a second worker loads the snapshot instead of calling the API."""
+        tts_service.client.list_voices.return_value = Mock(
+            voices=[make_voice("en-US-Standard-A", 2)]
+        )
+        tts_service.list_voices()
+
+        other_worker = TTSService(
+            snapshot_reader=VoiceSnapshotReader(str(tmp_path / "voices.snapshot"))
+        )
+        other_worker._client = Mock()
+
+        assert other_worker.list_voices()[0]["name"] == "en-US-Standard-A"
+        other_worker.client.list_voices.assert_not_called()
+
+    def test_unwritable_snapshot_keeps_fetched_voices(self, tmp_path):
+        """Test an unpublishable snapshot does not discard the API result."""
+        (tmp_path / "not-a-dir").write_text("")
+        service = TTSService(
+            snapshot_reader=VoiceSnapshotReader(
+                str(tmp_path / "not-a-dir" / "voices.snapshot")
+            )
+        )
+        service._client = Mock()
+        service._client.list_voices.return_value = Mock(
+            voices=[make_voice("en-US-Standard-A", 2)]
+        )
+
+        voices = service.list_voices()
+
+        assert [v["name"] for v in voices] == ["en-US-Standard-A"]
+        service.client.list_voices.assert_called_once()
+
+
+class TestSynthesisRetries:
+    def test_transient_failure_is_retried(self, tts_service):
+        """Test a throttled call is retried instead of failing the segment."""
+        tts_service.client.synthesize_speech.side_effect = [
+            exceptions.ServiceUnavailable("unavailable"),
+            Mock(audio_content=b"mp3-bytes"),
+        ]
+        tts_service.retry_policy.initial_backoff = 0.001
+
+        audio = tts_service.synthesize_audio("Hello", "en-US-Standard-A", "en-US")
+
+        assert audio == b"mp3-bytes"
+        assert tts_service.client.synthesize_speech.call_count == 2
+        timeout = tts_service.client.synthesize_speech.call_args.kwargs["timeout"]
+        assert 0 < timeout <= tts_service.retry_policy.deadline
+
+    def test_quota_errors_slow_the_limiter(self, tts_service):
+        """Test RESOURCE_EXHAUSTED backs the rate limiter off before retrying."""
+        tts_service.client.synthesize_speech.side_effect = [
+            exceptions.ResourceExhausted("quota"),
+            Mock(audio_content=b"mp3-bytes"),
+        ]
+        tts_service.retry_policy.initial_backoff = 0.001
+        tts_service.rate_limiter = AdaptiveRateLimiter()
+
+        tts_service.synthesize_audio("Hello", "en-US-Standard-A", "en-US")
+
+        assert tts_service.rate_limiter.throttled == 1
+        assert tts_service.rate_limiter.get_stats()["scale"] == pytest.approx(0.51)
+
+
+def mp3_frames(*markers):
+    # MPEG-2 Layer III frames of 24ms each, one per marker byte
+    return b"".join(bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes([m]) * 92 for m in markers)
+
+
+class TestSsmlBatching:
+    def test_short_lines_share_one_request(self, tts_service):
+        """Test short same-voice lines are sent as one SSML request and split."""
+        tts_service.ssml_batching = True
+        tts_service._beta_client = Mock()
+        tts_service._beta_client.synthesize_speech.return_value = Mock(
+            audio_content=mp3_frames(1, 1, 2, 3, 3, 3),
+            timepoints=[
+                Mock(mark_name="s0", time_seconds=0.0),
+                Mock(mark_name="s1", time_seconds=0.05),
+                Mock(mark_name="s2", time_seconds=0.07),
+            ],
+        )
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}
+        }
+        segments = [{"role": "Narrator", "text": t} for t in ("One.", "Two.", "3 < 4")]
+
+        results = tts_service.synthesize_segments(segments, voice_mapping, binary=True)
+
+        assert [r["audio"] for r in results] == [
+            mp3_frames(1, 1),
+            mp3_frames(2),
+            mp3_frames(3, 3, 3),
+        ]
+        request = tts_service._beta_client.synthesize_speech.call_args.kwargs["request"]
+        assert "3 &lt; 4" in request["input"]["ssml"]
+        assert request["enable_time_pointing"] == ["SSML_MARK"]
+        assert tts_service.client.synthesize_speech.call_count == 0
+        assert tts_service.audio_cache.get_stats()["memory_entries"] == 3
+
+    def test_failed_batch_falls_back_to_single_requests(self, tts_service):
+        """Test a batch without usable timepoints is synthesized line by line."""
+        tts_service.ssml_batching = True
+        tts_service._beta_client = Mock()
+        tts_service._beta_client.synthesize_speech.return_value = Mock(
+            audio_content=mp3_frames(1, 2), timepoints=[]
+        )
+        voice_mapping = {
+            "Narrator": {"voiceName": "en-US-Standard-A", "languageCode": "en-US"}
+        }
+        segments = [{"role": "Narrator", "text": t} for t in ("One.", "Two.")]
+
+        results = tts_service.synthesize_segments(segments, voice_mapping)
+
+        assert all("audio" in r for r in results)
+        assert tts_service.client.synthesize_speech.call_count == 2
@@ -0,0 +1,80 @@
+import pytest
+
+from services.voice_catalog import VoiceCatalog
+from services.voice_tagger import VoiceTagger
+
+VOICES = [
+    {
+        "name": "en-US-Standard-A",
+        "language_codes": ["en-US"],
+        "ssml_gender": "FEMALE",
+        "natural_sample_rate_hertz": 24000,
+    },
+    {
+        "name": "en-US-Standard-B",
+        "language_codes": ["en-US"],
+        "ssml_gender": "MALE",
+        "natural_sample_rate_hertz": 24000,
+    },
+    {
+        "name": "en-GB-Wavenet-C",
+        "language_codes": ["en-GB"],
+        "ssml_gender": "FEMALE",
+        "natural_sample_rate_hertz": 24000,
+    },
+]
+
+
+@pytest.fixture
+def catalog():
+    return VoiceCatalog(VOICES)
+
+
+class TestVoiceCatalog:
+    def test_facet_filter(self, catalog):
+        """Test facet filters are case-insensitive index lookups."""
+        names = [v["name"] for v in catalog.query({"gender": "FEMALE"})]
+        assert names == ["en-US-Standard-A", "en-GB-Wavenet-C"]
+
+    def test_facet_intersection(self, catalog):
+        """Test several facets narrow the result together."""
+        voices = catalog.query({"gender": "female", "region": "GB"})
+        assert [v["name"] for v in voices] == ["en-GB-Wavenet-C"]
+
+    def test_name_search(self, catalog):
+        """Test short and long search terms both match substrings."""
+        assert [v["name"] for v in catalog.query(q="b")] == [
+            "en-US-Standard-B",
+            "en-GB-Wavenet-C",
+        ]
+        assert [v["name"] for v in catalog.query(q="wavenet")] == ["en-GB-Wavenet-C"]
+        assert catalog.query(q="standardx") == []
+
+    def test_pagination(self, catalog):
+        """Test pages slice the filtered result."""
+        assert [v["name"] for v in catalog.query(page=2, per_page=2)] == [
+            "en-GB-Wavenet-C"
+        ]
+        assert catalog.count({"gender": "male"}) == 1
+
+    def test_records_are_shared_and_immutable(self, catalog):
+        """Test callers receive the same read-only record objects."""
+        first = catalog.query(q="standard-a")[0]
+        assert catalog.query({"gender": "female"})[0] is first
+        with pytest.raises(TypeError):
+            first["name"] = "changed"
+
+
+class TestVoiceTaggerFilter:
+    def test_filter_tagged_voices(self):
+        """Test tag filters and search text go through the catalog."""
+        tagged = VoiceTagger.tag_all_voices(VOICES)
+
+        assert len(VoiceTagger.filter_voices(tagged, {"gender": "female"})) == 2
+        assert len(VoiceTagger.filter_voices(tagged, {"search": "gb"})) == 1
+        assert VoiceTagger.filter_voices(tagged) is tagged
+
+    def test_filter_catalog_without_filters(self, catalog):
+        """Test a catalog with no filters returns all of its records."""
+        assert VoiceTagger.filter_voices(catalog) == catalog.query()
+        assert len(VoiceTagger.filter_voices(catalog, {})) == len(catalog)
@@ -0,0 +1,50 @@
+import pytest
+
+from utils.voice_snapshot import VoiceSnapshotReader, write_snapshot
+
+VOICES = [{"name": "en-US-Standard-A", "language_codes": ["en-US"]}]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "voices.snapshot")
+
+
+class TestVoiceSnapshot:
+    def test_round_trip(self, snapshot_path):
+        """Test a written snapshot is read back with its version."""
+        version = write_snapshot(VOICES, snapshot_path)
+        snapshot = VoiceSnapshotReader(snapshot_path).load()
+
+        assert snapshot.version == version
+        assert snapshot.voices == VOICES
+
+    def test_missing_file(self, snapshot_path):
+        """Test a missing snapshot reads as None."""
+        assert VoiceSnapshotReader(snapshot_path).load() is None
+
+    def test_new_version_is_picked_up(self, snapshot_path):
+        """Test readers notice and swap in a republished snapshot."""
+        reader = VoiceSnapshotReader(snapshot_path)
+        write_snapshot(VOICES, snapshot_path)
+        first = reader.load()
+        assert not reader.changed()
+
+        write_snapshot(VOICES + [{"name": "en-GB-Standard-B"}], snapshot_path)
+        assert reader.changed()
+        second = reader.load()
+
+        assert second.version > first.version
+        assert len(second.voices) == 2
+
+    def test_corrupt_snapshot_keeps_previous(self, snapshot_path):
+        """Test a damaged file never replaces the last good snapshot."""
+        reader = VoiceSnapshotReader(snapshot_path)
+        write_snapshot(VOICES, snapshot_path)
+        good = reader.load()
+
+        with open(snapshot_path, "r+b") as f:
+            f.seek(-2, 2)
+            f.write(b"xx")
+
+        assert reader.load() is good
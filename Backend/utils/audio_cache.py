@@ -0,0 +1,260 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import redis
+
+from config import Config
+
+from .cache import get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024  # 64MB
+DEFAULT_REDIS_TTL = 7 * 24 * 3600  # 1 week
+DEFAULT_DISK_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+# Pruning goes below the cap so the next few writes do not prune again
+_PRUNE_TARGET = 0.9
+
+
+def audio_cache_key(text, voice_name, language_code, audio_encoding="MP3") -> str:
+    """Content address for a synthesis request.
+
+    Fields are NUL-separated so ("ab", "c") and ("a", "bc") never collide.
+    """
+    digest = hashlib.sha256()
+    for part in (text, voice_name, language_code, audio_encoding):
+        digest.update(str(part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class DiskAudioStore:
+    """Second tier storing raw audio bytes as one file per content hash.
+
+    The directory is capped at max_bytes. Reads refresh a file's mtime, and
+    once a write takes the total over the cap the least recently used files
+    are deleted. The running total is per process; pruning rescans the
+    directory, so other workers' writes are counted there.
+    """
+
+    name = "disk"
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Pruned by another worker since the read; the bytes are still good
+            pass
+        return audio
+
+    def set(self, key: str, audio: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial audio
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            with self._lock:
+                try:
+                    replaced = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+                self._total_bytes += len(audio) - replaced
+                over_cap = self._total_bytes > self.max_bytes
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if over_cap:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete least recently used files down to 90% of max_bytes.
+
+        Returns the number of files removed.
+        """
+        with self._lock:
+            files = sorted(self._scan())
+            total = sum(size for _, _, size in files)
+            target = self.max_bytes * _PRUNE_TARGET
+            removed = 0
+            for _, path, size in files:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._total_bytes = total
+        if removed:
+            logger.info(f"Audio disk cache pruned {removed} files")
+        return removed
+
+    def _scan(self):
+        """(mtime, path, size) of every cached file."""
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, entry.path, stat.st_size
+
+
+class RedisAudioStore:
+    """Second tier storing raw audio bytes in Redis."""
+
+    name = "redis"
+
+    def __init__(self, redis_url: str, ttl: int = DEFAULT_REDIS_TTL):
+        # Shares the worker's pool; values are raw MP3 bytes
+        self.redis_client = redis.Redis(connection_pool=get_connection_pool(redis_url))
+        self.redis_client.ping()
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.redis_client.get(f"audio:{key}")
+
+    def set(self, key: str, audio: bytes):
+        self.redis_client.setex(f"audio:{key}", self.ttl, audio)
+
+
+class AudioCache:
+    """Content-addressed cache for synthesized audio.
+
+    Tier one is an in-process LRU bounded by total bytes; tier two is an
+    optional shared store (disk or Redis) holding the same raw bytes.
+    """
+
+    def __init__(self, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES, store=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.store = store
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "store_errors": 0,
+        }
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return audio
+
+        if self.store is not None:
+            try:
+                audio = self.store.get(key)
+            except Exception as e:
+                logger.error(f"Audio cache {self.store.name} get error: {e}")
+                self._count("store_errors")
+                audio = None
+            if audio is not None:
+                self._count("store_hits")
+                self._remember(key, audio)
+                return audio
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, audio: bytes):
+        self._remember(key, audio)
+        if self.store is not None:
+            try:
+                self.store.set(key, audio)
+            except Exception as e:
+                logger.error(f"Audio cache {self.store.name} set error: {e}")
+                self._count("store_errors")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["memory_hits"] + stats["store_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["store_hits"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["max_memory_bytes"] = self.max_memory_bytes
+        stats["store"] = self.store.name if self.store is not None else None
+        return stats
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _remember(self, key: str, audio: bytes):
+        size = len(audio)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._entries[key] = audio
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._stats["evictions"] += 1
+
+
+def _create_store():
+    backend = Config.AUDIO_CACHE_BACKEND.lower()
+    try:
+        if backend == "redis":
+            return RedisAudioStore(
+                os.environ.get("REDIS_URL", "redis://localhost:6379"),
+                ttl=Config.AUDIO_CACHE_TTL,
+            )
+        if backend == "disk":
+            return DiskAudioStore(
+                Config.AUDIO_CACHE_DIR
+                or os.path.join(tempfile.gettempdir(), "etoaudiobook-audio"),
+                max_bytes=Config.AUDIO_CACHE_DISK_MAX_BYTES,
+            )
+    except Exception as e:
+        logger.warning(f"Audio cache {backend} tier unavailable, memory only: {e}")
+    return None
+
+
+audio_cache = AudioCache(
+    max_memory_bytes=Config.AUDIO_CACHE_MAX_BYTES, store=_create_store()
+)
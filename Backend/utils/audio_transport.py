@@ -0,0 +1,79 @@
+import hashlib
+import json
+import uuid
+from typing import Dict, Iterable, Iterator
+from urllib.parse import quote
+
+from flask import Response, request
+
+AUDIO_MIMETYPE = "audio/mpeg"
+MULTIPART_MIMETYPE = "multipart/mixed"
+
+
+def wants_binary_audio() -> bool:
+    """True when the client negotiated raw audio over JSON with base64.
+
+    JSON stays the default, so existing clients sending no Accept header or
+    */* are unaffected. ?format=binary is accepted for plain <audio> tags.
+    """
+    if request.args.get("format") == "binary":
+        return True
+    best = request.accept_mimetypes.best_match(
+        ["application/json", AUDIO_MIMETYPE, MULTIPART_MIMETYPE],
+        default="application/json",
+    )
+    return best != "application/json"
+
+
+def audio_response(audio: bytes, headers: Dict[str, str] = None) -> Response:
+    """Serve MP3 bytes with a content-hash ETag and Range support."""
+    response = Response(audio, mimetype=AUDIO_MIMETYPE)
+    response.set_etag(hashlib.sha256(audio).hexdigest())
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response.make_conditional(
+        request, accept_ranges=True, complete_length=len(audio)
+    )
+
+
+def multipart_segments_response(results: Iterable[Dict]) -> Response:
+    """Stream segment results as multipart/mixed, one part per segment.
+
+    Successful segments are audio/mpeg parts; failures are small
+    application/json parts so the client still sees a per-segment error.
+    """
+    boundary = uuid.uuid4().hex
+    return Response(
+        _iter_multipart(results, boundary),
+        mimetype=f'{MULTIPART_MIMETYPE}; boundary="{boundary}"',
+    )
+
+
+def _iter_multipart(results: Iterable[Dict], boundary: str) -> Iterator[bytes]:
+    for result in results:
+        headers = [
+            f"X-Segment-Index: {result['index']}",
+            f"X-Segment-Role: {quote(result.get('role', ''))}",
+        ]
+        if "audio" in result:
+            body = result["audio"]
+            headers.insert(0, f"Content-Type: {AUDIO_MIMETYPE}")
+            headers.append(f'ETag: "{hashlib.sha256(body).hexdigest()}"')
+        else:
+            body = json.dumps(
+                {
+                    "index": result["index"],
+                    "role": result.get("role", ""),
+                    "error": result.get("error"),
+                }
+            ).encode("utf-8")
+            headers.insert(0, "Content-Type: application/json")
+        headers.append(f"Content-Length: {len(body)}")
+
+        yield (f"--{boundary}\r\n" + "\r\n".join(headers) + "\r\n\r\n").encode(
+            "latin-1"
+        )
+        yield body
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("latin-1")
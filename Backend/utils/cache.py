@@ -1,77 +1,860 @@
+import dataclasses
+import datetime
+import decimal
+import enum
 import hashlib
-import json
+import inspect
 import logging
+import math
 import os
-from functools import wraps
-from typing import Any, Optional
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from pathlib import PurePath
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional
 
 import redis
 
+from .cache_codec import CacheCodec
+
 logger = logging.getLogger(__name__)
 
+# How long a namespace generation read from Redis is trusted locally
+NAMESPACE_VERSION_TTL = 5
+
+# Seconds a @cached leader may hold the cross-process recompute lease
+CACHE_LEASE_TIMEOUT = 30
+LEASE_POLL_INTERVAL = 0.05
+# XFetch beta; above 1 favours earlier recomputation
+EARLY_EXPIRY_BETA = 1.0
+_ENVELOPE = "__cached__"
+# Value types whose repr() fully identifies them, usable as cache key parts
+_REPR_KEY_TYPES = (
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    decimal.Decimal,
+    enum.Enum,
+    uuid.UUID,
+    PurePath,
+)
+
+# In-process tier in front of Redis; CACHE_L1_MAX_BYTES=0 turns it off
+DEFAULT_L1_MAX_BYTES = 16 * 1024 * 1024
+# Upper bound on L1 lifetime in case an invalidation message is missed
+DEFAULT_L1_TTL = 60
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+DEFAULT_POOL_MAX_CONNECTIONS = 50
+DEFAULT_SOCKET_TIMEOUT = 0.5
+# Consecutive Redis failures before the cache is bypassed
+BREAKER_FAILURE_THRESHOLD = 5
+# Seconds an open breaker waits before letting one call probe Redis
+BREAKER_RESET_TIMEOUT = 5
+
+
+class LocalCache:
+    """Thread-safe LRU of encoded values bounded by bytes and per-entry TTL.
+
+    Values are kept in their encoded form and decoded on every hit, so
+    callers never share (and accidentally mutate) one cached object.
+    """
+
+    def __init__(self, max_bytes: int, max_ttl: float):
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            data, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key: str, data: bytes, ttl: float):
+        if len(data) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + min(ttl, self.max_ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, expires_at)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._remove(key):
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[0])
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency until a probe finds it healthy.
+
+    After failure_threshold consecutive failures the breaker opens and
+    callers skip the dependency without waiting on timeouts. Once
+    reset_timeout has passed, the next allow() goes half-open: that caller
+    runs probe() and closes the breaker if it succeeds, while the others
+    keep skipping. Nothing runs in the background, so a breaker inherited
+    by a forked worker recovers just the same.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Any],
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        self._probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._open = False
+        self._probing = False
+        self._retry_at = 0.0
+        self._trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def allow(self) -> bool:
+        """Whether to call the dependency now, probing it when due."""
+        if not self._open:
+            return True
+        with self._lock:
+            if not self._open:
+                return True
+            if self._probing or time.monotonic() < self._retry_at:
+                return False
+            self._probing = True
+
+        try:
+            self._probe()
+        except Exception as e:
+            logger.debug(f"Redis probe failed: {e}")
+            with self._lock:
+                self._probing = False
+                self._retry_at = time.monotonic() + self.reset_timeout
+            return False
+
+        with self._lock:
+            self._probing = False
+            self._open = False
+            self._failures = 0
+        logger.info("Redis circuit closed, cache re-enabled")
+        return True
+
+    def record_success(self):
+        self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures < self.failure_threshold:
+                return
+        self.trip()
+
+    def trip(self):
+        with self._lock:
+            if self._open:
+                return
+            self._open = True
+            self._trips += 1
+            self._retry_at = time.monotonic() + self.reset_timeout
+        logger.warning("Redis circuit opened, cache bypassed until it recovers")
+
+    def _after_fork(self):
+        # A probe running in another thread at fork time never finishes here
+        self._lock = threading.Lock()
+        self._probing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": "open" if self._open else "closed",
+            "consecutive_failures": self._failures,
+            "trips": self._trips,
+        }
+
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(redis_url: Optional[str] = None) -> redis.ConnectionPool:
+    """Return the worker's shared connection pool for redis_url.
+
+    Callers block for at most REDIS_POOL_TIMEOUT seconds when all
+    REDIS_POOL_MAX_CONNECTIONS connections are busy, and every socket
+    operation is bounded by REDIS_SOCKET_TIMEOUT. Clients on the pool must
+    not decode responses.
+    """
+    redis_url = redis_url or os.environ.get("REDIS_URL", "redis://localhost:6379")
+    with _pools_lock:
+        pool = _pools.get(redis_url)
+        if pool is None:
+            socket_timeout = float(
+                os.environ.get("REDIS_SOCKET_TIMEOUT", DEFAULT_SOCKET_TIMEOUT)
+            )
+            pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=int(
+                    os.environ.get(
+                        "REDIS_POOL_MAX_CONNECTIONS", DEFAULT_POOL_MAX_CONNECTIONS
+                    )
+                ),
+                timeout=float(os.environ.get("REDIS_POOL_TIMEOUT", "1")),
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+            )
+            _pools[redis_url] = pool
+    return pool
+
 
 class CacheManager:
-    def __init__(self):
-        redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
+    """Redis-backed cache of arbitrary values encoded by a CacheCodec.
+
+    The client must return raw bytes (no decode_responses) so binary
+    payloads such as audio round-trip without base64 or JSON overhead.
+
+    Reads are served from a LocalCache first when one is configured. Every
+    set or delete publishes the key on INVALIDATION_CHANNEL so the other
+    workers drop their local copy; namespace bumps are broadcast the same
+    way. The local tier and its listener thread are started on first use
+    in each process, so workers forked from a preloading master get their
+    own instead of a copy of the master's that hears no invalidations.
+
+    Redis calls go through a CircuitBreaker: while it is open the cache
+    behaves as disabled, so an outage costs a flag check per call.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        codec: Optional[CacheCodec] = None,
+        l1_max_bytes: Optional[int] = None,
+    ):
+        self.codec = codec or CacheCodec()
+        self._instance_id = uuid.uuid4().hex
+        self._redis_hits = 0
+        self._redis_misses = 0
+        self._redis_errors = 0
+        self._namespace_versions = {}
+        self._namespace_lock = threading.Lock()
+        self._l1: Optional[LocalCache] = None
+        self._l1_pid = None
+        self._l1_lock = threading.Lock()
+        self._listener = None
+        if l1_max_bytes is None:
+            l1_max_bytes = int(
+                os.environ.get("CACHE_L1_MAX_BYTES", DEFAULT_L1_MAX_BYTES)
+            )
+        self._l1_max_bytes = l1_max_bytes
+        self._l1_ttl = float(os.environ.get("CACHE_L1_TTL", DEFAULT_L1_TTL))
+        _managers.add(self)
+
+        if redis_client is None:
+            redis_client = redis.Redis(connection_pool=get_connection_pool())
+        self.redis_client = redis_client
+        self.breaker = CircuitBreaker(
+            probe=self.redis_client.ping,
+            failure_threshold=int(
+                os.environ.get("REDIS_BREAKER_THRESHOLD", BREAKER_FAILURE_THRESHOLD)
+            ),
+            reset_timeout=float(
+                os.environ.get("REDIS_BREAKER_RESET_TIMEOUT", BREAKER_RESET_TIMEOUT)
+            ),
+        )
         try:
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
             self.redis_client.ping()
-            self.enabled = True
             logger.info("Redis cache enabled")
         except Exception as e:
             logger.warning(f"Redis unavailable, caching disabled: {e}")
-            self.redis_client = None
-            self.enabled = False
+            self.breaker.trip()
 
-    def get(self, key: str) -> Optional[Any]:
-        if not self.enabled:
-            return None
+    @property
+    def enabled(self) -> bool:
+        if not self.breaker.allow():
+            return False
+        # Namespace versions rely on the invalidation feed even without L1
+        if self._l1_pid != os.getpid():
+            self._start_l1()
+        return True
+
+    @property
+    def redis_available(self) -> bool:
+        """Whether Redis was reachable as of the last call or probe."""
+        return not self.breaker.is_open
+
+    @property
+    def l1(self) -> Optional[LocalCache]:
+        """This process's local tier, None while it is off."""
+        if self._l1_pid != os.getpid() and not self.breaker.is_open:
+            self._start_l1()
+        return self._l1
+
+    @l1.setter
+    def l1(self, value: Optional[LocalCache]):
+        self._l1 = value
+
+    def _start_l1(self):
+        with self._l1_lock:
+            if self._l1_pid == os.getpid():
+                return
+            self._l1_pid = os.getpid()
+            if self._l1_max_bytes > 0:
+                self._l1 = LocalCache(self._l1_max_bytes, self._l1_ttl)
+                self._subscribe()
+
+    def _after_fork(self):
+        # The parent's listener thread is gone in the child and its L1
+        # would never hear of later writes; l1 starts both again on first
+        # use. Messages are tagged per process, so the id is renewed too.
+        self._instance_id = uuid.uuid4().hex
+        self._l1 = None
+        self._l1_pid = None
+        self._listener = None
+        self._l1_lock = threading.Lock()
+        self._namespace_lock = threading.Lock()
+        self.breaker._after_fork()
+
+    def _failed(self, action: str, error: Exception):
+        self._redis_errors += 1
+        self.breaker.record_failure()
+        logger.error(f"Cache {action} error: {error}")
+
+    def _subscribe(self):
         try:
-            data = self.redis_client.get(key)
-            return json.loads(data) if data else None
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=self._on_listener_error,
+            )
         except Exception as e:
-            logger.error(f"Cache get error: {e}")
-            return None
+            # Without invalidations the local tier could serve stale data
+            logger.warning(f"Cache invalidation feed unavailable, L1 disabled: {e}")
+            self.l1 = None
+
+    def _on_listener_error(self, error, pubsub, thread):
+        logger.error(f"Cache invalidation feed lost, L1 disabled: {error}")
+        self.l1 = None
+        thread.stop()
+
+    def _on_invalidation(self, message):
+        sender, _, key = message["data"].decode().partition(" ")
+        if sender == self._instance_id or self.l1 is None:
+            return
+        if key.startswith("ns:"):
+            with self._namespace_lock:
+                self._namespace_versions.pop(key[3:], None)
+        else:
+            self.l1.invalidate(key)
+
+    def _invalidation_message(self, key: str) -> str:
+        return f"{self._instance_id} {key}"
+
+    def _publish_invalidation(self, key: str):
+        if self.l1 is None:
+            return
+        try:
+            self.redis_client.publish(
+                INVALIDATION_CHANNEL, self._invalidation_message(key)
+            )
+        except Exception as e:
+            self._failed("invalidation publish", e)
+
+    def close(self):
+        # Keeps l1 from restarting the listener after it was stopped
+        self._l1_pid = os.getpid()
+        self._l1 = None
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def namespace_key(self, namespace: str, key: str) -> str:
+        """Prefix key with the namespace's current generation.
+
+        Bumping the generation orphans every key of the old one at once;
+        they are never read again and expire through their own TTL.
+        """
+        return f"{namespace}:v{self.get_namespace_version(namespace)}:{key}"
+
+    def get_namespace_version(self, namespace: str) -> int:
+        now = time.time()
+        with self._namespace_lock:
+            cached_version = self._namespace_versions.get(namespace)
+        if cached_version is not None and cached_version[1] > now:
+            return cached_version[0]
+
+        version = 0
+        if self.enabled:
+            try:
+                version = int(self.redis_client.get(f"ns:{namespace}:version") or 0)
+            except Exception as e:
+                self._failed("namespace version", e)
+                if cached_version is not None:
+                    return cached_version[0]
+
+        with self._namespace_lock:
+            self._namespace_versions[namespace] = (
+                version,
+                now + NAMESPACE_VERSION_TTL,
+            )
+        return version
+
+    def bump_namespace(self, namespace: str) -> int:
+        """Invalidate a namespace without touching any other keys."""
+        version = self.get_namespace_version(namespace) + 1
+        if self.enabled:
+            try:
+                version = int(self.redis_client.incr(f"ns:{namespace}:version"))
+            except Exception as e:
+                self._failed("namespace bump", e)
+        with self._namespace_lock:
+            self._namespace_versions[namespace] = (
+                version,
+                time.time() + NAMESPACE_VERSION_TTL,
+            )
+        self._publish_invalidation(f"ns:{namespace}")
+        logger.info(f"Cache namespace {namespace} bumped to v{version}")
+        return version
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Fetch several keys; L1 misses cost a single pipelined round-trip."""
+        if not keys or not self.enabled:
+            return {}
+        l1 = self.l1
+        found: Dict[str, bytes] = {}
+        missing = []
+        for key in keys:
+            data = l1.get(key) if l1 is not None else None
+            if data is None:
+                missing.append(key)
+            else:
+                found[key] = data
+
+        if missing:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key in missing:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                replies = pipe.execute()
+            except Exception as e:
+                self._failed("get", e)
+                replies = []
+            else:
+                self.breaker.record_success()
+            for key, data, ttl_ms in zip(missing, replies[::2], replies[1::2]):
+                if data is None:
+                    self._redis_misses += 1
+                    continue
+                self._redis_hits += 1
+                found[key] = data
+                if l1 is not None and ttl_ms > 0:
+                    l1.set(key, data, ttl_ms / 1000)
+
+        values = {}
+        for key, data in found.items():
+            try:
+                values[key] = self.codec.loads(data)
+            except Exception as e:
+                logger.warning(f"Ignoring undecodable cache entry {key}: {e}")
+        return values
 
     def set(self, key: str, value: Any, ttl: int = 3600):
-        if not self.enabled:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping: Dict[str, Any], ttl: int = 3600):
+        """Store several values with one pipelined round-trip."""
+        if not mapping or not self.enabled:
             return
+        encoded = {key: self.codec.dumps(value) for key, value in mapping.items()}
+        l1 = self.l1
         try:
-            self.redis_client.setex(key, ttl, json.dumps(value, default=str))
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, data in encoded.items():
+                pipe.setex(key, ttl, data)
+                if l1 is not None:
+                    pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message(key))
+            pipe.execute()
         except Exception as e:
-            logger.error(f"Cache set error: {e}")
+            self._failed("set", e)
+            return
+        self.breaker.record_success()
+        if l1 is not None:
+            for key, data in encoded.items():
+                l1.set(key, data, ttl)
 
     def delete(self, key: str):
+        if self.l1 is not None:
+            self.l1.invalidate(key)
         if not self.enabled:
             return
         try:
             self.redis_client.delete(key)
         except Exception as e:
-            logger.error(f"Cache delete error: {e}")
+            self._failed("delete", e)
+            return
+        self._publish_invalidation(key)
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-tier hit rates; l1 is None when the local tier is off."""
+        lookups = self._redis_hits + self._redis_misses
+        l1 = self.l1
+        return {
+            "l1": l1.get_stats() if l1 is not None else None,
+            "redis": {
+                "hits": self._redis_hits,
+                "misses": self._redis_misses,
+                "hit_rate": self._redis_hits / lookups if lookups else 0.0,
+                "errors": self._redis_errors,
+            },
+            "breaker": self.breaker.get_stats(),
+        }
+
+    def acquire_lease(self, key: str, timeout: float) -> Optional[str]:
+        """Try to become the one process recomputing key.
+
+        Returns a token for release_lease, or None while another process
+        holds the lease. Without Redis every caller is its own leader.
+        """
+        token = uuid.uuid4().hex
+        if not self.enabled:
+            return token
+        try:
+            acquired = self.redis_client.set(
+                f"lock:{key}", token, nx=True, px=int(timeout * 1000)
+            )
+        except Exception as e:
+            self._failed("lease", e)
+            return token
+        return token if acquired else None
+
+    def release_lease(self, key: str, token: str):
+        """Drop the lease only if it is still ours and has not expired."""
+        if not self.enabled:
+            return
+        lock_key = f"lock:{key}"
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) != token.encode():
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.delete(lock_key)
+                pipe.execute()
+        except redis.WatchError:
+            pass
+        except Exception as e:
+            self._failed("lease release", e)
+
+
+# Live managers, so a forked child can reset their per-process state
+_managers: "weakref.WeakSet[CacheManager]" = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for manager in list(_managers):
+        manager._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 cache = CacheManager()
 
 
-def cached(ttl: int = 3600, key_prefix: str = ""):
-    """Decorator for caching function results."""
+@lru_cache(maxsize=None)
+def _key_signature(func):
+    signature = inspect.signature(func)
+    params = list(signature.parameters)
+    skip_first = bool(params) and params[0] in ("self", "cls")
+    return signature, skip_first
+
+
+def _feed(hasher, value):
+    """Hash value by content with type tags, independent of process state."""
+    if value is None or isinstance(value, (bool, int, float)):
+        hasher.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        hasher.update(b"s%d:" % len(data))
+        hasher.update(data)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        hasher.update(b"b%d:" % len(value))
+        hasher.update(value)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"l%d:" % len(value))
+        for item in value:
+            _feed(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(b"d%d:" % len(value))
+        items = sorted(
+            ((_digest(key), item) for key, item in value.items()),
+            key=lambda pair: pair[0],
+        )
+        for key_hash, item in items:
+            hasher.update(key_hash)
+            _feed(hasher, item)
+    elif isinstance(value, (set, frozenset)):
+        hasher.update(b"t%d:" % len(value))
+        for item_hash in sorted(_digest(item) for item in value):
+            hasher.update(item_hash)
+    elif hasattr(value, "__cache_key__"):
+        _feed(hasher, value.__cache_key__())
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        _feed_type(hasher, value)
+        _feed(
+            hasher, [getattr(value, field.name) for field in dataclasses.fields(value)]
+        )
+    elif isinstance(value, _REPR_KEY_TYPES):
+        _feed_type(hasher, value)
+        _feed(hasher, repr(value))
+    else:
+        # Hashing only the type would give distinct instances one key
+        raise TypeError(
+            f"Cannot build a cache key from {type(value).__qualname__};"
+            " define __cache_key__() on it"
+        )
+
+
+def _feed_type(hasher, value):
+    kind = type(value)
+    hasher.update(f"o{kind.__module__}.{kind.__qualname__}:".encode())
+
+
+def _digest(value) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    _feed(hasher, value)
+    return hasher.digest()
+
+
+def default_key_builder(func, args, kwargs) -> str:
+    """Build a stable key from the function and its canonical arguments.
+
+    Positional and keyword spellings of the same call map to one key,
+    defaults are filled in, and a leading self/cls is ignored so method
+    results are shared across instances and processes. Dataclasses and
+    common value types are hashed by content; other objects must define
+    __cache_key__(), or TypeError is raised.
+    """
+    signature, skip_first = _key_signature(func)
+    try:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())
+    except TypeError:
+        arguments = list(enumerate(args)) + sorted(kwargs.items())
+        skip_first = False
+    if skip_first:
+        arguments = arguments[1:]
+
+    hasher = hashlib.blake2b(digest_size=20)
+    _feed(hasher, arguments)
+    return f"{func.__module__}.{func.__qualname__}:{hasher.hexdigest()}"
+
+
+class _Flight:
+    """One in-process computation that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _should_recompute_early(entry: Dict, beta: float = EARLY_EXPIRY_BETA) -> bool:
+    """XFetch: recompute ahead of expiry with probability rising toward it.
+
+    Entries that took longer to compute start refreshing earlier, so a
+    single caller usually rebuilds a hot key before it ever expires.
+    """
+    gap = -entry["delta"] * beta * math.log(1.0 - random.random())
+    return time.time() + gap >= entry["expiry"]
+
+
+def _wait_for_value(cache_key: str, timeout: float) -> Optional[Dict]:
+    """Poll for the value another process is computing under its lease."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LEASE_POLL_INTERVAL)
+        entry = cache.get(cache_key)
+        if isinstance(entry, dict) and entry.get(_ENVELOPE):
+            return entry
+    return None
+
+
+def _compute_and_store(
+    cache_key: str, compute: Callable, ttl: int, stale: Optional[Dict]
+) -> Any:
+    token = cache.acquire_lease(cache_key, CACHE_LEASE_TIMEOUT)
+    if token is None:
+        # Another process is recomputing: serve stale data if we have it,
+        # otherwise wait for its result before falling back to our own call.
+        if stale is not None:
+            return stale["value"]
+        entry = _wait_for_value(cache_key, CACHE_LEASE_TIMEOUT)
+        if entry is not None:
+            return entry["value"]
+        logger.warning(f"Cache lease on {cache_key} timed out, computing anyway")
+
+    try:
+        started = time.time()
+        result = compute()
+        finished = time.time()
+        cache.set(
+            cache_key,
+            {
+                _ENVELOPE: 1,
+                "value": result,
+                "delta": finished - started,
+                "expiry": finished + ttl,
+            },
+            ttl,
+        )
+        return result
+    finally:
+        if token is not None:
+            cache.release_lease(cache_key, token)
+
+
+def _coalesced(
+    cache_key: str, compute: Callable, ttl: int, stale: Optional[Dict]
+) -> Any:
+    """Run compute once per key in this process; other callers share it."""
+    with _flights_lock:
+        flight = _flights.get(cache_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[cache_key] = _Flight()
+
+    if not leader:
+        if stale is not None:
+            return stale["value"]
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _compute_and_store(cache_key, compute, ttl, stale)
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(cache_key, None)
+        flight.done.set()
+
+
+def cached(
+    ttl: int = 3600,
+    key_prefix: str = "",
+    namespace: Optional[str] = None,
+    key_builder: Optional[Callable[..., str]] = None,
+):
+    """Decorator for caching function results.
+
+    key_builder(func, args, kwargs) derives the cache key and defaults to
+    default_key_builder.
+
+    Results cached under a namespace are invalidated together by
+    cache.bump_namespace(namespace).
+
+    Concurrent misses on one key are coalesced: within a process callers
+    wait for a single computation, and across processes a Redis lease
+    elects one leader while the rest poll for its result. Hot entries are
+    refreshed probabilistically before they expire (XFetch), with the old
+    value served to everyone else meanwhile.
+    """
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key
-            key_data = f"{key_prefix}:{func.__name__}:{str(args)}:{str(sorted(kwargs.items()))}"
-            cache_key = hashlib.md5(key_data.encode()).hexdigest()
+            try:
+                cache_key = (key_builder or default_key_builder)(func, args, kwargs)
+            except TypeError as e:
+                # Without a key that tells the arguments apart a hit could
+                # return another call's result, so this call is not cached
+                logger.warning(f"Not caching {func.__qualname__}: {e}")
+                return func(*args, **kwargs)
+            if key_prefix:
+                cache_key = f"{key_prefix}:{cache_key}"
+            if namespace:
+                cache_key = cache.namespace_key(namespace, cache_key)
 
             # Try to get from cache
-            result = cache.get(cache_key)
-            if result is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return result
-
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
+            entry = cache.get(cache_key)
+            if isinstance(entry, dict) and entry.get(_ENVELOPE):
+                if not _should_recompute_early(entry):
+                    logger.debug(f"Cache hit for {func.__name__}")
+                    return entry["value"]
+                logger.debug(f"Early recompute for {func.__name__}")
+                stale = entry
+            else:
+                stale = None
+
+            result = _coalesced(cache_key, lambda: func(*args, **kwargs), ttl, stale)
             logger.debug(f"Cache miss for {func.__name__}, result cached")
             return result
 
@@ -0,0 +1,153 @@
+import logging
+import os
+import pickle
+import zlib
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Payloads smaller than this are stored uncompressed
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# Two-byte header: serializer, then compression
+_PICKLE = b"p"
+_MSGPACK = b"m"
+_RAW = b"n"
+_ZLIB = b"z"
+_ZSTD = b"s"
+
+# msgpack would turn tuples into lists; they travel as this extension type
+_TUPLE_EXT = 1
+
+
+class CodecError(ValueError):
+    """Raised for stored data this codec cannot decode."""
+
+
+class CacheCodec:
+    """Binary encoding for cached values.
+
+    Values are serialized with msgpack when it is installed and the value
+    fits its type system, otherwise with pickle protocol 5, which keeps
+    bytes such as audio unchanged. Either way a value reads back with the
+    types it was stored with: tuples stay tuples, and subclasses such as
+    namedtuples fall back to pickle. Payloads over compress_min_bytes are
+    compressed with zstd when available, else zlib. The header records
+    both choices, so processes configured differently still read each
+    other's entries.
+
+    Pickle is only safe for data this service wrote itself; the cache must
+    not be reachable by untrusted clients.
+    """
+
+    def __init__(
+        self,
+        serializer: str = None,
+        compression: str = None,
+        compress_min_bytes: int = None,
+    ):
+        serializer = serializer or os.environ.get("CACHE_SERIALIZER", "auto")
+        compression = compression or os.environ.get("CACHE_COMPRESSION", "auto")
+        if compress_min_bytes is None:
+            compress_min_bytes = int(
+                os.environ.get("CACHE_COMPRESS_MIN_BYTES", DEFAULT_COMPRESS_MIN_BYTES)
+            )
+
+        if serializer == "auto":
+            serializer = "msgpack" if msgpack is not None else "pickle"
+        if serializer not in ("msgpack", "pickle"):
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if serializer == "msgpack" and msgpack is None:
+            raise ValueError("msgpack serializer requested but not installed")
+
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if compression not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requested but not installed")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+
+    def dumps(self, value: Any) -> bytes:
+        kind, payload = self._serialize(value)
+        method = _RAW
+        if self.compression != "none" and len(payload) >= self.compress_min_bytes:
+            method, payload = self._compress(payload)
+        return kind + method + payload
+
+    def loads(self, data: bytes) -> Any:
+        if len(data) < 2:
+            raise CodecError("truncated cache entry")
+        kind, method, payload = data[:1], data[1:2], memoryview(data)[2:]
+
+        if method == _ZLIB:
+            payload = zlib.decompress(payload)
+        elif method == _ZSTD:
+            if zstandard is None:
+                raise CodecError("zstd entry but zstandard is not installed")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif method != _RAW:
+            raise CodecError(f"unknown compression {method!r}")
+
+        if kind == _PICKLE:
+            return pickle.loads(payload)
+        if kind == _MSGPACK:
+            if msgpack is None:
+                raise CodecError("msgpack entry but msgpack is not installed")
+            return _msgpack_loads(payload)
+        raise CodecError(f"unknown serializer {kind!r}")
+
+    def _serialize(self, value: Any):
+        if self.serializer == "msgpack":
+            try:
+                return _MSGPACK, _msgpack_dumps(value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return _PICKLE, pickle.dumps(value, protocol=5)
+
+    def _compress(self, payload: bytes):
+        if self.compression == "zstd":
+            compressed = zstandard.ZstdCompressor(level=3).compress(payload)
+            method = _ZSTD
+        else:
+            compressed = zlib.compress(payload, 6)
+            method = _ZLIB
+        # Already-compressed data such as MP3 rarely shrinks; keep it raw
+        if len(compressed) >= len(payload):
+            return _RAW, payload
+        return method, compressed
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    # strict_types sends tuples and subclasses of builtins to _to_ext
+    return msgpack.packb(value, use_bin_type=True, strict_types=True, default=_to_ext)
+
+
+def _to_ext(value: Any):
+    if type(value) is tuple:
+        return msgpack.ExtType(_TUPLE_EXT, _msgpack_dumps(list(value)))
+    # Anything else msgpack cannot restore exactly is left to pickle
+    raise TypeError(f"{type(value).__qualname__} is not msgpack serializable")
+
+
+def _msgpack_loads(payload) -> Any:
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False, ext_hook=_from_ext)
+
+
+def _from_ext(code: int, data: bytes):
+    if code == _TUPLE_EXT:
+        return tuple(_msgpack_loads(data))
+    raise CodecError(f"unknown msgpack extension {code}")
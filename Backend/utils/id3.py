@@ -0,0 +1,58 @@
+import struct
+from typing import NamedTuple, Sequence
+
+# CTOC stores its entry count in one byte
+MAX_TOC_ENTRIES = 255
+
+
+class Chapter(NamedTuple):
+    title: str
+    start_ms: int
+    end_ms: int
+
+
+def _syncsafe(size: int) -> bytes:
+    return bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def _frame(frame_id: bytes, body: bytes) -> bytes:
+    # ID3v2.3 frame sizes are plain big-endian integers
+    return frame_id + struct.pack(">I", len(body)) + b"\x00\x00" + body
+
+
+def _text_frame(frame_id: bytes, text: str) -> bytes:
+    # Encoding 1 is UTF-16 with BOM, the only Unicode option in v2.3
+    return _frame(frame_id, b"\x01" + text.encode("utf-16"))
+
+
+def chapter_tag(chapters: Sequence[Chapter], title: str = "") -> bytes:
+    """An ID3v2.3 tag with a CHAP frame per chapter and a CTOC listing them.
+
+    Chapter times are in milliseconds from the start of the audio. Byte
+    offsets are left unset, which tells players to seek by time.
+    """
+    element_ids = [f"chp{index}".encode("ascii") for index in range(len(chapters))]
+    listed = element_ids[:MAX_TOC_ENTRIES]
+    toc = (
+        b"toc\x00"
+        # Top-level and ordered
+        + bytes([0x03, len(listed)])
+        + b"".join(element_id + b"\x00" for element_id in listed)
+    )
+    frames = [_frame(b"CTOC", toc)] if chapters else []
+    if title:
+        frames.insert(0, _text_frame(b"TIT2", title))
+
+    for element_id, chapter in zip(element_ids, chapters):
+        body = (
+            element_id
+            + b"\x00"
+            + struct.pack(
+                ">IIII", chapter.start_ms, chapter.end_ms, 0xFFFFFFFF, 0xFFFFFFFF
+            )
+            + _text_frame(b"TIT2", chapter.title)
+        )
+        frames.append(_frame(b"CHAP", body))
+
+    body = b"".join(frames)
+    return b"ID3\x03\x00\x00" + _syncsafe(len(body)) + body
@@ -0,0 +1,295 @@
+import os
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Bitrates in kbps by (MPEG-1?, layer); index 0 is "free", 15 is invalid
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits: 0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+
+class Frame(NamedTuple):
+    offset: int
+    length: int
+    samples: int
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+
+def _frame_layout(b1: int, b2: int) -> Optional[Tuple[int, int, int]]:
+    """(length, samples, sample_rate) for header bytes 1-2, None if invalid."""
+    if b1 & 0xE0 != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate
+
+
+# A book repeats a handful of headers hundreds of thousands of times
+_LAYOUTS = {}
+
+
+def _parse_header(data, offset: int) -> Optional[Frame]:
+    if offset + 4 > len(data) or data[offset] != 0xFF:
+        return None
+    key = (data[offset + 1] << 8) | data[offset + 2]
+    try:
+        layout = _LAYOUTS[key]
+    except KeyError:
+        layout = _LAYOUTS[key] = _frame_layout(key >> 8, key & 0xFF)
+    if layout is None:
+        return None
+    return Frame(offset, *layout)
+
+
+def id3v2_size(data) -> int:
+    """Length of a leading ID3v2 tag, or 0 when there is none."""
+    if len(data) < 10 or bytes(data[:3]) != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(data, frame: Frame) -> bool:
+    """True for a Xing/Info/VBRI header frame, which carries no audio."""
+    body = bytes(data[frame.offset : frame.offset + min(frame.length, 64)])
+    return any(tag in body for tag in (b"Xing", b"Info", b"VBRI"))
+
+
+def iter_frames(data) -> Iterator[Frame]:
+    """Yield the audio frames of an MP3 stream, bytes or memoryview.
+
+    A leading ID3v2 tag and Xing/Info header frame are skipped, and bytes
+    that are not a valid frame (a trailing ID3v1 tag, garbage) are stepped
+    over one at a time until sync is found again. Sync only counts once a
+    frame is followed by another header, the end of data or an ID3v1 tag,
+    so stray 0xFFE bit patterns in garbage are not taken for frames.
+    """
+    offset = id3v2_size(data)
+    first = True
+    synced = False
+    end = len(data)
+    layouts = _LAYOUTS
+    while offset < end:
+        # _parse_header inlined; this loop runs once per frame of a book
+        layout = None
+        if offset + 4 <= end and data[offset] == 0xFF:
+            key = (data[offset + 1] << 8) | data[offset + 2]
+            layout = layouts.get(key, False)
+            if layout is False:
+                layout = layouts[key] = _frame_layout(key >> 8, key & 0xFF)
+        if layout is None or layout[0] <= 4 or offset + layout[0] > end:
+            offset += 1
+            synced = False
+            continue
+        frame = Frame(offset, *layout)
+        following = offset + frame.length
+        if not synced and not (
+            following == end
+            or _parse_header(data, following) is not None
+            or bytes(data[following : following + 3]) == b"TAG"
+        ):
+            offset += 1
+            continue
+        synced = True
+        if not (first and _is_info_frame(data, frame)):
+            yield frame
+        first = False
+        offset = following
+
+
+def frame_runs(data) -> Iterator[memoryview]:
+    """Contiguous spans of audio frames in data, as views without copies.
+
+    A clean clip is a single run; tags, the info frame and any garbage
+    fall between runs and are left out.
+    """
+    view = memoryview(data)
+    run_start = run_end = None
+    for frame in iter_frames(view):
+        if frame.offset != run_end:
+            if run_start is not None:
+                yield view[run_start:run_end]
+            run_start = frame.offset
+        run_end = frame.offset + frame.length
+    if run_start is not None:
+        yield view[run_start:run_end]
+
+
+class ClipStats(NamedTuple):
+    frames: int
+    bytes: int
+    duration: float
+    # The first frame's header, None when the clip had no frames
+    header: Optional[bytes]
+
+
+def write_frames(fd: int, data) -> ClipStats:
+    """Write the audio frames of one clip straight to a file descriptor.
+
+    The frames go from the clip's own buffer to os.write as memoryview
+    slices, so nothing is decoded, re-encoded or copied in Python.
+    """
+    view = memoryview(data)
+    frames = written = 0
+    duration = 0.0
+    header = None
+    run_start = run_end = None
+    for frame in iter_frames(view):
+        if header is None:
+            header = bytes(view[frame.offset : frame.offset + 4])
+        frames += 1
+        duration += frame.duration
+        if frame.offset != run_end:
+            if run_start is not None:
+                written += write_all(fd, view[run_start:run_end])
+            run_start = frame.offset
+        run_end = frame.offset + frame.length
+    if run_start is not None:
+        written += write_all(fd, view[run_start:run_end])
+    return ClipStats(frames, written, duration, header)
+
+
+def write_all(fd: int, data) -> int:
+    """os.write until all of data is written; returns its length."""
+    view = memoryview(data)
+    total = len(view)
+    while view:
+        view = view[os.write(fd, view) :]
+    return total
+
+
+def join_clips(clips: Iterable[bytes]) -> bytes:
+    """Concatenate clips into one MP3, dropping each clip's tags and info frame.
+
+    A clip with no MP3 frames at all is passed through unchanged rather
+    than silently dropped.
+    """
+    out = bytearray()
+    for clip in clips:
+        runs = list(frame_runs(clip))
+        if not runs:
+            out += clip
+        for run in runs:
+            out += run
+    return bytes(out)
+
+
+def _main_data_begin(data, frame: Frame) -> int:
+    """How many bytes back, in earlier frames, a frame's audio data starts.
+
+    Layer III frames borrow space from the frames before them (the bit
+    reservoir); 0 means the frame decodes without them. Layers I and II
+    never borrow.
+    """
+    b1 = data[frame.offset + 1]
+    if (b1 >> 1) & 0x03 != 1:
+        return 0
+    # Side information follows the header and the CRC, if there is one
+    side = frame.offset + 4 + (0 if b1 & 0x01 else 2)
+    if (b1 >> 3) & 0x03 == 3:
+        return (data[side] << 1) | (data[side + 1] >> 7)
+    return data[side]
+
+
+def _clean_cut(data, frames: List[Frame], index: int, floor: int, max_shift: float):
+    """The latest frame at most max_shift seconds before frames[index] that
+    does not borrow from the frames before it, or index if there is none.
+
+    The search stops above floor so the clip before the cut keeps a frame.
+    """
+    candidate = index
+    shift = 0.0
+    while floor < candidate < len(frames) and shift <= max_shift:
+        if _main_data_begin(data, frames[candidate]) == 0:
+            return candidate
+        candidate -= 1
+        shift += frames[candidate].duration
+    return index
+
+
+def split_at_times(
+    data: bytes, times: Sequence[float], max_shift: float = 0.25
+) -> List[bytes]:
+    """Cut an MP3 into len(times) + 1 clips at the given offsets in seconds.
+
+    A clip has to start on a frame whose audio does not begin in the
+    frames before it, or a decoder plays a short glitch at its start. Each
+    cut therefore moves back, by up to max_shift seconds, to the nearest
+    such frame; an SSML batch puts a pause before every cut for it to move
+    into. When there is none in range the cut stays on the frame boundary
+    nearest the time, at most half a frame (about 12ms for 24kHz speech)
+    off, and the clip after it may start with that glitch.
+    """
+    frames = list(iter_frames(data))
+    if not frames:
+        raise ValueError("No MP3 frames found")
+
+    boundaries = []
+    elapsed = 0.0
+    frame_index = 0
+    for cut in sorted(times):
+        while (
+            frame_index < len(frames)
+            and elapsed + frames[frame_index].duration / 2 < cut
+        ):
+            elapsed += frames[frame_index].duration
+            frame_index += 1
+        floor = boundaries[-1] if boundaries else 0
+        boundaries.append(_clean_cut(data, frames, frame_index, floor, max_shift))
+
+    clips = []
+    start = 0
+    for stop in boundaries + [len(frames)]:
+        chunk = frames[start:stop]
+        if chunk:
+            clips.append(data[chunk[0].offset : chunk[-1].offset + chunk[-1].length])
+        else:
+            clips.append(b"")
+        start = stop
+    return clips
+
+
+def silent_frame(header: bytes) -> bytes:
+    """A frame in the same format as header that decodes to silence.
+
+    With its side information and main data all zero, a frame carries no
+    coefficients. CRC protection and padding are turned off so the zeros
+    need no checksum and the length is the plain frame size.
+    """
+    raw = bytes([header[0], header[1] | 0x01, header[2] & 0xFD, header[3]])
+    frame = _parse_header(raw, 0)
+    if frame is None:
+        raise ValueError("Not an MP3 frame header")
+    return raw + bytes(frame.length - 4)
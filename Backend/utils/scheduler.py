@@ -1,36 +1,41 @@
 import logging
-import subprocess
 
-import redis
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from utils.cache import cache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Redis client
-redis_client = redis.StrictRedis(host="localhost", port=6379, db=0)
+# Cache namespace holding anything derived from the voice list
+VOICE_CACHE_NAMESPACE = "voices"
 
 
 def refresh_voice_data():
     """
-    Refreshes voice data by running the seeding script and clearing the cache.
+    Refreshes voice data by running the seeding script and invalidating
+    cached voice data.
+
+    The seeding script also publishes the voice snapshot file, which running
+    API workers pick up without a restart.
     """
     try:
         logger.info("Starting voice data refresh job.")
 
-        # Run the seeding script
-        subprocess.run(["python", "Backend/scripts/seed_voices.py"], check=True)
-        logger.info("Successfully executed seed_voices.py script.")
+        # Seed in-process so the job reuses this worker's TTS channels
+        from scripts.seed_voices import seed_voices
+
+        seed_voices()
+        logger.info("Successfully seeded voices.")
 
-        # Clear the Redis cache
-        redis_client.flushdb()
-        logger.info("Redis cache cleared successfully.")
+        # Invalidate only the voice namespace; audio, rate-limiter state and
+        # other cached values are left alone
+        cache.bump_namespace(VOICE_CACHE_NAMESPACE)
+        logger.info("Voice cache namespace invalidated.")
 
         logger.info("Voice data refresh job completed.")
 
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error executing seed_voices.py: {e}")
     except Exception as e:
         logger.error(f"An unexpected error occurred during the refresh job: {e}")
 
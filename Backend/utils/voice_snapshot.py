@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ETOVOICE"
+FORMAT_VERSION = 1
+# magic, format version, snapshot version, created_at, payload length, crc32
+_HEADER = struct.Struct("<8sIQdQI")
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    tempfile.gettempdir(), "etoaudiobook-voices.snapshot"
+)
+
+
+def get_snapshot_path() -> str:
+    return os.environ.get("VOICE_SNAPSHOT_PATH") or DEFAULT_SNAPSHOT_PATH
+
+
+class VoiceSnapshot(NamedTuple):
+    version: int
+    created_at: float
+    voices: List[Dict]
+
+
+def write_snapshot(
+    voices: List[Dict], path: Optional[str] = None, version: Optional[int] = None
+) -> int:
+    """Atomically publish voices as a new snapshot version.
+
+    The file is written beside the target and renamed over it, so readers
+    never see a partly written snapshot.
+    """
+    path = path or get_snapshot_path()
+    payload = json.dumps(voices, separators=(",", ":")).encode("utf-8")
+    version = version or time.time_ns()
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        version,
+        time.time(),
+        len(payload),
+        zlib.crc32(payload),
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Wrote voice snapshot version {version} ({len(voices)} voices)")
+    return version
+
+
+class VoiceSnapshotReader:
+    """Reads the shared snapshot file and notices new versions.
+
+    What workers share is the API call: one of them fetches the voices and
+    the rest read the file. Each still parses it into its own catalog, as
+    the catalog's indexes are Python objects anyway. A new version is
+    detected by a cheap stat() of the path.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_snapshot_path()
+        self._lock = threading.Lock()
+        self._file_id = None
+        self._snapshot: Optional[VoiceSnapshot] = None
+
+    def _stat_id(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            # Missing, or a path this worker cannot reach
+            return None
+        return _file_id(stat)
+
+    def changed(self) -> bool:
+        return self._stat_id() != self._file_id
+
+    def load(self) -> Optional[VoiceSnapshot]:
+        """Return the current snapshot, rereading only when the file changed."""
+        with self._lock:
+            file_id = self._stat_id()
+            if file_id is None or file_id == self._file_id:
+                return self._snapshot
+
+            try:
+                with open(self.path, "rb") as f:
+                    # The file read, which may be newer than the one stat()ed
+                    file_id = _file_id(os.fstat(f.fileno()))
+                    data = f.read()
+            except Exception as e:
+                logger.error(f"Could not read voice snapshot {self.path}: {e}")
+                return self._snapshot
+            try:
+                snapshot = self._parse(data)
+            except Exception as e:
+                logger.error(f"Ignoring unreadable voice snapshot {self.path}: {e}")
+                return self._snapshot
+
+            self._file_id = file_id
+            self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    def _parse(data: bytes) -> VoiceSnapshot:
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated header")
+        magic, fmt, version, created_at, length, crc = _HEADER.unpack_from(data)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError("unknown snapshot format")
+
+        payload = memoryview(data)[_HEADER.size : _HEADER.size + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            raise ValueError("checksum mismatch")
+        return VoiceSnapshot(version, created_at, json.loads(bytes(payload)))
+
+
+def _file_id(stat: os.stat_result):
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
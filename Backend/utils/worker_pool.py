@@ -0,0 +1,51 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+THREAD_NAME_PREFIX = "tts-worker"
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool_size() -> int:
+    return max(1, int(os.environ.get("ASYNC_WORKERS", "4")))
+
+
+def get_worker_pool() -> ThreadPoolExecutor:
+    """Return the process-wide bounded pool used for TTS network calls.
+
+    Sized from ASYNC_WORKERS (see ProductionConfig) and created once, so
+    requests share a fixed number of threads instead of building their own.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                max_workers = get_pool_size()
+                _pool = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix=THREAD_NAME_PREFIX
+                )
+                logger.info(f"Worker pool started with {max_workers} threads")
+    return _pool
+
+
+def in_worker_thread() -> bool:
+    """True when called from a pool thread.
+
+    Work running on the pool must not block on further pool tasks, or a
+    saturated pool deadlocks; callers use this to run nested work inline.
+    """
+    return threading.current_thread().name.startswith(THREAD_NAME_PREFIX)
+
+
+def shutdown_worker_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
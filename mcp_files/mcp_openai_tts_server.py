@@ -4,6 +4,8 @@ MCP server for OpenAI Text-to-Speech.
 """
 import base64
 import os
+import tempfile
+from pathlib import Path
 
 from fastmcp import FastMCP  # type: ignore
 from openai import OpenAI  # type: ignore
@@ -14,38 +16,59 @@ if not api_key:
     raise ValueError("OPENAI_API_KEY environment variable not set")
 client = OpenAI(api_key=api_key)
 
+# Audio files are only ever written below this directory
+OUTPUT_DIR = os.path.realpath(
+    os.environ.get("TTS_OUTPUT_DIR")
+    or os.path.join(tempfile.gettempdir(), "openai-tts")
+)
+
 # Create FastMCP server
 mcp = FastMCP("OpenAI TTS")
 
 
+def resolve_output_path(output_path: str) -> str:
+    """Absolute path for a relative output_path inside OUTPUT_DIR.
+
+    Raises ValueError for absolute paths, ".." components and anything
+    that resolves outside the directory, such as through a symlink.
+    """
+    if os.path.isabs(output_path) or ".." in Path(output_path).parts:
+        raise ValueError(f"output_path must be relative to {OUTPUT_DIR}")
+    path = os.path.realpath(os.path.join(OUTPUT_DIR, output_path))
+    if os.path.commonpath([OUTPUT_DIR, path]) != OUTPUT_DIR or path == OUTPUT_DIR:
+        raise ValueError(f"output_path must be a file inside {OUTPUT_DIR}")
+    return path
+
+
 @mcp.tool()
 def synthesize_speech(
-    text: str, voice: str = "alloy", model: str = "tts-1"
+    text: str, voice: str = "alloy", model: str = "tts-1", output_path: str = ""
 ) -> str:
-    """Synthesizes speech from text using the OpenAI TTS API.
-
-    Args:
-        text: The text to synthesize.
-        voice: The voice to use for the synthesis.
-        model: The TTS model to use.
-
-    Returns:
-        A string containing the path to the generated audio file.
-    """
-    Convert text to speech using OpenAI TTS API.
+    """Convert text to speech using OpenAI TTS API.
 
     Args:
         text: The text to synthesize.
         voice: The voice to use for the synthesis.
         model: The TTS model to use.
+        output_path: If set, the raw MP3 bytes are written to this file,
+            relative to TTS_OUTPUT_DIR, instead of being base64-encoded
+            into the response.
 
     Returns:
-        A base64-encoded string of the audio content.
+        The path to the written audio file when output_path is set,
+        otherwise a base64-encoded string of the audio content.
     """
     try:
+        # Checked before the API call so a bad path costs nothing
+        path = resolve_output_path(output_path) if output_path else None
         response = client.audio.speech.create(
             model=model, voice=voice, input=text
         )
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(response.content)
+            return path
         return base64.b64encode(response.content).decode("utf-8")
     except Exception as e:
         return f"Error synthesizing speech: {e}"
@@ -58,6 +81,7 @@ def list_voices() -> list[str]:
 
     Returns:
         A list of available voice names.
+    """
     return [
         "alloy", "echo", "fable", "onyx", "nova", "shimmer"
     ]